@@ -0,0 +1,213 @@
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+This is a persistent cache of generated modules. A module is saved with
+its netlist, layout and pins and it is found by a hash of its module type,
+its arguments, the options and the source code of the compiler and the
+technology. The modules that a cached module uses are saved by their
+module type and arguments and are created by the factory when it is
+loaded so they are shared as usual. They are created in the same order
+as when the module was built so that every module gets the same name
+in a run with cached modules as in a run without them.
+"""
+
+import os
+import io
+import pickle
+import pickletools
+import copyreg
+import hashlib
+import debug
+import hierarchy_design
+from globals import OPTS
+
+# Options that don't change the modules that are generated
+run_options = ["openram_temp", "output_path", "output_name", "config_file", "debug_level",
+               "word_size", "num_words", "words_per_row", "supply_voltages", "temperatures",
+               "process_corners", "num_threads", "analytical_delay", "trim_netlist", "use_pex",
+               "purge_temp", "print_banner", "spice_name", "spice_exe", "spice_threads",
+               "drc_name", "lvs_name", "pex_name", "drc_exe", "lvs_exe", "pex_exe",
+               "use_sim_cache", "sim_cache_dir", "sim_cache_size", "sim_timeout", "sim_retries",
+               "use_cell_cache", "cell_cache_dir", "cell_cache_size"]
+
+# The hash of the compiler and technology source files
+source_id = None
+
+def get_source_id():
+    """ Return a hash of the compiler and technology files that changes when either is edited. """
+    global source_id
+    if source_id == None:
+        h = hashlib.sha256()
+        compiler_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for (top, suffixes) in [(compiler_dir, (".py",)), (OPTS.openram_tech, None)]:
+            for (path, dirs, files) in os.walk(top):
+                dirs[:] = sorted(d for d in dirs if d not in ["tests", "__pycache__"])
+                for filename in sorted(files):
+                    if suffixes and not filename.endswith(suffixes):
+                        continue
+                    full_name = os.path.join(path, filename)
+                    h.update(os.path.relpath(full_name, top).encode())
+                    with open(full_name, "rb") as f:
+                        h.update(f.read())
+        source_id = h.hexdigest()
+    return source_id
+
+def is_cacheable(value):
+    """ Return whether an argument value has a repr that is the same in every run. """
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return all(is_cacheable(item) for item in value)
+    elif isinstance(value, dict):
+        return all(is_cacheable(k) and is_cacheable(v) for (k, v) in value.items())
+    return value == None or isinstance(value, (bool, int, float, str))
+
+def get_key(module_type, name, kwargs):
+    """
+    Return the cache key of a module or None if its arguments can't be saved.
+    The name the factory gives the module is part of the key so that a
+    cached module keeps the name it was saved with in the layout and the
+    netlist without clashing with the names of other modules in this run.
+    """
+    if not is_cacheable(kwargs):
+        return None
+    h = hashlib.sha256()
+    h.update(get_source_id().encode())
+    h.update(module_type.encode())
+    h.update(name.encode())
+    h.update(repr(sorted(kwargs.items())).encode())
+    # The config file module attributes are copied into OPTS too
+    options = sorted((k, v) for (k, v) in vars(OPTS).items()
+                     if k not in run_options and not k.startswith("__") and is_cacheable(v))
+    h.update(repr(options).encode())
+    return h.hexdigest()
+
+def get_filename(key):
+    """ Return the name of the cached module file for a key. """
+    return os.path.join(OPTS.cell_cache_dir, key)
+
+
+def restore_module(module, state):
+    """
+    Set the state of an unpickled module. The layout structure is left
+    out of the pickle and is started again.
+    """
+    module.__dict__.update(state)
+    module.gds_read()
+
+
+class module_pickler(pickle.Pickler):
+    """
+    Pickles a module. The other modules it uses that were created by the
+    factory are saved as the module type and arguments they were created with.
+    """
+
+    def __init__(self, file, factory, module):
+        pickle.Pickler.__init__(self, file, pickle.HIGHEST_PROTOCOL)
+        self.factory = factory
+        self.module = module
+
+    def persistent_id(self, obj):
+        if obj is self.module or not isinstance(obj, hierarchy_design.hierarchy_design):
+            return None
+        return self.factory.get_args(obj)
+
+    def reducer_override(self, obj):
+        if isinstance(obj, hierarchy_design.hierarchy_design):
+            state = {k: v for (k, v) in obj.__dict__.items() if k != "gds"}
+            return (copyreg.__newobj__, (type(obj),), state, None, None, restore_module)
+        return NotImplemented
+
+
+class module_unpickler(pickle.Unpickler):
+    """
+    Unpickles a module and creates the modules it uses with the factory.
+    """
+
+    def __init__(self, file, factory):
+        pickle.Unpickler.__init__(self, file)
+        self.factory = factory
+
+    def persistent_load(self, pid):
+        (module_type, kwargs) = pid
+        return self.factory.create(module_type, **kwargs)
+
+
+def load(factory, key, name):
+    """ Return the cached module for a key or None if there is none. """
+    cache_file = get_filename(key)
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with open(cache_file, "rb") as f:
+            calls = pickle.load(f)
+            data = f.read()
+        # Check the whole module pickle before the factory is changed
+        for op in pickletools.genops(data):
+            pass
+    except Exception as e:
+        # An unreadable entry is just rebuilt
+        debug.info(2, "Unable to load cached module {0}: {1}".format(name, e))
+        return None
+    try:
+        # Create the modules it uses in the order they were first created
+        for (module_type, kwargs) in calls:
+            factory.create(module_type, **kwargs)
+        module = module_unpickler(io.BytesIO(data), factory).load()
+    except Exception as e:
+        # The modules it uses were given their names so it can't be rebuilt now
+        debug.error("Unable to load cached module {0}: {1}".format(name, e), -1)
+    # Mark the module as recently used for the eviction
+    try:
+        os.utime(cache_file)
+    except OSError:
+        pass
+    debug.info(3, "Using cached module {0} {1}".format(name, key))
+    return module
+
+def store(factory, key, module, calls):
+    """
+    Save a module for a key along with the module types and arguments of
+    the factory calls made while it was created. Returns whether it could be saved.
+    """
+    temp_file = "{0}.{1}".format(get_filename(key), os.getpid())
+    try:
+        if not os.path.exists(OPTS.cell_cache_dir):
+            os.makedirs(OPTS.cell_cache_dir, 0o750)
+        # Write a temporary file first so that concurrent runs never see a partial module
+        with open(temp_file, "wb") as f:
+            pickler = module_pickler(f, factory, module)
+            pickler.dump(calls)
+            # The module is unpickled on its own
+            pickler.clear_memo()
+            pickler.dump(module)
+        os.replace(temp_file, get_filename(key))
+    except (OSError, pickle.PicklingError, TypeError, AttributeError) as e:
+        debug.info(2, "Unable to save module {0}: {1}".format(module.name, e))
+        if os.path.exists(temp_file):
+            os.remove(temp_file)
+        return False
+    return True
+
+def evict():
+    """ Remove the least recently used modules until the cache fits in OPTS.cell_cache_size (MB). """
+    entries = []
+    for name in os.listdir(OPTS.cell_cache_dir):
+        try:
+            stat = os.stat(os.path.join(OPTS.cell_cache_dir, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+    total_size = sum(e[1] for e in entries)
+    max_size = OPTS.cell_cache_size * 1024 * 1024
+    for (mtime, size, name) in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(os.path.join(OPTS.cell_cache_dir, name))
+        except OSError:
+            continue
+        total_size -= size
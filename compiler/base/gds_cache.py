@@ -0,0 +1,158 @@
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+import os
+import numpy as np
+import gdsMill
+import debug
+
+# The parsed layouts of GDS files indexed by file name, modification time and units.
+# Each file is only parsed once per run.
+layouts = {}
+# The labels and boundaries of GDS files with the same keys
+summaries = {}
+
+def load(gds_filename, units):
+    """
+    Return the parsed layout of a GDS file. The layout is shared by
+    every caller so it must not be changed. Use lazy_layout for a
+    layout that can be modified.
+    """
+    key = (gds_filename, os.path.getmtime(gds_filename), tuple(units))
+    if key not in layouts:
+        debug.info(3, "opening {}".format(gds_filename))
+        cell_vlsi = gdsMill.VlsiLayout(units=units)
+        reader = gdsMill.Gds2reader(cell_vlsi)
+        reader.loadFromFile(gds_filename)
+        layouts[key] = cell_vlsi
+    return layouts[key]
+
+def summary(gds_filename, units):
+    """
+    Return the gds_summary of a GDS file. Only the labels and the
+    boundaries of the file are read.
+    """
+    key = (gds_filename, os.path.getmtime(gds_filename), tuple(units))
+    if key not in summaries:
+        debug.info(3, "scanning {}".format(gds_filename))
+        summaries[key] = gds_summary(gds_filename, units)
+    return summaries[key]
+
+def clear():
+    """ Forget all parsed layouts. """
+    layouts.clear()
+    summaries.clear()
+
+class gds_summary():
+    """
+    The border size and the pin shapes of a library cell found from the
+    labels and boundaries of its GDS file without building the layout.
+    This gives the same results as the VlsiLayout of a file with a single
+    structure. Files with more structures or references are fully loaded.
+    """
+
+    def __init__(self, gds_filename, units):
+        self.gds_filename = gds_filename
+        self.units = units
+        reader = gdsMill.Gds2reader(None)
+        (names, self.layers, self.boundaries, self.texts, hierarchical) = reader.scanLabelsAndBoundaries(gds_filename)
+        self.names = names
+        self.flat = len(names)==1 and not hierarchical
+        # The unique rectangles of each layer in user units
+        self.layer_shapes = {}
+
+    def get_layout_border(self, layer):
+        """
+        Return the size of the last boundary on the border layer
+        or None if there is none. See VlsiLayout.getLayoutBorder.
+        """
+        if not self.flat:
+            return load(self.gds_filename, self.units).getLayoutBorder(layer)
+        cell_size = None
+        for (boundary_layer, coordinates) in self.boundaries:
+            if boundary_layer == layer:
+                (left_bottom, right_top) = (coordinates[0], coordinates[2])
+                cell_size = [(right_top[0]-left_bottom[0])*self.units[0],
+                             (right_top[1]-left_bottom[1])*self.units[0]]
+        if cell_size == None:
+            debug.info(2, "{}.cell_size information not found yet".format(self.names[0]))
+        return cell_size
+
+    def get_shapes(self, layer):
+        """ Return the (n,4) array of unique rectangles on a layer in user units. """
+        if layer not in self.layer_shapes:
+            # Only rectangles like VlsiLayout.getRectanglesInStructure
+            rectangles = [[c[0][0], c[0][1], c[2][0], c[2][1]] for (l, c) in self.boundaries
+                          if l == layer and len(c) == 5]
+            rectangles = np.array(rectangles, dtype=float).reshape(-1,4)
+            rectangles = np.stack([np.minimum(rectangles[:,0],rectangles[:,2]),
+                                   np.minimum(rectangles[:,1],rectangles[:,3]),
+                                   np.maximum(rectangles[:,0],rectangles[:,2]),
+                                   np.maximum(rectangles[:,1],rectangles[:,3])], axis=-1)
+            self.layer_shapes[layer] = np.unique(rectangles, axis=0)*self.units[0]
+        return self.layer_shapes[layer]
+
+    def get_pin_shapes(self, pin_name):
+        """
+        Return the largest rectangle on the layer of each label of a pin
+        that encloses the label. See VlsiLayout.getPinShape.
+        """
+        if not self.flat:
+            return load(self.gds_filename, self.units).getPinShape(pin_name)
+        max_pins = []
+        # The labels are grouped by layer like VlsiLayout.processLabelPins
+        for layer in self.layers:
+            for (text_layer, coordinate, text) in self.texts:
+                if text_layer != layer:
+                    continue
+                # Remove the padding if it exists
+                if text[-1] == "\x00":
+                    text = text[0:-1]
+                if text != pin_name:
+                    continue
+                shapes = self.get_shapes(layer)
+                (x, y) = [c*self.units[0] for c in coordinate]
+                inside = (shapes[:,0]<=x)&(shapes[:,2]>=x)&(shapes[:,1]<=y)&(shapes[:,3]>=y)
+                max_pin = None
+                max_area = 0
+                for shape in shapes[inside].tolist():
+                    new_area = gdsMill.boundaryArea(shape)
+                    if max_pin == None or new_area>max_area:
+                        max_pin = (layer, shape)
+                        max_area = new_area
+                max_pins.append(max_pin)
+        if len(max_pins) == 0:
+            raise KeyError(pin_name)
+        return max_pins
+
+class lazy_layout():
+    """
+    A stand-in for the VlsiLayout of a GDS file. The file is not loaded
+    until an attribute of the layout is first used. Each lazy_layout then
+    gets its own copy of the cached layout so that pins written to it do
+    not show up in other modules.
+    """
+
+    def __init__(self, gds_filename, units):
+        self.__dict__["_gds_filename"] = gds_filename
+        self.__dict__["_units"] = units
+        self.__dict__["_layout"] = None
+
+    def get_layout(self):
+        """ Load the layout if it isn't loaded yet and return it. """
+        if self._layout == None:
+            self.__dict__["_layout"] = load(self._gds_filename, self._units).copyLayout()
+        return self._layout
+
+    def __getattr__(self, name):
+        # Special methods are looked up on the stand-in itself
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return getattr(self.get_layout(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self.get_layout(), name, value)
@@ -8,6 +8,7 @@
 """
 This provides a set of useful generic types for the gdsMill interface. 
 """
+import copy
 import debug
 from vector import vector
 import tech
@@ -146,10 +147,12 @@ class instance(geometry):
         
         self.name = name
         self.mod = mod
-        self.gds = mod.gds
         self.rotate = rotate
         self.offset = vector(offset).snap_to_grid()
         self.mirror = mirror
+        # The transformed pins of the module indexed by pin name.
+        # They are made when a pin is first requested and cleared when the instance is moved.
+        self.pin_table = {}
         if OPTS.netlist_only:
             self.width = 0
             self.height = 0
@@ -200,14 +203,10 @@ class instance(geometry):
             return new_blockages
         
     def gds_write_file(self, new_layout):
-        """Recursively writes all the sub-modules in this instance"""
+        """Writes a reference to the structure of my module"""
         debug.info(4, "writing instance: " + self.name)
-        # make sure to write out my module/structure 
-        # (it will only be written the first time though)
-        self.mod.gds_write_file(self.gds)
-        # now write an instance of my module/structure
-        new_layout.addInstance(self.gds,
-                               self.mod.name,
+        # the structure itself is written by the module
+        new_layout.addInstance(self.mod.name,
                                offsetInMicrons=self.offset,
                                mirror=self.mirror,
                                rotate=self.rotate)
@@ -219,39 +218,44 @@ class instance(geometry):
         self.mirror = mirror
         self.rotate = rotate
         self.update_boundary()
+        self.clear_pins()
         debug.info(3, "placing instance {}".format(self))
         
+    def clear_pins(self):
+        """ Forget the transformed pins after the instance is moved. """
+        self.pin_table = {}
     
     def get_pin(self,name,index=-1):
         """ Return an absolute pin that is offset and transformed based on
         this instance location. Index will return one of several pins."""
 
-        import copy
         if index==-1:
-            pin = copy.deepcopy(self.mod.get_pin(name))
-            pin.transform(self.offset,self.mirror,self.rotate)
-            return pin
+            # This checks that there is exactly one pin
+            self.mod.get_pin(name)
+            return self.get_pins(name)[0]
         else:
-            pins = copy.deepcopy(self.mod.get_pin(name))
-            pin.transform(self.offset,self.mirror,self.rotate)
-            return pin[index]
+            return self.get_pins(name)[index]
 
     def get_num_pins(self, name):
         """ Return the number of pins of a given name """
         return len(self.mod.get_pins(name))
     
     def get_pins(self,name):
-        """ Return an absolute pin that is offset and transformed based on
-        this instance location. """
-        
-        import copy
-        pin = copy.deepcopy(self.mod.get_pins(name))
+        """ Return the absolute pins that are offset and transformed based on
+        this instance location. The pins are shared by every caller so they
+        must not be changed. """
         
-        new_pins = []
-        for p in pin:
-            p.transform(self.offset,self.mirror,self.rotate)                
-            new_pins.append(p)
-        return new_pins
+        try:
+            pins = self.pin_table[name]
+        except KeyError:
+            # Only the rect is changed by the transform so a shallow copy is enough
+            pins = []
+            for p in self.mod.get_pins(name):
+                pin = copy.copy(p)
+                pin.transform(self.offset,self.mirror,self.rotate)
+                pins.append(pin)
+            self.pin_table[name] = pins
+        return list(pins)
         
     def __str__(self):
         """ override print function output """
@@ -16,6 +16,7 @@ from globals import OPTS
 from vector import vector
 from pin_layout import pin_layout
 import lef
+import gds_cache
 
 class layout():
     """
@@ -34,7 +35,6 @@ class layout():
         self.insts = []      # Holds module/cell layout instances
         self.objs = []       # Holds all other objects (labels, geometries, etc)
         self.pin_map = {}    # Holds name->pin_layout map for all pins
-        self.visited = []    # List of modules we have already visited
         self.is_library_cell = False # Flag for library cells 
         self.gds_read()
 
@@ -119,6 +119,7 @@ class layout():
             # The instances have a precomputed boundary that we need to update.
             if inst.__class__.__name__ == "instance":
                 inst.compute_boundary(inst.offset)
+                inst.clear_pins()
         for pin_name in self.pin_map.keys():
             # All the pins are absolute coordinates that need to be updated.
             pin_list = self.pin_map[pin_name]
@@ -437,7 +438,7 @@ class layout():
 
     def gds_read(self):
         """Reads a GDSII file in the library and checks if it exists
-           Otherwise, start a new layout for dynamic generation."""
+           Otherwise, the layout is generated when it is written."""
 
         # This must be done for netlist only mode too
         if os.path.isfile(self.gds_file):
@@ -447,15 +448,13 @@ class layout():
             self.gds = None
             return
         
-        # open the gds file if it exists or else create a blank layout
+        # use the gds file if it exists
         if os.path.isfile(self.gds_file):
-            debug.info(3, "opening {}".format(self.gds_file))
-            self.gds = gdsMill.VlsiLayout(units=GDS["unit"])
-            reader = gdsMill.Gds2reader(self.gds)
-            reader.loadFromFile(self.gds_file)
+            # the file is only parsed when the layout is first used
+            self.gds = gds_cache.lazy_layout(self.gds_file, GDS["unit"])
         else:
-            debug.info(3, "Creating layout structure {}".format(self.name))
-            self.gds = gdsMill.VlsiLayout(name=self.name, units=GDS["unit"])
+            # the structure is built when the GDS is written
+            self.gds = None
 
     def print_gds(self, gds_file=None):
         """Print the gds file (not the vlsi class) to the terminal """
@@ -466,47 +465,50 @@ class layout():
         reader = gdsMill.Gds2reader(arrayCellLayout, debugToTerminal=1)
         reader.loadFromFile(gds_file)
 
-    def clear_visited(self):
-        """ Recursively clear the visited flag """
-        self.visited = []
-
-    def gds_write_file(self, gds_layout):
-        """Recursive GDS write function"""
-        # Visited means that we already prepared self.gds for this subtree
-        if self.name in self.visited:
+    def gds_write_file(self, writer, visited):
+        """
+        Recursive GDS write function. The structures of the modules that are
+        used are written before this one. visited is the set of structure
+        names that are already written so that each one is written once.
+        """
+        if self.name in visited:
             return
+        visited.add(self.name)
         for i in self.insts:
-            i.gds_write_file(gds_layout)
+            i.mod.gds_write_file(writer, visited)
+
+        if self.is_library_cell:
+            # The structures of the library GDS are written as they are
+            # except that the pins are added to the root structure
+            root_name = self.gds.rootStructureName
+            for (name, structure) in self.gds.structures.items():
+                if name != root_name and name not in visited:
+                    visited.add(name)
+                    writer.writeStructure(structure, name)
+            new_layout = gdsMill.StructureStream(writer, root_name, GDS["unit"], self.gds.structures[root_name])
+        else:
+            new_layout = gdsMill.StructureStream(writer, self.name, GDS["unit"])
+
+        # The shapes are written as they are added
+        for i in self.insts:
+            i.gds_write_file(new_layout)
         for i in self.objs:
-            i.gds_write_file(gds_layout)
+            i.gds_write_file(new_layout)
         for pin_name in self.pin_map.keys():
             for pin in self.pin_map[pin_name]:
-                pin.gds_write_file(gds_layout)
-        self.visited.append(self.name)
+                pin.gds_write_file(new_layout)
+        new_layout.close()
 
     def gds_write(self, gds_name):
         """Write the entire gds of the object to the file."""
         debug.info(3, "Writing to {}".format(gds_name))
 
-        # If we already wrote a GDS, we need to reset and traverse it again in
-        # case we made changes.
-        if not self.is_library_cell and self.visited:
-            debug.info(3, "Creating layout structure {}".format(self.name))
-            self.gds = gdsMill.VlsiLayout(name=self.name, units=GDS["unit"])
-
-        writer = gdsMill.Gds2writer(self.gds)
-        # MRG: 3/2/18 We don't want to clear the visited flag since
-        # this would result in duplicates of all instances being placed in self.gds
-        # which may have been previously processed!
-        # MRG: 10/4/18 We need to clear if we make changes and write a second GDS!
-        self.clear_visited()
-        
-        # recursively create all the remaining objects
-        self.gds_write_file(self.gds)
-        
-        # populates the xyTree data structure for gds
-        # self.gds.prepareForWrite()
-        writer.writeToFile(gds_name)
+        # The header is the one of a new layout in the technology units
+        writer = gdsMill.Gds2writer(gdsMill.VlsiLayout(units=GDS["unit"]))
+        writer.openStream(gds_name)
+        # recursively write all the structures
+        self.gds_write_file(writer, set())
+        writer.closeStream()
         debug.info(3, "Done writing to {}".format(gds_name))        
 
     def get_boundary(self):
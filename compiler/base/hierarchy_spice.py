@@ -7,10 +7,18 @@
 #
 import debug
 import re
+import gzip
 import os
 import math
 import tech
 
+def open_netlist(spname):
+    """ Open a netlist file for writing. It is compressed if the name ends with .gz. """
+    if spname.endswith(".gz"):
+        return gzip.open(spname, "wt")
+    # Big netlists are written in large blocks
+    return open(spname, "w", buffering=1<<20)
+
 class spice():
     """
     This provides a set of useful generic types for hierarchy
@@ -157,81 +165,70 @@ class spice():
         else:
             self.spice = []
 
-    def contains(self, mod, modlist):
-        for x in modlist:
-            if x.name == mod.name:
-                return True
-        return False
-
-    def sp_write_file(self, sp, usedMODS):
+    def sp_write_file(self, sp, used_names):
         """ Recursive spice subcircuit write;
-            Writes the spice subcircuit from the library or the dynamically generated one"""
-        if not self.spice:
-            # recursively write the modules
-            for i in self.mods:
-                if self.contains(i, usedMODS):
-                    continue
-                usedMODS.append(i)
-                i.sp_write_file(sp, usedMODS)
-
-            if len(self.insts) == 0:
-                return
-            if self.pins == []:
-                return
-
-            
-            # write out the first spice line (the subcircuit)
-            sp.write("\n.SUBCKT {0} {1}\n".format(self.name,
-                                                  " ".join(self.pins)))
-
-            for line in self.comments:
-                sp.write("* {}\n".format(line))
-                    
-            # every instance must have a set of connections, even if it is empty.
-            if  len(self.insts)!=len(self.conns):
-                debug.error("{0} : Not all instance pins ({1}) are connected ({2}).".format(self.name,
-                                                                                            len(self.insts),
-                                                                                            len(self.conns)))
-                debug.error("Instances: \n"+str(self.insts))
-                debug.error("-----")
-                debug.error("Connections: \n"+str(self.conns),1)
-
-
-
-            for i in range(len(self.insts)):
-                # we don't need to output connections of empty instances.
-                # these are wires and paths
-                if self.conns[i] == []:
-                    continue
-                if hasattr(self.insts[i].mod,"spice_device"):
-                    sp.write(self.insts[i].mod.spice_device.format(self.insts[i].name,
-                                                                   " ".join(self.conns[i])))
-                    sp.write("\n")
-
-                else:
-                    sp.write("X{0} {1} {2}\n".format(self.insts[i].name,
-                                                     " ".join(self.conns[i]),
-                                                     self.insts[i].mod.name))
-
-            sp.write(".ENDS {0}\n".format(self.name))
-
-        else:
+            Writes the spice subcircuit from the library or the dynamically generated one.
+            used_names is the set of the names of the modules already written."""
+        sp.writelines(self.sp_lines(used_names))
+
+    def sp_lines(self, used_names):
+        """ Generate the spice of this module and the modules it uses that
+            aren't in used_names yet. The modules are in topological order
+            (every module before the modules that use it) and each module is
+            generated as a single string."""
+        if self.spice:
             # write the subcircuit itself
             # Including the file path makes the unit test fail for other users.
             #if os.path.isfile(self.sp_file):
             #    sp.write("\n* {0}\n".format(self.sp_file))
-            sp.write("\n".join(self.spice))
-            
-            sp.write("\n")
+            yield "\n".join(self.spice) + "\n"
+            return
+        
+        # recursively write the modules
+        for i in self.mods:
+            if i.name in used_names:
+                continue
+            used_names.add(i.name)
+            yield from i.sp_lines(used_names)
+
+        if len(self.insts) == 0:
+            return
+        if self.pins == []:
+            return
+
+        # every instance must have a set of connections, even if it is empty.
+        if  len(self.insts)!=len(self.conns):
+            debug.error("{0} : Not all instance pins ({1}) are connected ({2}).".format(self.name,
+                                                                                        len(self.insts),
+                                                                                        len(self.conns)))
+            debug.error("Instances: \n"+str(self.insts))
+            debug.error("-----")
+            debug.error("Connections: \n"+str(self.conns),1)
+
+        # write out the first spice line (the subcircuit)
+        lines = ["\n.SUBCKT {0} {1}\n".format(self.name, " ".join(self.pins))]
+        for line in self.comments:
+            lines.append("* {}\n".format(line))
+
+        for (inst, conns) in zip(self.insts, self.conns):
+            # we don't need to output connections of empty instances.
+            # these are wires and paths
+            if conns == []:
+                continue
+            if hasattr(inst.mod,"spice_device"):
+                lines.append(inst.mod.spice_device.format(inst.name, " ".join(conns)) + "\n")
+            else:
+                lines.append("X{0} {1} {2}\n".format(inst.name, " ".join(conns), inst.mod.name))
+
+        lines.append(".ENDS {0}\n".format(self.name))
+        yield "".join(lines)
 
     def sp_write(self, spname):
         """Writes the spice to files"""
         debug.info(3, "Writing to {0}".format(spname))
-        spfile = open(spname, 'w')
+        spfile = open_netlist(spname)
         spfile.write("*FIRST LINE IS A COMMENT\n")
-        usedMODS = list()
-        self.sp_write_file(spfile, usedMODS)
-        del usedMODS
+        self.sp_write_file(spfile, set())
         spfile.close()
 
     def analytical_delay(self, corner, slew, load=0.0):
@@ -13,6 +13,7 @@ import globals
 import debug
 from vector import vector
 from pin_layout import pin_layout
+import gds_cache
 
 OPTS = globals.OPTS
 
@@ -51,14 +52,13 @@ def auto_measure_libcell(pin_list, name, units, layer):
     Return these as a set of properties including the cell width/height too.
     """
     cell_gds = OPTS.openram_tech + "gds_lib/" + str(name) + ".gds"
-    cell_vlsi = gdsMill.VlsiLayout(units=units)
-    reader = gdsMill.Gds2reader(cell_vlsi)
-    reader.loadFromFile(cell_gds)
+    cell_vlsi = gds_cache.load(cell_gds, units)
 
     cell = {}
     measure_result = cell_vlsi.getLayoutBorder(layer)
     if measure_result == None:
-        measure_result = cell_vlsi.measureSize(name)
+        # Measuring changes the root structure so it is done on a copy of the shared layout
+        measure_result = gds_cache.lazy_layout(cell_gds, units).measureSize(name)
     [cell["width"], cell["height"]] = measure_result
 
     for pin in pin_list:
@@ -74,15 +74,14 @@ def get_gds_size(name, gds_filename, units, layer):
     bounding box or a border layer.
     """
     debug.info(4,"Creating VLSI layout for {}".format(name))
-    cell_vlsi = gdsMill.VlsiLayout(units=units)
-    reader = gdsMill.Gds2reader(cell_vlsi)
-    reader.loadFromFile(gds_filename)
+    cell_summary = gds_cache.summary(gds_filename, units)
 
     cell = {}
-    measure_result = cell_vlsi.getLayoutBorder(layer)
+    measure_result = cell_summary.get_layout_border(layer)
     if measure_result == None:
         debug.info(2,"Layout border failed. Trying to measure size for {}".format(name))
-        measure_result = cell_vlsi.measureSize(name)
+        # Measuring changes the root structure so it is done on a copy of the shared layout
+        measure_result = gds_cache.lazy_layout(gds_filename, units).measureSize(name)
     # returns width,height
     return measure_result
 
@@ -100,14 +99,12 @@ def get_gds_pins(pin_names, name, gds_filename, units):
     Open a GDS file and find the pins in pin_names as text on a given layer.
     Return these as a rectangle layer pair for each pin.
     """
-    cell_vlsi = gdsMill.VlsiLayout(units=units)
-    reader = gdsMill.Gds2reader(cell_vlsi)
-    reader.loadFromFile(gds_filename)
+    cell_summary = gds_cache.summary(gds_filename, units)
 
     cell = {}
     for pin_name in pin_names:
         cell[str(pin_name)]=[]
-        pin_list=cell_vlsi.getPinShape(str(pin_name))
+        pin_list=cell_summary.get_pin_shapes(str(pin_name))
         for pin_shape in pin_list:
             (layer,boundary)=pin_shape
             rect=[vector(boundary[0],boundary[1]),vector(boundary[2],boundary[3])]
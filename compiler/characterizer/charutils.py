@@ -6,6 +6,8 @@
 #All rights reserved.
 #
 import re
+import os
+import multiprocessing
 import debug
 from globals import OPTS
 
@@ -15,8 +17,76 @@ def relative_compare(value1,value2,error_tolerance=0.001):
     return (abs(value1 - value2) / abs(max(value1,value2)) <= error_tolerance)
 
 
-def parse_spice_list(filename, key):
-    """Parses a hspice output.lis file for a key value"""
+def scratch_dir(temp_dir, name):
+    """ Create a directory for the files of one simulation job in a temp directory. """
+    path = "{0}{1}/".format(temp_dir, name)
+    if not os.path.exists(path):
+        os.makedirs(path, 0o750)
+    return path
+
+# The function run by the forked simulation workers
+active_sim_job = None
+
+def sim_job(args):
+    """
+    Run the active simulation job in a forked worker. The temp directory
+    of the worker is moved to a scratch directory so that the stimulus and
+    the simulator output of concurrent jobs are kept apart.
+    """
+    (temp_dir, index, job_args) = args
+    OPTS.openram_temp = scratch_dir(temp_dir, "sim{}".format(index))
+    # The workers can't have their own workers so nested jobs run in order
+    OPTS.num_threads = 1
+    return active_sim_job(*job_args)
+
+def run_sim_jobs(job, job_args, progress=None):
+    """
+    Call job with each tuple of arguments and return the results in order.
+    If OPTS.num_threads is more than one, up to that many jobs are run at
+    once in forked processes. The optional progress function is called
+    with the index and the result of each job as the result arrives. If it
+    returns True the remaining jobs are stopped and only the results so far
+    are returned.
+    """
+    if OPTS.num_threads<=1 or len(job_args)<=1 or "fork" not in multiprocessing.get_all_start_methods():
+        results = []
+        for args in job_args:
+            results.append(job(*args))
+            if progress and progress(len(results)-1, results[-1]):
+                break
+        return results
+
+    global active_sim_job
+    debug.info(1,"Running {0} simulations with {1} processes.".format(len(job_args),
+                                                                      OPTS.num_threads))
+    # The workers are forked so they see the current state of the job
+    active_sim_job = job
+    context = multiprocessing.get_context("fork")
+    results = []
+    with context.Pool(min(OPTS.num_threads,len(job_args))) as pool:
+        for result in pool.imap(sim_job,
+                                [(OPTS.openram_temp, i, args) for (i,args) in enumerate(job_args)]):
+            results.append(result)
+            if progress and progress(len(results)-1, result):
+                # Leaving the pool terminates the workers of the remaining jobs
+                break
+    active_sim_job = None
+    return results
+
+# The measurements of the last simulator output read indexed by file name
+spice_measures = {}
+
+def clear_spice_measures():
+    """ Forget the measurements read so far. This is called after every simulation. """
+    spice_measures.clear()
+
+def get_spice_measures(filename):
+    """
+    Read all of the measurements in a hspice/ngspice .lis or xa .meas file
+    into a dictionary of lower case names to values. Measurements that
+    failed have the value "Failed". The file is only read once per
+    simulation.
+    """
     if OPTS.spice_name == "xa" :
         # customsim has a different output file name
         full_filename="{0}xa.meas".format(OPTS.openram_temp)
@@ -25,17 +95,37 @@ def parse_spice_list(filename, key):
         full_filename="{0}{1}.lis".format(OPTS.openram_temp, filename)
 
     try:
+        stat = os.stat(full_filename)
         f = open(full_filename, "r")
-    except IOError:
+    except (IOError, OSError):
         debug.error("Unable to open spice output file: {0}".format(full_filename),1)
+    key = (stat.st_mtime_ns, stat.st_size)
+    if full_filename in spice_measures and spice_measures[full_filename][0] == key:
+        f.close()
+        return spice_measures[full_filename][1]
     contents = f.read()
     f.close()
-    # val = re.search(r"{0}\s*=\s*(-?\d+.?\d*\S*)\s+.*".format(key), contents)
-    val = re.search(r"{0}\s*=\s*(-?\d+.?\d*[e]?[-+]?[0-9]*\S*)\s+.*".format(key), contents)
-    
-    if val != None:
-        debug.info(4, "Key = " + key + " Val = " + val.group(1))
-        return convert_to_float(val.group(1))
+
+    measures = {}
+    # Lines look like "name = value" (ngspice, xa) or "name= value targ= ... trig= ..." (hspice).
+    # Only the first value of a name is used.
+    for (name, value) in re.findall(r"([^\s=]+)\s*=\s*(\S+)", contents):
+        name = name.lower()
+        if name in measures:
+            continue
+        if re.match(r"-?\d", value):
+            measures[name] = value
+        else:
+            measures[name] = "Failed"
+    spice_measures[full_filename] = (key, measures)
+    return measures
+
+def parse_spice_list(filename, key):
+    """Parses a hspice output.lis file for a key value"""
+    value = get_spice_measures(filename).get(key.lower(), "Failed")
+    if value != "Failed":
+        debug.info(4, "Key = " + key + " Val = " + value)
+        return convert_to_float(value)
     else:
         return "Failed"
     
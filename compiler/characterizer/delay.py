@@ -404,12 +404,20 @@ class delay(simulation):
             self.targ_write_ports = []
             self.targ_read_ports = [port]
             success = False
-           
-            debug.info(1, "Trying feasible period: {0}ns on Port {1}".format(feasible_period, port))
-            self.period = feasible_period
-            (success, results)=self.run_delay_simulation()
+
+            #With more than one worker, the next doublings of the period are simulated at once.
+            num_periods = max(1, min(OPTS.num_threads, time_out))
+            time_out -= num_periods - 1
+            periods = [feasible_period * 2**i for i in range(num_periods)]
+            debug.info(1, "Trying feasible period: {0}ns on Port {1}".format(", ".join(str(p) for p in periods), port))
+            sim_results = run_sim_jobs(self.simulate_period, [(p,) for p in periods])
             #Clear these target ports after simulation
             self.targ_read_ports = []
+
+            #The shortest period that works is used
+            for (feasible_period, (success, results)) in zip(periods, sim_results):
+                if success:
+                    break
             
             if not success:
                 feasible_period = 2 * feasible_period
@@ -608,6 +616,10 @@ class delay(simulation):
         #lb_period = 0.0
         #target_period = 0.5 * (ub_period + lb_period)
         
+        #With more than one worker, several periods are tried at once
+        if OPTS.num_threads > 1:
+            return self.find_min_period_one_port_multisection(feasible_delays, port, lb_period, ub_period)
+
         # Binary search algorithm to find the min period (max frequency) of input port
         time_out = 25
         self.targ_read_ports = [port]
@@ -635,6 +647,47 @@ class delay(simulation):
             target_period = 0.5 * (ub_period + lb_period)
             #key=input("press return to continue")
 
+    def find_min_period_one_port_multisection(self, feasible_delays, port, lb_period, ub_period):
+        """
+        Searches for the smallest period like find_min_period_one_port but
+        simulates OPTS.num_threads evenly spaced periods in each round. This
+        narrows the bounds by a factor of OPTS.num_threads+1 per round.
+        """
+        time_out = 25
+        self.targ_read_ports = [port]
+        while True:
+            time_out -= 1
+            if (time_out <= 0):
+                debug.error("Timed out, could not converge on minimum period.",2)
+
+            num_periods = OPTS.num_threads
+            target_periods = [lb_period + (ub_period - lb_period) * (i + 1) / (num_periods + 1) for i in range(num_periods)]
+            debug.info(1, "MinPeriod Search Port {3}: {0}ns (ub: {1} lb: {2})".format(", ".join(str(p) for p in target_periods),
+                                                                             ub_period,
+                                                                             lb_period,
+                                                                             port))
+            passed = run_sim_jobs(self.try_target_period, [(feasible_delays, p) for p in target_periods])
+
+            #The shortest passing period is the new upper bound and the longest failing period below it is the new lower bound.
+            for (target_period, success) in zip(target_periods, passed):
+                if success:
+                    ub_period = target_period
+                    break
+                lb_period = target_period
+
+            if relative_compare(ub_period, lb_period, error_tolerance=0.05):
+                # ub_period is always feasible.
+                return ub_period
+
+    def simulate_period(self, period):
+        """ Simulate a period and return the delay results. """
+        self.period = period
+        return self.run_delay_simulation()
+
+    def try_target_period(self, feasible_delays, period):
+        """ Set the period and check that it works with try_period. """
+        self.period = period
+        return self.try_period(feasible_delays)
         
     def try_period(self, feasible_delays):
         """ 
@@ -774,22 +827,28 @@ class delay(simulation):
         #Set the target simulation ports to all available ports. This make sims slower but failed sims exit anyways.        
         self.targ_read_ports = self.read_ports
         self.targ_write_ports = self.write_ports
-        for slew in slews:
-            for load in loads:
-                self.set_load_slew(load,slew)
-                # Find the delay, dynamic power, and leakage power of the trimmed array.
-                (success, delay_results) = self.run_delay_simulation()
-                debug.check(success,"Couldn't run a simulation. slew={0} load={1}\n".format(self.slew,self.load))
-                debug.info(1, "Simulation Passed: Port {0} slew={1} load={2}".format("All", self.slew,self.load))
-                #The results has a dict for every port but dicts can be empty (e.g. ports were not targeted).
-                for port in self.all_ports:
-                    for mname,value in delay_results[port].items():
-                        if "power" in mname:
-                            # Subtract partial array leakage and add full array leakage for the power measures
-                            measure_data[port][mname].append(value + leakage_offset)
-                        else:
-                            measure_data[port][mname].append(value)
+        #Each pair is an independent simulation so they can run concurrently. The results are merged in sweep order.
+        load_slews = [(load,slew) for slew in slews for load in loads]
+        sim_results = run_sim_jobs(self.simulate_load_slew, load_slews)
+        for ((load,slew),(success, delay_results)) in zip(load_slews, sim_results):
+            debug.check(success,"Couldn't run a simulation. slew={0} load={1}\n".format(slew,load))
+            debug.info(1, "Simulation Passed: Port {0} slew={1} load={2}".format("All", slew,load))
+            #The results has a dict for every port but dicts can be empty (e.g. ports were not targeted).
+            for port in self.all_ports:
+                for mname,value in delay_results[port].items():
+                    if "power" in mname:
+                        # Subtract partial array leakage and add full array leakage for the power measures
+                        measure_data[port][mname].append(value + leakage_offset)
+                    else:
+                        measure_data[port][mname].append(value)
+        self.set_load_slew(*load_slews[-1])
         return measure_data
+
+    def simulate_load_slew(self, load, slew):
+        """Simulate a single output load and input slew pair and return the delay results"""
+        self.set_load_slew(load,slew)
+        # Find the delay, dynamic power, and leakage power of the trimmed array.
+        return self.run_delay_simulation()
     
     def calculate_inverse_address(self):
         """Determine dummy test address based on probe address and column mux size."""
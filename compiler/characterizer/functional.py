@@ -41,6 +41,8 @@ class functional(simulation):
         
         # Number of checks can be changed
         self.num_cycles = 2
+        # Long sequences are split into chunks of this many cycles that are simulated separately
+        self.cycles_per_chunk = 100
         self.stored_words = {}      
         self.write_check = []
         self.read_check = []
@@ -49,8 +51,26 @@ class functional(simulation):
         if feasible_period: #period defaults to tech.py feasible period otherwise.
             self.period = feasible_period
         # Generate a random sequence of reads and writes
-        self.write_random_memory_sequence()
-    
+        cycles = self.gen_random_memory_sequence()
+        
+        # Run a SPICE simulation for each chunk of the sequence. The chunks start from the memory
+        # contents left by the earlier chunks so they are independent and can run concurrently.
+        self.chunks = self.split_memory_sequence(cycles)
+        self.chunk_errors = {}
+        run_sim_jobs(self.run_chunk, self.chunks, self.chunk_progress)
+        
+        # Report the error of the earliest failing chunk
+        if len(self.chunk_errors) > 0:
+            return (0, self.chunk_errors[min(self.chunk_errors)])
+        return (1, "SUCCESS")
+
+    def run_chunk(self, first_cycle, preload_words, cycles):
+        """ Simulate a chunk of the sequence and check the values read. """
+        self.set_stimulus_variables()
+        self.write_check = []
+        self.read_check = []
+        self.write_memory_sequence(first_cycle, preload_words, cycles)
+        
         # Run SPICE simulation
         self.write_functional_stimulus()
         self.stim.run_sim()
@@ -62,41 +82,45 @@ class functional(simulation):
             
         # Check read values with written values. If the values do not match, return an error.
         return self.check_stim_results()
+
+    def chunk_progress(self, index, result):
+        """ Report a simulated chunk and stop the later chunks once one fails. """
+        (success, error) = result
+        (first_cycle, preload_words, cycles) = self.chunks[index]
+        debug.info(1, "Functional cycles {0}-{1} ({2}/{3}): {4}".format(first_cycle,
+                                                                      first_cycle+len(cycles)-1,
+                                                                      index+1,
+                                                                      len(self.chunks),
+                                                                      error))
+        if not success:
+            self.chunk_errors[index] = error
+        return not success
     
-    def write_random_memory_sequence(self):
+    def gen_random_memory_sequence(self):
+        """
+        Generate a random sequence of operations. Each cycle is a list of
+        (operation, address, word) for each port.
+        """
         rw_ops = ["noop", "write", "read"]
         w_ops = ["noop", "write"]
         r_ops = ["noop", "read"]
-        rw_read_din_data = "0"*self.word_size
-        check = 0
-        
-        # First cycle idle
-        comment = self.gen_cycle_comment("noop", "0"*self.word_size, "0"*self.addr_size, 0, self.t_current)
-        self.add_noop_all_ports(comment, "0"*self.addr_size, "0"*self.word_size)
+        noop = ("noop", "0"*self.addr_size, "0"*self.word_size)
+        cycles = []
         
         # Write at least once
         addr = self.gen_addr()
         word = self.gen_data()
-        comment = self.gen_cycle_comment("write", word, addr, 0, self.t_current)
-        self.add_write(comment, addr, word, 0)
+        cycles.append([("write", addr, word) if port == 0 else noop for port in self.all_ports])
         self.stored_words[addr] = word
         
         # Read at least once. For multiport, it is important that one read cycle uses all RW and R port to read from the same address simultaniously.
         # This will test the viablilty of the transistor sizing in the bitcell.
-        for port in self.all_ports:
-            if port in self.write_ports:
-                self.add_noop_one_port("0"*self.addr_size, "0"*self.word_size, port)
-            else:
-                comment = self.gen_cycle_comment("read", word, addr, port, self.t_current)
-                self.add_read_one_port(comment, addr, rw_read_din_data, port)
-                self.write_check.append([word, "{0}{1}".format(self.dout_name,port), self.t_current+self.period, check])
-                check += 1
-        self.cycle_times.append(self.t_current)
-        self.t_current += self.period
+        cycles.append([noop if port in self.write_ports else ("read", addr, word) for port in self.all_ports])
         
         # Perform a random sequence of writes and reads on random ports, using random addresses and random words
         for i in range(self.num_cycles):
             w_addrs = []
+            cycle = []
             for port in self.all_ports:
                 if port in self.readwrite_ports:
                     op = random.choice(rw_ops)
@@ -106,31 +130,75 @@ class functional(simulation):
                     op = random.choice(r_ops)
                     
                 if op == "noop":
-                    addr = "0"*self.addr_size
-                    word = "0"*self.word_size
-                    self.add_noop_one_port(addr, word, port)
+                    cycle.append(noop)
                 elif op == "write":
                     addr = self.gen_addr()
                     word = self.gen_data()
                     # two ports cannot write to the same address
                     if addr in w_addrs:
-                        self.add_noop_one_port("0"*self.addr_size, "0"*self.word_size, port)
+                        cycle.append(noop)
                     else:
-                        comment = self.gen_cycle_comment("write", word, addr, port, self.t_current)
-                        self.add_write_one_port(comment, addr, word, port)
+                        cycle.append(("write", addr, word))
                         self.stored_words[addr] = word
                         w_addrs.append(addr)
                 else:
                     (addr,word) = random.choice(list(self.stored_words.items()))
                     # cannot read from an address that is currently being written to
                     if addr in w_addrs:
-                        self.add_noop_one_port("0"*self.addr_size, "0"*self.word_size, port)
+                        cycle.append(noop)
                     else:
-                        comment = self.gen_cycle_comment("read", word, addr, port, self.t_current)
-                        self.add_read_one_port(comment, addr, rw_read_din_data, port)
-                        self.write_check.append([word, "{0}{1}".format(self.dout_name,port), self.t_current+self.period, check])
-                        check += 1
-                
+                        cycle.append(("read", addr, word))
+            cycles.append(cycle)
+        return cycles
+
+    def split_memory_sequence(self, cycles):
+        """
+        Split the sequence into chunks of (first cycle, preload words, cycles).
+        The preload words are the words written before the chunk that the chunk
+        reads before writing them again.
+        """
+        chunks = []
+        stored_words = {}
+        for first_cycle in range(0, len(cycles), self.cycles_per_chunk):
+            chunk_cycles = cycles[first_cycle:first_cycle+self.cycles_per_chunk]
+            preload_words = {}
+            written = set()
+            for cycle in chunk_cycles:
+                for (op, addr, word) in cycle:
+                    if op == "read" and addr not in written and addr in stored_words:
+                        preload_words[addr] = stored_words[addr]
+                for (op, addr, word) in cycle:
+                    if op == "write":
+                        written.add(addr)
+                        stored_words[addr] = word
+            chunks.append((first_cycle, preload_words, chunk_cycles))
+        return chunks
+
+    def write_memory_sequence(self, first_cycle, preload_words, cycles):
+        """ Add the control values of a chunk of the sequence. """
+        rw_read_din_data = "0"*self.word_size
+        
+        # First cycle idle
+        comment = self.gen_cycle_comment("noop", "0"*self.word_size, "0"*self.addr_size, 0, self.t_current)
+        self.add_noop_all_ports(comment, "0"*self.addr_size, "0"*self.word_size)
+        
+        # Write the words that are read in this chunk but written in an earlier chunk
+        for (addr, word) in sorted(preload_words.items()):
+            comment = self.gen_cycle_comment("write", word, addr, self.write_ports[0], self.t_current)
+            self.add_write(comment, addr, word, self.write_ports[0])
+        
+        for (cycle_num, cycle) in enumerate(cycles, first_cycle):
+            for (port, (op, addr, word)) in zip(self.all_ports, cycle):
+                if op == "noop":
+                    self.add_noop_one_port(addr, word, port)
+                elif op == "write":
+                    comment = self.gen_cycle_comment("write", word, addr, port, self.t_current)
+                    self.add_write_one_port(comment, addr, word, port)
+                else:
+                    comment = self.gen_cycle_comment("read", word, addr, port, self.t_current)
+                    self.add_read_one_port(comment, addr, rw_read_din_data, port)
+                    self.write_check.append([word, "{0}{1}".format(self.dout_name,port), self.t_current+self.period, len(self.write_check), cycle_num])
+            
             self.cycle_times.append(self.t_current)
             self.t_current += self.period
         
@@ -140,24 +208,25 @@ class functional(simulation):
             
     def read_stim_results(self):
         # Extrat DOUT values from spice timing.lis
-        for (word, dout_port, eo_period, check) in self.write_check:
+        for (word, dout_port, eo_period, check, cycle_num) in self.write_check:
             sp_read_value = ""
             for bit in range(self.word_size):
-                value = parse_spice_list("timing", "v{0}.{1}ck{2}".format(dout_port.lower(),bit,check))
+                value = parse_spice_list("timing", "v{0}_{1}ck{2}".format(dout_port.lower(),bit,check))
                 if value > self.v_high:
                     sp_read_value = "1" + sp_read_value
                 elif value < self.v_low:
                     sp_read_value = "0" + sp_read_value
                 else:
-                    error ="FAILED: {0}_{1} value {2} at time {3}n does not fall within noise margins <{4} or >{5}.".format(dout_port,
-                                                                                                                            bit,
-                                                                                                                            value,
-                                                                                                                            eo_period,
-                                                                                                                            self.v_low,
-                                                                                                                            self.v_high)
+                    error ="FAILED: {0}_{1} value {2} read during cycle {3} at time {4}n does not fall within noise margins <{5} or >{6}.".format(dout_port,
+                                                                                                                                                 bit,
+                                                                                                                                                 value,
+                                                                                                                                                 cycle_num,
+                                                                                                                                                 eo_period,
+                                                                                                                                                 self.v_low,
+                                                                                                                                                 self.v_high)
                     return (0, error)
                     
-            self.read_check.append([sp_read_value, dout_port, eo_period, check])                    
+            self.read_check.append([sp_read_value, dout_port, eo_period, check, cycle_num])                    
         return (1, "SUCCESS")
         
     def check_stim_results(self):
@@ -166,7 +235,7 @@ class functional(simulation):
                 error = "FAILED: {0} value {1} does not match written value {2} read during cycle {3} at time {4}n".format(self.read_check[i][1],
                                                                                                                            self.read_check[i][0],
                                                                                                                            self.write_check[i][0],
-                                                                                                                           int((self.read_check[i][2]-self.period)/self.period),
+                                                                                                                           self.read_check[i][4],
                                                                                                                            self.read_check[i][2])
                 return(0, error)
         return(1, "SUCCESS")
@@ -278,7 +347,7 @@ class functional(simulation):
         
         # Generate DOUT value measurements
         self.sf.write("\n * Generation of dout measurements\n")
-        for (word, dout_port, eo_period, check) in self.write_check:
+        for (word, dout_port, eo_period, check, cycle_num) in self.write_check:
             t_intital = eo_period - 0.01*self.period
             t_final = eo_period + 0.01*self.period
             for bit in range(self.word_size):
@@ -85,23 +85,49 @@ class lib:
         
     def characterize_corners(self):
         """ Characterize the list of corners. """
-        for (self.corner,lib_name) in zip(self.corners,self.lib_files):
-            debug.info(1,"Corner: " + str(self.corner))
+        # The corners are independent so they are simulated concurrently. The setup
+        # and hold times are only found for the first corner.
+        self.start_time = datetime.datetime.now()
+        corner_args = [(corner, i==0) for (i,corner) in enumerate(self.corners)]
+        corner_results = run_sim_jobs(self.compute_corner, corner_args, self.corner_progress)
+
+        # The libs and datasheet info are written in order as if each corner was done in turn
+        for (self.corner,lib_name,results) in zip(self.corners,self.lib_files,corner_results):
             (self.process, self.voltage, self.temperature) = self.corner
+            (self.char_sram_results, self.char_port_results, times) = results
+            if times != None:
+                self.times = times
             self.lib = open(lib_name, "w")
             debug.info(1,"Writing to {0}".format(lib_name))
             self.corner_name = lib_name.replace(self.out_dir,"").replace(".lib","")
-            self.characterize()
+            self.write_lib()
             self.lib.close()
             self.parse_info(self.corner,lib_name)
-    
-    def characterize(self):
-        """ Characterize the current corner. """
 
+    def compute_corner(self, corner, setup_hold):
+        """ Characterize a corner and return the delay results and the setup/hold times if requested. """
+        debug.info(1,"Corner: " + str(corner))
+        self.corner = corner
+        (self.process, self.voltage, self.temperature) = self.corner
         self.compute_delay()
-
-        self.compute_setup_hold()
-
+        times = None
+        if setup_hold:
+            self.compute_setup_hold()
+            times = self.times
+        return (self.char_sram_results, self.char_port_results, times)
+
+    def corner_progress(self, index, result):
+        """ Report a finished corner and an estimate of the remaining time. """
+        done = index + 1
+        elapsed = (datetime.datetime.now() - self.start_time).total_seconds()
+        remaining = elapsed / done * (len(self.corners) - done)
+        debug.info(1,"Characterized corner {0} ({1}/{2}). Time left: {3} seconds".format(self.corners[index],
+                                                                                          done,
+                                                                                          len(self.corners),
+                                                                                          round(remaining,1)))
+
+    def write_lib(self):
+        """ Write the lib file of the current corner. """
         self.write_header()
         
         #Loop over all ports. 
@@ -12,7 +12,7 @@ import debug
 from .charutils import *
 import dff
 from globals import OPTS
-
+from . import sim_cache
 
 class setup_hold():
     """
@@ -26,6 +26,10 @@ class setup_hold():
         self.model_name = "dff"
         self.model_location = OPTS.openram_tech + "sp_lib/dff.sp"
         self.period = tech.spice["feasible_period"]
+        # Warm started searches first check this fraction of a period around the hint
+        self.warm_start_margin = 0.01
+        # The feasible bound of the last search
+        self.converged_bound = None
 
         debug.info(2,"Feasible period from technology file: {0} ".format(self.period))
 
@@ -171,10 +175,36 @@ class setup_hold():
 
 
 
-    def bidir_search(self, correct_value, mode):
+    def simulate_time(self, mode, target_time, correct_value):
+        """ Simulate the data edge at a target time and return the clk-to-q and setup/hold measurements. """
+        self.write_stimulus(mode=mode, 
+                            target_time=target_time, 
+                            correct_value=correct_value)
+        self.stim.run_sim()
+        clk_to_q = convert_to_float(parse_spice_list("timing", "clk2q_delay"))
+        setuphold_time = convert_to_float(parse_spice_list("timing", "setup_hold_time"))
+        return (clk_to_q, setuphold_time)
+
+    def try_time(self, mode, target_time, correct_value, ideal_clk_to_q):
+        """ Return the setup/hold time in ns if the data edge at a target time works or None if it fails. """
+        (clk_to_q, setuphold_time) = self.simulate_time(mode, target_time, correct_value)
+        if type(clk_to_q)==float and (clk_to_q<1.1*ideal_clk_to_q) and type(setuphold_time)==float:
+            if mode == "SETUP": # SETUP is clk-din, not din-clk
+                setuphold_time *= -1e9
+            else:
+                setuphold_time *= 1e9
+
+            debug.info(2,"PASS Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
+            return setuphold_time
+        else:
+            debug.info(2,"FAIL Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
+            return None
+
+    def bidir_search(self, correct_value, mode, hint=None):
         """ This will perform a bidirectional search for either setup or hold times.
         It starts with the feasible priod and looks a half period beyond or before it
-        depending on whether we are doing setup or hold. 
+        depending on whether we are doing setup or hold. If a hint is given (the
+        converged bound of a similar search) the bounds are narrowed around it first.
         """
 
         # NOTE: The feasible bound is always feasible. This is why they are different for setup and hold.
@@ -189,12 +219,7 @@ class setup_hold():
             feasible_bound = 2.75*self.period
 
         # Initial check if reference feasible bound time passes for correct_value, if not, we can't start the search!
-        self.write_stimulus(mode=mode, 
-                            target_time=feasible_bound, 
-                            correct_value=correct_value)
-        self.stim.run_sim()
-        ideal_clk_to_q = convert_to_float(parse_spice_list("timing", "clk2q_delay"))
-        setuphold_time = convert_to_float(parse_spice_list("timing", "setup_hold_time"))
+        (ideal_clk_to_q, setuphold_time) = self.simulate_time(mode, feasible_bound, correct_value)
         debug.info(2,"*** {0} CHECK: {1} Ideal Clk-to-Q: {2} Setup/Hold: {3}".format(mode, correct_value,ideal_clk_to_q,setuphold_time))
 
         if type(ideal_clk_to_q)!=float or type(setuphold_time)!=float:
@@ -211,42 +236,46 @@ class setup_hold():
                                                                                        feasible_bound,
                                                                                        2*self.period))
         #raw_input("Press Enter to continue...")
+
+        # Narrow the bounds around the hint. Every check in the bounds moves one of them.
+        if hint != None:
+            margin = self.warm_start_margin * self.period
+            if feasible_bound < infeasible_bound:
+                margin = -margin
+            for target_time in [hint + margin, hint - margin]:
+                if not min(feasible_bound, infeasible_bound) < target_time < max(feasible_bound, infeasible_bound):
+                    continue
+                setuphold_time = self.try_time(mode, target_time, correct_value, ideal_clk_to_q)
+                if setuphold_time != None:
+                    passing_setuphold_time = setuphold_time
+                    feasible_bound = target_time
+                else:
+                    infeasible_bound = target_time
+                    break
+            debug.info(2,"Warm start {0} from {1}: Infeasible: {2} Feasible: {3}".format(mode,
+                                                                                         hint,
+                                                                                         infeasible_bound,
+                                                                                         feasible_bound))
             
-        while True:
+        while not relative_compare(feasible_bound, infeasible_bound, error_tolerance=0.001):
             target_time = (feasible_bound + infeasible_bound)/2
-            self.write_stimulus(mode=mode, 
-                                target_time=target_time, 
-                                correct_value=correct_value)
-
             debug.info(2,"{0} value: {1} Target time: {2} Infeasible: {3} Feasible: {4}".format(mode,
                                                                                                 correct_value,
                                                                                                 target_time,
                                                                                                 infeasible_bound,
                                                                                                 feasible_bound))
 
-
-            self.stim.run_sim()
-            clk_to_q = convert_to_float(parse_spice_list("timing", "clk2q_delay"))
-            setuphold_time = convert_to_float(parse_spice_list("timing", "setup_hold_time"))
-            if type(clk_to_q)==float and (clk_to_q<1.1*ideal_clk_to_q) and type(setuphold_time)==float:
-                if mode == "SETUP": # SETUP is clk-din, not din-clk
-                    setuphold_time *= -1e9
-                else:
-                    setuphold_time *= 1e9
-
-                debug.info(2,"PASS Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
+            setuphold_time = self.try_time(mode, target_time, correct_value, ideal_clk_to_q)
+            if setuphold_time != None:
                 passing_setuphold_time = setuphold_time
                 feasible_bound = target_time
             else:
-                debug.info(2,"FAIL Clk-to-Q: {0} Setup/Hold: {1}".format(clk_to_q,setuphold_time))
                 infeasible_bound = target_time
 
             #raw_input("Press Enter to continue...")
-            if relative_compare(feasible_bound, infeasible_bound, error_tolerance=0.001):
-                debug.info(3,"CONVERGE {0} vs {1}".format(feasible_bound,infeasible_bound))
-                break
-            
 
+        debug.info(3,"CONVERGE {0} vs {1}".format(feasible_bound,infeasible_bound))
+        self.converged_bound = feasible_bound
         debug.info(2,"Converged on {0} time {1}.".format(mode,passing_setuphold_time))
         return passing_setuphold_time
 
@@ -302,29 +331,63 @@ class setup_hold():
         # return times
         
         
-        for self.related_input_slew in related_slews:
-            for self.constrained_input_slew in constrained_slews:
-                debug.info(1, "Clock slew: {0} Data slew: {1}".format(self.related_input_slew,self.constrained_input_slew))
-                LH_setup_time = self.setup_LH_time()
-                debug.info(1, "  Setup Time for low_to_high transition: {0}".format(LH_setup_time))
-                HL_setup_time = self.setup_HL_time()
-                debug.info(1, "  Setup Time for high_to_low transition: {0}".format(HL_setup_time))
-                LH_hold_time = self.hold_LH_time()
-                debug.info(1, "  Hold Time for low_to_high transition: {0}".format(LH_hold_time))
-                HL_hold_time = self.hold_HL_time()
-                debug.info(1, "  Hold Time for high_to_low transition: {0}".format(HL_hold_time))
-                LH_setup.append(LH_setup_time)
-                HL_setup.append(HL_setup_time)
-                LH_hold.append(LH_hold_time)
-                HL_hold.append(HL_hold_time)
+        # Reuse the times of an earlier run with the same DFF, corner and slews
+        if OPTS.use_sim_cache:
+            files = [self.model_location] + tech.spice["fet_models"][self.process]
+            values = [self.corner, self.period, self.warm_start_margin,
+                      list(map(float,related_slews)), list(map(float,constrained_slews))]
+            cache_key = sim_cache.get_data_key("setup_hold", files, values)
+            times = sim_cache.lookup_data(cache_key)
+            if times != None:
+                debug.info(1, "Using cached setup and hold times.")
+                return times
+
+        # The searches of the first slew pair start from the full bounds. The searches of
+        # the other slew pairs start next to the converged bound of the first one. The
+        # hints only depend on the slews so the results are the same with any number of
+        # threads. The searches in each step are independent and run concurrently.
+        searches = [(1, "SETUP"), (0, "SETUP"), (1, "HOLD"), (0, "HOLD")]
+        slew_pairs = [(related_slew, constrained_slew)
+                      for related_slew in related_slews
+                      for constrained_slew in constrained_slews]
+        search_args = [slew_pairs[0] + search + (None,) for search in searches]
+        search_results = run_sim_jobs(self.search_job, search_args)
+        hints = {search: bound for (search, (time, bound)) in zip(searches, search_results)}
+        warm_args = [slew_pair + search + (hints[search],)
+                     for slew_pair in slew_pairs[1:]
+                     for search in searches]
+        search_args += warm_args
+        search_results += run_sim_jobs(self.search_job, warm_args)
+
+        for i in range(0, len(search_args), len(searches)):
+            (self.related_input_slew, self.constrained_input_slew) = search_args[i][:2]
+            (LH_setup_time, HL_setup_time, LH_hold_time, HL_hold_time) = [r[0] for r in search_results[i:i+len(searches)]]
+            debug.info(1, "Clock slew: {0} Data slew: {1}".format(self.related_input_slew,self.constrained_input_slew))
+            debug.info(1, "  Setup Time for low_to_high transition: {0}".format(LH_setup_time))
+            debug.info(1, "  Setup Time for high_to_low transition: {0}".format(HL_setup_time))
+            debug.info(1, "  Hold Time for low_to_high transition: {0}".format(LH_hold_time))
+            debug.info(1, "  Hold Time for high_to_low transition: {0}".format(HL_hold_time))
+            LH_setup.append(LH_setup_time)
+            HL_setup.append(HL_setup_time)
+            LH_hold.append(LH_hold_time)
+            HL_hold.append(HL_hold_time)
                 
         times = {"setup_times_LH": LH_setup,
                  "setup_times_HL": HL_setup,
                  "hold_times_LH": LH_hold,
                  "hold_times_HL": HL_hold
                  }
+        if OPTS.use_sim_cache:
+            sim_cache.store_data(cache_key, times)
         return times
 
+    def search_job(self, related_slew, constrained_slew, correct_value, mode, hint):
+        """ Search the setup or hold time of one slew pair and return it with the converged bound. """
+        self.related_input_slew = related_slew
+        self.constrained_input_slew = constrained_slew
+        time = self.bidir_search(correct_value, mode, hint)
+        return (time, self.converged_bound)
+
     def analytical_setuphold(self,related_slews, constrained_slews):
         """ Just return the fixed setup/hold times from the technology.
         """
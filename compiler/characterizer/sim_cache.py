@@ -0,0 +1,180 @@
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+This is a persistent cache of spice simulation results. A result is
+the measurement output of the simulator and it is found by a hash of the
+stimulus, the contents of the included netlists and models and of the
+files they include, and the simulator. Characterization data derived from
+many simulations can be saved in the same cache.
+"""
+
+import os
+import re
+import json
+import hashlib
+import shutil
+import debug
+from globals import OPTS
+
+# Lines that include another file: .include file, .inc file and .lib file section
+include_regex = re.compile(r"\s*\.inc(?:lude)?\s+[\"']?([^\"'\s]+)[\"']?", re.IGNORECASE)
+lib_regex = re.compile(r"\s*\.lib\s+[\"']?([^\"'\s]+)[\"']?\s+(\S+)", re.IGNORECASE)
+
+def read_netlist(filename):
+    """
+    Return the hash of the lines of a netlist that don't include other
+    files and the list of (file name, line) of the lines that do.
+    """
+    h = hashlib.sha256()
+    includes = []
+    directory = os.path.dirname(filename)
+    with open(filename, "r", errors="replace") as f:
+        for line in f:
+            match = include_regex.match(line) or lib_regex.match(line)
+            if match:
+                include_file = os.path.normpath(os.path.join(directory, match.group(1)))
+                if os.path.isfile(include_file):
+                    # The section of a .lib line stays in the line
+                    includes.append((include_file, line.replace(match.group(1), "")))
+                    continue
+            h.update(line.encode())
+    return (h.hexdigest(), includes)
+
+def file_hash(filename, parents=()):
+    """
+    Return the hash of the contents of a netlist and every file it
+    includes. The names of the included files are not part of the hash
+    because they are in the temp directory which is different for each run.
+    The files are read every time since a netlist in the temp directory can
+    be written again within the resolution of its modification time.
+    """
+    (contents, includes) = read_netlist(filename)
+    h = hashlib.sha256()
+    h.update(contents.encode())
+    for (include_file, line) in includes:
+        h.update(line.encode())
+        # A file that includes itself is only hashed once
+        if include_file not in parents + (filename,):
+            h.update(file_hash(include_file, parents + (filename,)).encode())
+    return h.hexdigest()
+
+def simulator_id():
+    """ Return a string that changes when the simulator changes. """
+    exe = os.path.realpath(OPTS.spice_exe)
+    if os.path.isfile(exe):
+        stat = os.stat(exe)
+        return "{0} {1} {2} {3}".format(OPTS.spice_name, exe, stat.st_mtime, stat.st_size)
+    return "{0} {1}".format(OPTS.spice_name, exe)
+
+def get_key(stim_file):
+    """
+    Return the cache key of a stimulus file. Included files are hashed by
+    their contents rather than their names.
+    """
+    h = hashlib.sha256()
+    h.update(simulator_id().encode())
+    h.update(file_hash(stim_file).encode())
+    return h.hexdigest()
+
+def get_data_key(name, files, values):
+    """
+    Return the cache key of characterization data that depends on the
+    contents of some files, a list of values and the simulator.
+    """
+    h = hashlib.sha256()
+    h.update(simulator_id().encode())
+    h.update(name.encode())
+    for filename in files:
+        h.update(file_hash(filename).encode())
+    h.update(repr(values).encode())
+    return h.hexdigest()
+
+def get_filename(key):
+    """ Return the name of the cached result file for a key. """
+    return os.path.join(OPTS.sim_cache_dir, key)
+
+def lookup(key, output_file):
+    """
+    Copy the cached result for a key to the simulator output file.
+    Return whether the result was found.
+    """
+    cache_file = get_filename(key)
+    if not os.path.isfile(cache_file):
+        return False
+    try:
+        shutil.copyfile(cache_file, output_file)
+        # Mark the result as recently used for the eviction
+        os.utime(cache_file)
+    except OSError:
+        return False
+    debug.info(2, "Using cached simulation result {}".format(key))
+    return True
+
+def store(key, output_file):
+    """ Save the simulator output file as the result for a key. """
+    if not os.path.isfile(output_file):
+        return
+    try:
+        if not os.path.exists(OPTS.sim_cache_dir):
+            os.makedirs(OPTS.sim_cache_dir, 0o750)
+        # Write a temporary file first so that concurrent runs never see a partial result
+        temp_file = "{0}.{1}".format(get_filename(key), os.getpid())
+        shutil.copyfile(output_file, temp_file)
+        os.replace(temp_file, get_filename(key))
+    except OSError as e:
+        debug.warning("Unable to save simulation result: {}".format(e))
+        return
+    evict()
+
+def lookup_data(key):
+    """ Return the cached characterization data for a key or None if there is none. """
+    cache_file = get_filename(key)
+    if not os.path.isfile(cache_file):
+        return None
+    try:
+        with open(cache_file, "r") as f:
+            data = json.load(f)
+        os.utime(cache_file)
+    except (OSError, ValueError):
+        return None
+    debug.info(2, "Using cached characterization data {}".format(key))
+    return data
+
+def store_data(key, data):
+    """ Save characterization data for a key. """
+    try:
+        if not os.path.exists(OPTS.sim_cache_dir):
+            os.makedirs(OPTS.sim_cache_dir, 0o750)
+        temp_file = "{0}.{1}".format(get_filename(key), os.getpid())
+        with open(temp_file, "w") as f:
+            json.dump(data, f)
+        os.replace(temp_file, get_filename(key))
+    except OSError as e:
+        debug.warning("Unable to save characterization data: {}".format(e))
+        return
+    evict()
+
+def evict():
+    """ Remove the least recently used results until the cache fits in OPTS.sim_cache_size (MB). """
+    entries = []
+    for name in os.listdir(OPTS.sim_cache_dir):
+        try:
+            stat = os.stat(os.path.join(OPTS.sim_cache_dir, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+    total_size = sum(e[1] for e in entries)
+    max_size = OPTS.sim_cache_size * 1024 * 1024
+    for (mtime, size, name) in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.remove(os.path.join(OPTS.sim_cache_dir, name))
+        except OSError:
+            continue
+        total_size -= size
@@ -0,0 +1,102 @@
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+This runs a simulator command as an asyncio subprocess with a wall-clock
+timeout. A run that times out or doesn't converge can be run again with
+a lower accuracy. The output of the command is kept with its job.
+
+Each process runs one simulation at a time through stimuli.run_sim, since
+a simulation writes and reads its files in the temp directory. Batches of
+simulations are spread over the processes of charutils.run_sim_jobs,
+which limits them to OPTS.num_threads.
+"""
+
+import os
+import re
+import signal
+import asyncio
+import datetime
+import debug
+
+# Simulator messages that mean the transient analysis did not converge
+convergence_errors = re.compile(r"timestep too small|convergence failure|failed to converge|stepping failed|singular matrix",
+                                re.IGNORECASE)
+
+class sim_job():
+    """
+    A simulator command with its timeout. The standard output and error
+    are saved to files when the command finishes.
+    """
+
+    def __init__(self, cmd, stdout_file, stderr_file, timeout=None):
+        self.cmd = cmd
+        self.stdout_file = stdout_file
+        self.stderr_file = stderr_file
+        # The timeout is in seconds and None (or 0) means there is no limit
+        self.timeout = timeout
+
+        self.retcode = None
+        self.timed_out = False
+        self.stdout = ""
+        self.stderr = ""
+        self.run_time = 0
+
+    def failed(self, valid_retcode=0):
+        """ Return whether the command timed out or returned an error. """
+        return self.timed_out or self.retcode > valid_retcode
+
+    def did_not_converge(self):
+        """ Return whether the command timed out or the simulator reported a convergence problem. """
+        return self.timed_out or convergence_errors.search(self.stdout + self.stderr) != None
+
+    def run(self):
+        """ Run the command, wait for it to finish and save its output. """
+        asyncio.run(self.run_async())
+        return self
+
+    async def run_async(self):
+        """ Run the command and stop it if it reaches the timeout. """
+        debug.info(3, self.cmd)
+        start_time = datetime.datetime.now()
+        # The command is the leader of its own process group so the simulator
+        # is stopped with the shell on a timeout
+        proc = await asyncio.create_subprocess_shell(self.cmd,
+                                                     stdout=asyncio.subprocess.PIPE,
+                                                     stderr=asyncio.subprocess.PIPE,
+                                                     start_new_session=True)
+        try:
+            (stdout, stderr) = await asyncio.wait_for(proc.communicate(), self.timeout or None)
+        except asyncio.TimeoutError:
+            self.timed_out = True
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            (stdout, stderr) = await proc.communicate()
+        self.retcode = proc.returncode
+        self.run_time = (datetime.datetime.now() - start_time).total_seconds()
+
+        self.stdout = stdout.decode(errors="replace")
+        self.stderr = stderr.decode(errors="replace")
+        with open(self.stdout_file, "w") as f:
+            f.write(self.stdout)
+        with open(self.stderr_file, "w") as f:
+            f.write(self.stderr)
+
+
+def run_sim_job(cmd, stdout_file, stderr_file, timeout=None, retries=0, relax=None):
+    """
+    Run a simulator command and return its last sim_job. A run that times out
+    or doesn't converge is run again up to retries times. Before each retry
+    relax is called to lower the accuracy and no retry is made if it returns False.
+    """
+    for retry in range(retries+1):
+        job = sim_job(cmd, stdout_file, stderr_file, timeout).run()
+        if not job.did_not_converge() or retry == retries or relax == None or not relax():
+            break
+    return job
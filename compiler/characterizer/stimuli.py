@@ -13,11 +13,13 @@ simulations as well.
 
 import tech
 import debug
-import subprocess
 import os
 import sys
 import numpy as np
 from globals import OPTS
+from . import sim_cache
+from .sim_manager import run_sim_job
+from .charutils import clear_spice_measures
 
 
 class stimuli():
@@ -252,28 +254,13 @@ class stimuli():
     def write_control(self, end_time, runlvl=4):
         """ Write the control cards to run and end the simulation """
         
-        # These are guesses... 
-        if runlvl==1:
-            reltol = 0.02 # 2%
-        elif runlvl==2:
-            reltol = 0.01 # 1%
-        elif runlvl==3:
-            reltol = 0.005 # 0.5%
-        else:
-            reltol = 0.001 # 0.1%
         timestep = 10 #ps, was 5ps but ngspice was complaining the timestep was too small in certain tests.
            
         # UIC is needed for ngspice to converge
         self.sf.write(".TRAN {0}p {1}n UIC\n".format(timestep,end_time))
         self.sf.write(".TEMP {}\n".format(self.temperature))
-        if OPTS.spice_name == "ngspice":
-            # ngspice sometimes has convergence problems if not using gear method
-            # which is more accurate, but slower than the default trapezoid method
-            # Do not remove this or it may not converge due to some "pa_00" nodes
-            # unless you figure out what these are.
-            self.sf.write(".OPTIONS POST=1 RELTOL={0} PROBE method=gear\n".format(reltol))
-        else:
-            self.sf.write(".OPTIONS POST=1 RUNLVL={0} PROBE\n".format(runlvl))
+        self.runlvl = runlvl
+        self.sf.write(self.get_options(runlvl))
 
         # create plots for all signals
         self.sf.write("* probe is used for hspice/xa, while plot is used in ngspice\n")
@@ -290,6 +277,44 @@ class stimuli():
         self.sf.write(".end\n\n")
 
 
+    def get_options(self, runlvl):
+        """ Return the options card for an accuracy level """
+        
+        # These are guesses... 
+        if runlvl==1:
+            reltol = 0.02 # 2%
+        elif runlvl==2:
+            reltol = 0.01 # 1%
+        elif runlvl==3:
+            reltol = 0.005 # 0.5%
+        else:
+            reltol = 0.001 # 0.1%
+        if OPTS.spice_name == "ngspice":
+            # ngspice sometimes has convergence problems if not using gear method
+            # which is more accurate, but slower than the default trapezoid method
+            # Do not remove this or it may not converge due to some "pa_00" nodes
+            # unless you figure out what these are.
+            return ".OPTIONS POST=1 RELTOL={0} PROBE method=gear\n".format(reltol)
+        else:
+            return ".OPTIONS POST=1 RUNLVL={0} PROBE\n".format(runlvl)
+
+    def relax_control(self, temp_stim):
+        """
+        Lower the accuracy level in the options card of a written stimulus file.
+        Returns False if it is already at the lowest level.
+        """
+        if self.runlvl <= 1:
+            return False
+        self.runlvl -= 1
+        with open(temp_stim, "r") as f:
+            lines = f.readlines()
+        with open(temp_stim, "w") as f:
+            for line in lines:
+                if line.upper().startswith(".OPTIONS POST=1"):
+                    line = self.get_options(self.runlvl)
+                f.write(line)
+        return True
+
     def write_include(self, circuit):
         """Writes include statements, inputs are lists of model files"""
         includes = self.device_models + [circuit]
@@ -313,28 +338,46 @@ class stimuli():
         self.sf.write("\n*Nodes gnd and 0 are the same global ground node in ngspice/hspice/xa. Otherwise, this source may be needed.\n")
         self.sf.write("*V{0} {0} {1} {2}\n".format(self.gnd_name, gnd_node_name, 0.0))
 
-    def run_sim(self):
-        """ Run hspice in batch mode and output rawfile to parse. """
+    def run_sim(self, threads=None):
+        """
+        Run hspice in batch mode and output rawfile to parse. The number of
+        simulator threads defaults to OPTS.spice_threads.
+        """
         temp_stim = "{0}stim.sp".format(OPTS.openram_temp)
         import datetime
         start_time = datetime.datetime.now()
         debug.check(OPTS.spice_exe!="","No spice simulator has been found.")
+        # The measurements of the previous simulation are out of date
+        clear_spice_measures()
+
+        if OPTS.spice_name == "xa":
+            output_file = "{}xa.meas".format(OPTS.openram_temp)
+        else:
+            output_file = "{}timing.lis".format(OPTS.openram_temp)
+        # Identical simulations from this or earlier runs are not simulated again
+        if OPTS.use_sim_cache:
+            cache_key = sim_cache.get_key(temp_stim)
+            if sim_cache.lookup(cache_key, output_file):
+                return
     
+        if threads == None:
+            threads = OPTS.spice_threads
         if OPTS.spice_name == "xa":
             # Output the xa configurations here. FIXME: Move this to write it once.
             xa_cfg = open("{}xa.cfg".format(OPTS.openram_temp), "w")
             xa_cfg.write("set_sim_level -level 7\n")
             xa_cfg.write("set_powernet_level 7 -node vdd\n")
             xa_cfg.close()
-            cmd = "{0} {1} -c {2}xa.cfg -o {2}xa -mt 2".format(OPTS.spice_exe,
-                                                               temp_stim,
-                                                               OPTS.openram_temp)
+            cmd = "{0} {1} -c {2}xa.cfg -o {2}xa -mt {3}".format(OPTS.spice_exe,
+                                                                 temp_stim,
+                                                                 OPTS.openram_temp,
+                                                                 threads)
             valid_retcode=0
         elif OPTS.spice_name == "hspice":
-            # TODO: Should make multithreading parameter a configuration option
-            cmd = "{0} -mt 2 -i {1} -o {2}timing".format(OPTS.spice_exe,
-                                                         temp_stim,
-                                                         OPTS.openram_temp)
+            cmd = "{0} -mt {3} -i {1} -o {2}timing".format(OPTS.spice_exe,
+                                                           temp_stim,
+                                                           OPTS.openram_temp,
+                                                           threads)
             valid_retcode=0
         else:
             # ngspice 27+ supports threading with "set num_threads=4" in the stimulus file or a .spiceinit 
@@ -344,21 +387,32 @@ class stimuli():
             # for some reason, ngspice-25 returns 1 when it only has acceptable warnings
             valid_retcode=1
 
-        
-        spice_stdout = open("{0}spice_stdout.log".format(OPTS.openram_temp), 'w')
-        spice_stderr = open("{0}spice_stderr.log".format(OPTS.openram_temp), 'w')
-        
-        debug.info(3, cmd)
-        retcode = subprocess.call(cmd, stdout=spice_stdout, stderr=spice_stderr, shell=True)
-
-        spice_stdout.close()
-        spice_stderr.close()
-        
-        if (retcode > valid_retcode):
+        # Simulations that time out or don't converge are tried again with a lower accuracy
+        def relax():
+            if not self.relax_control(temp_stim):
+                return False
+            debug.warning("Spice simulation did not converge. Retrying with RUNLVL={}.".format(self.runlvl))
+            return True
+        runlvl = self.runlvl
+        job = run_sim_job(cmd,
+                          "{0}spice_stdout.log".format(OPTS.openram_temp),
+                          "{0}spice_stderr.log".format(OPTS.openram_temp),
+                          OPTS.sim_timeout,
+                          OPTS.sim_retries,
+                          relax)
+        relaxed = self.runlvl != runlvl
+
+        if job.timed_out:
+            debug.error("Spice simulation timed out after {0} seconds: {1}".format(OPTS.sim_timeout, cmd), -1)
+        elif job.failed(valid_retcode):
             debug.error("Spice simulation error: " + cmd, -1)
         else:
             end_time = datetime.datetime.now()
             delta_time = round((end_time-start_time).total_seconds(),1)
             debug.info(2,"*** Spice: {} seconds".format(delta_time))
+            # The key is of the stimulus at full accuracy, so a result of a relaxed
+            # simulation is not stored under it
+            if OPTS.use_sim_cache and not relaxed:
+                sim_cache.store(cache_key, output_file)
 
     
@@ -6,38 +6,146 @@
 #All rights reserved.
 #
 import debug
+import tech
 from math import log
 import re
 
+class spice_subckt():
+    """
+    A subcircuit of a parsed spice netlist. Instances are tuples of the
+    instance name, the connected nets, the master subcircuit (None for
+    devices), the channel (source/drain) nets of devices and the netlist
+    lines of the instance.
+    """
+
+    def __init__(self, name, ports):
+        self.name = name
+        self.ports = ports
+        self.insts = []
+        # The nets connected to each instance index
+        self.net_insts = {}
+
+    def add_inst(self, name, nets, master, channel_nets, lines):
+        for net in nets:
+            self.net_insts.setdefault(net, set()).add(len(self.insts))
+        self.insts.append((name, nets, master, channel_nets, lines))
+
+    def is_array(self):
+        """ An array has at least two instances and every subcircuit in it is used more than once. """
+        if len(self.insts) < 2:
+            return False
+        masters = [inst[2] for inst in self.insts]
+        return None not in masters and all(masters.count(m) > 1 for m in set(masters))
+
+
 class trim_spice():
     """
-    A utility to trim redundant parts of an SRAM spice netlist. 
+    A utility to trim redundant parts of an SRAM spice netlist.
     Input is an SRAM spice file. Output is an equivalent netlist
     that works for a single address and range of data bits.
     """
 
     def __init__(self, spfile, reduced_spfile):
         self.sp_file = spfile
-        self.reduced_spfile = reduced_spfile        
+        self.reduced_spfile = reduced_spfile
 
         debug.info(1,"Trimming non-critical cells to speed-up characterization: {}.".format(reduced_spfile))
-        
+
         # Load the file into a buffer for performance
         sp = open(self.sp_file, "r")
         self.spice = sp.readlines()
         sp.close()
         for i in range(len(self.spice)):
             self.spice[i] = self.spice[i].rstrip(" \n")
-        
 
         self.sp_buffer = self.spice
 
+        # Channel connections through the supplies do not carry signals
+        self.supply_nets = set([tech.spice["vdd_name"], tech.spice["gnd_name"], "0"])
+        self.parse_netlist()
+
+    def parse_netlist(self):
+        """ Index the subcircuits, instances and nets of the netlist. """
+        self.subckts = {}
+        # The order of subcircuits in the file. The last one is the top level.
+        self.subckt_names = []
+        subckt = None
+        i = 0
+        while i < len(self.spice):
+            # Join continuation lines
+            first = i
+            line = self.spice[i]
+            i += 1
+            while i < len(self.spice) and self.spice[i].startswith("+"):
+                line += " " + self.spice[i][1:]
+                i += 1
+            tokens = line.split()
+            if len(tokens) == 0 or tokens[0].startswith("*"):
+                continue
+            keyword = tokens[0].lower()
+            if keyword == ".subckt":
+                subckt = spice_subckt(tokens[1], [t for t in tokens[2:] if "=" not in t])
+                self.subckts[subckt.name] = subckt
+                self.subckt_names.append(subckt.name)
+            elif keyword == ".ends":
+                subckt = None
+            elif subckt != None and keyword[0] == "x":
+                nets = [t for t in tokens[1:] if "=" not in t]
+                subckt.add_inst(tokens[0], nets[:-1], nets[-1], [], range(first, i))
+            elif subckt != None and keyword[0] == "m":
+                # Drain, gate, source and body
+                subckt.add_inst(tokens[0], tokens[1:5], None, [tokens[1], tokens[3]], range(first, i))
+            elif subckt != None and keyword[0] in "rcdlq":
+                subckt.add_inst(tokens[0], tokens[1:3], None, tokens[1:3], range(first, i))
+
+        # The port connectivity of each subcircuit is needed for the reachability
+        self.channel_groups = {}
+        for name in self.subckt_names:
+            self.find_channel_groups(name)
+
+    def find_channel_groups(self, name):
+        """
+        Find the groups of ports of a subcircuit that are connected through
+        the channels of its devices (not counting the supplies). Ports that are
+        only gates are not in any group.
+        """
+        if name in self.channel_groups:
+            return self.channel_groups[name]
+        subckt = self.subckts[name]
+        parent = {}
+        def find(net):
+            while parent[net] != net:
+                parent[net] = parent[parent[net]]
+                net = parent[net]
+            return net
+        def union(nets):
+            nets = [n for n in nets if n not in self.supply_nets]
+            for net in nets:
+                parent.setdefault(net, net)
+            for net in nets[1:]:
+                parent[find(net)] = find(nets[0])
+
+        for (inst_name, nets, master, channel_nets, lines) in subckt.insts:
+            if master == None:
+                union(channel_nets)
+            elif master in self.subckts:
+                master_ports = self.subckts[master].ports
+                for group in self.find_channel_groups(master):
+                    union([nets[master_ports.index(port)] for port in group])
+
+        groups = {}
+        for port in subckt.ports:
+            if port in parent:
+                groups.setdefault(find(port), []).append(port)
+        self.channel_groups[name] = list(groups.values())
+        return self.channel_groups[name]
+
     def set_configuration(self, banks, rows, columns, word_size):
         """ Set the configuration of SRAM sizes that we are simulating.
-        Need the: number of banks, number of rows in each bank, number of 
+        Need the: number of banks, number of rows in each bank, number of
         columns in each bank, and data word size."""
         self.num_banks = banks
-        self.num_rows = rows        
+        self.num_rows = rows
         self.num_columns = columns
         self.word_size = word_size
 
@@ -52,9 +160,6 @@ class trim_spice():
         """ Reduce the spice netlist but KEEP the given bits at the
         address (and things that will add capacitive load!)"""
 
-        # Always start fresh if we do multiple reductions
-        self.sp_buffer = self.spice
-
         # Split up the address and convert to an int
         wl_address = int(address[self.col_addr_size:],2)
         if self.col_addr_size>0:
@@ -66,83 +171,179 @@ class trim_spice():
         bl_name = "bl_{}".format(int(self.words_per_row*data_bit + col_address))
 
         # Prepend info about the trimming
+        header = ["* WARNING: This is a TRIMMED NETLIST.",
+                  "* It should NOT be used for LVS!!"]
         addr_msg = "Keeping {} address".format(address)
-        self.sp_buffer.insert(0, "* "+addr_msg)
-        debug.info(1,addr_msg)
         data_msg = "Keeping {} data bit".format(data_bit)
-        self.sp_buffer.insert(0, "* "+data_msg)
-        debug.info(1,data_msg)
         bl_msg = "Keeping {} (trimming other BLs)".format(bl_name)
         wl_msg = "Keeping {} (trimming other WLs)".format(wl_name)
-        self.sp_buffer.insert(0, "* "+bl_msg)
-        debug.info(1,bl_msg)
-        self.sp_buffer.insert(0, "* "+wl_msg)
-        debug.info(1,wl_msg)
-        self.sp_buffer.insert(0, "* It should NOT be used for LVS!!")
-        self.sp_buffer.insert(0, "* WARNING: This is a TRIMMED NETLIST.")
-        
-        
-        wl_regex = r"wl\d*_{}".format(wl_address)
-        bl_regex = r"bl\d*_{}".format(int(self.words_per_row*data_bit + col_address))
-        self.remove_insts("bitcell_array",[wl_regex,bl_regex])
-
-        # 2. Keep sense amps basd on BL
-        # FIXME: The bit lines are not indexed the same in sense_amp_array
-        #self.remove_insts("sense_amp_array",[bl_regex])
-
-        # 3. Keep column muxes basd on BL
-        self.remove_insts("column_mux_array",[bl_regex])
-        
-        # 4. Keep write driver based on DATA
-        data_regex = r"data_{}".format(data_bit)
-        self.remove_insts("write_driver_array",[data_regex])
-
-        # 5. Keep wordline driver based on WL
-        # Need to keep the gater too
-        #self.remove_insts("wordline_driver",wl_regex)
-        
-        # 6. Keep precharges based on BL
-        self.remove_insts("precharge_array",[bl_regex])
-        
-        # Everything else isn't worth removing. :)
-        
-        # Finally, write out the buffer as the new reduced file
+        for msg in [wl_msg, bl_msg, data_msg, addr_msg]:
+            header.append("* "+msg)
+            debug.info(1,msg)
+
+        wl_regex = r"wl\d*_{}$".format(wl_address)
+        bl_regex = r"b[lr]\d*_{}$".format(int(self.words_per_row*data_bit + col_address))
+        # Removed instances are indexed by subcircuit name
+        self.removed_insts = {}
+        self.trim_arrays(wl_regex, bl_regex)
+
+        # Report the instances and devices that were removed
+        for name in self.subckt_names:
+            if len(self.removed_insts.get(name, [])) > 0:
+                msg = "Removed {0} of {1} instances from {2} subcircuit.".format(len(self.removed_insts[name]),
+                                                                                 len(self.subckts[name].insts),
+                                                                                 name)
+                header.append("* "+msg)
+                debug.info(2,msg)
+        top_name = self.subckt_names[-1]
+        total_devices = self.count_devices(top_name, {}, False)
+        kept_devices = self.count_devices(top_name, {}, True)
+        msg = "Removed {0} of {1} devices.".format(total_devices-kept_devices, total_devices)
+        header.append("* "+msg)
+        debug.info(1,msg)
+
+        # Finally, write out the netlist without the removed instances as the new reduced file
+        removed_lines = set()
+        for (name, insts) in self.removed_insts.items():
+            for index in insts:
+                removed_lines.update(self.subckts[name].insts[index][4])
+        self.sp_buffer = header + [line for (i,line) in enumerate(self.spice) if i not in removed_lines]
         sp = open(self.reduced_spfile, "w")
         sp.write("\n".join(self.sp_buffer))
         sp.close()
 
-        
-    def remove_insts(self, subckt_name, keep_inst_list):
-        """This will remove all of the instances in the list from the named
-        subckt that DO NOT contain a term in the list.  It just does a
-        match of the line with a term so you can search for a single
-        net connection, the instance name, anything..
+    def find_bitcell_array(self):
+        """
+        Return the name of the bitcell array subcircuit which is the largest
+        array with the ports of the last row and column.
+        """
+        candidates = []
+        for subckt in self.subckts.values():
+            ports = " ".join(subckt.ports)
+            if subckt.is_array() \
+               and re.search(r"\bwl\d*_{}\b".format(self.num_rows-1), ports) \
+               and re.search(r"\bbl\d*_{}\b".format(self.num_columns-1), ports):
+                candidates.append((len(subckt.insts), subckt.name))
+        debug.check(len(candidates)>0, "Could not find the bitcell array to trim.")
+        return max(candidates)[1]
+
+    def trim_arrays(self, wl_regex, bl_regex):
+        """
+        Trim the bitcell array to the cells on the probed WL and BLs (their load)
+        and every other array next to it to the instances that are reachable
+        from them. An instance is reachable if it connects to a reachable net
+        and its channels connect the net to further nets.
+        """
+        array_name = self.find_bitcell_array()
+        array = self.subckts[array_name]
+        probe_ports = [p for p in array.ports if re.match(wl_regex, p) or re.match(bl_regex, p)]
+        self.keep_insts(array_name, self.connected_insts(array, probe_ports))
+
+        for parent in self.subckts.values():
+            array_insts = [inst for inst in parent.insts if inst[2] == array_name]
+            if len(array_insts) == 0:
+                continue
+            # The probed nets of the parent
+            reached = set()
+            for inst in array_insts:
+                reached.update(inst[1][array.ports.index(p)] for p in probe_ports)
+
+            # Other arrays can reach more nets of the parent so this repeats until nothing changes
+            other_arrays = [inst for inst in parent.insts
+                            if inst[2] != array_name and inst[2] in self.subckts and self.subckts[inst[2]].is_array()]
+            kept = {}
+            changed = True
+            while changed:
+                changed = False
+                for (inst_name, nets, master, channel_nets, lines) in other_arrays:
+                    master_ports = self.subckts[master].ports
+                    (master_kept, master_reached) = self.reachable_insts(master, [p for (p,n) in zip(master_ports, nets) if n in reached])
+                    kept.setdefault(master, set()).update(master_kept)
+                    new_nets = set(nets[master_ports.index(p)] for p in master_reached) - reached
+                    if len(new_nets) > 0:
+                        reached.update(new_nets)
+                        changed = True
+
+            for (master, master_kept) in kept.items():
+                # An array that isn't reached is left alone
+                if len(master_kept) > 0:
+                    self.keep_insts(master, master_kept)
+
+    def connected_insts(self, subckt, nets):
+        """ Return the indices of the instances of a subcircuit that connect to any of the nets. """
+        insts = set()
+        for net in nets:
+            insts.update(subckt.net_insts.get(net, []))
+        return insts
+
+    def reachable_insts(self, name, ports):
+        """
+        Return the indices of the instances of a subcircuit that connect to
+        nets reachable from the ports and the reachable ports. Reachable nets
+        are connected through the channels of an instance. The gate inputs of
+        reachable instances are reachable too if they are driven inside the
+        subcircuit. The other instances on the input ports of the kept
+        instances (e.g. the enables) are kept too so that the drivers of
+        these ports see their full load.
         """
-        removed_insts = 0
-        #Expects keep_inst_list are regex patterns. Compile them here.
-        compiled_patterns = [re.compile(pattern) for pattern in keep_inst_list]
-        
-        start_name = ".SUBCKT {}".format(subckt_name)
-        end_name = ".ENDS {}".format(subckt_name)
-
-        in_subckt=False
-        new_buffer=[]
-        for line in self.sp_buffer:
-            if start_name in line:
-                new_buffer.append(line)
-                in_subckt=True
-            elif end_name in line:
-                new_buffer.append(line)
-                in_subckt=False
-            elif in_subckt:
-                removed_insts += 1
-                for pattern in compiled_patterns:
-                    if pattern.search(line) != None:
-                        new_buffer.append(line)
-                        removed_insts -= 1
-                        break
-            else:
-                new_buffer.append(line)
-
-        self.sp_buffer = new_buffer
-        debug.info(2, "Removed {} instances from {} subcircuit.".format(removed_insts, subckt_name))
+        subckt = self.subckts[name]
+        reached = set(ports)
+        kept = set()
+        input_ports = set()
+        pending = list(ports)
+        while len(pending) > 0:
+            net = pending.pop()
+            if net in self.supply_nets:
+                continue
+            for index in subckt.net_insts.get(net, []):
+                kept.add(index)
+                (inst_name, nets, master, channel_nets, lines) = subckt.insts[index]
+                if master == None:
+                    groups = [channel_nets] if net in channel_nets else []
+                    gates = [n for n in nets if n not in channel_nets]
+                elif master in self.subckts:
+                    master_ports = self.subckts[master].ports
+                    groups = [[nets[master_ports.index(p)] for p in group] for group in self.channel_groups[master]]
+                    channel = set(n for group in groups for n in group)
+                    groups = [group for group in groups if net in group]
+                    gates = [n for n in nets if n not in channel]
+                else:
+                    continue
+                input_ports.update(n for n in gates if n in subckt.ports)
+                new_nets = set(n for group in groups for n in group)
+                # A reachable instance needs its internal inputs driven
+                if len(groups) > 0:
+                    new_nets.update(n for n in gates if n not in subckt.ports)
+                for new_net in new_nets - reached:
+                    reached.add(new_net)
+                    pending.append(new_net)
+        # The load is kept but it isn't followed any further
+        kept.update(self.connected_insts(subckt, input_ports - self.supply_nets))
+        return (kept, [p for p in subckt.ports if p in reached])
+
+    def keep_insts(self, name, kept):
+        """
+        Remove all of the instances of a subcircuit except the kept ones. A
+        subcircuit that is trimmed more than once only loses the instances
+        that none of the calls keep.
+        """
+        removed = set(range(len(self.subckts[name].insts))) - set(kept)
+        if name in self.removed_insts:
+            removed &= self.removed_insts[name]
+        self.removed_insts[name] = removed
+
+    def count_devices(self, name, counts, trimmed):
+        """ Count the devices in a subcircuit including its hierarchy with or without the removed instances. """
+        if name in counts:
+            return counts[name]
+        removed = self.removed_insts.get(name, set()) if trimmed else set()
+        count = 0
+        for (index, (inst_name, nets, master, channel_nets, lines)) in enumerate(self.subckts[name].insts):
+            if index in removed:
+                continue
+            if master == None:
+                count += 1
+            elif master in self.subckts:
+                count += self.count_devices(master, counts, trimmed)
+        counts[name] = count
+        return count
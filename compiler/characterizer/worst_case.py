@@ -28,9 +28,11 @@ class worst_case(delay):
         delay.__init__(self,sram,spfile,corner)
         
       
-    def analyze(self,probe_address, probe_data, slews, loads):
+    def analyze(self,probe_address, probe_data, slews, loads, test_bits=None):
         """
-        Main function to test the delays of different bits.
+        Main function to test the delays of different bits. The bits are a
+        list of (address, data position) tuples and default to get_test_bits.
+        Returns the delays of each bit and the bit with the largest delay.
         """
         debug.check(OPTS.num_rw_ports < 2 and OPTS.num_w_ports < 1 and OPTS.num_r_ports < 1 ,
                     "Bit testing does not currently support multiport.")
@@ -38,7 +40,9 @@ class worst_case(delay):
         char_sram_data = {}
         
         self.set_probe(probe_address, probe_data)
-        #self.prepare_netlist()
+        self.create_signal_names()
+        self.create_measurement_names()
+        self.create_measurement_objects()
         
         self.load=max(loads)
         self.slew=max(slews)
@@ -47,31 +51,47 @@ class worst_case(delay):
         feasible_delays = self.find_feasible_period()
         
         # 2) Find the delays of several bits
-        test_bits = self.get_test_bits()
+        if test_bits == None:
+            test_bits = self.get_test_bits()
         bit_delays = self.simulate_for_bit_delays(test_bits)
         
         for i in range(len(test_bits)):
             debug.info(1, "Bit tested: addr {0[0]} data_pos {0[1]}\n Values {1}".format(test_bits[i], bit_delays[i]))
+
+        # 3) The worst bit has the largest read delay
+        delay_map = dict(zip(test_bits, bit_delays))
+        worst_bit = max(test_bits, key=lambda bit: self.get_max_delay(delay_map[bit]))
+        debug.info(1, "Worst bit: addr {0[0]} data_pos {0[1]} delay {1}ns".format(worst_bit,
+                                                                                 self.get_max_delay(delay_map[worst_bit])))
+        return (delay_map, worst_bit)
+
+    def get_max_delay(self, bit_delay):
+        """Returns the largest delay measurement of a bit"""
+        return max(value for (mname, value) in bit_delay.items() if "delay" in mname)
     
     def simulate_for_bit_delays(self, test_bits):
-        """Simulates the delay of the sram of over several bits."""
-        bit_delays = [{} for i in range(len(test_bits))]
-        
+        """Simulates the delay of the sram of over several bits. Each bit has its own trimmed netlist
+        so the bits can be simulated concurrently."""
         #Assumes a bitcell with only 1 rw port. (6t, port 0)
         port = 0
         self.targ_read_ports = [self.read_ports[port]]
         self.targ_write_ports = [self.write_ports[port]]
         
-        for i in range(len(test_bits)):
-            (bit_addr, bit_data) = test_bits[i]
-            self.set_probe(bit_addr, bit_data)
-            debug.info(1,"Delay bit test: period {}, addr {}, data_pos {}".format(self.period, bit_addr, bit_data))
-            (success, results)=self.run_delay_simulation()
+        bit_results = run_sim_jobs(self.simulate_bit_delay, test_bits)
+        bit_delays = []
+        for ((bit_addr, bit_data), (success, results)) in zip(test_bits, bit_results):
             debug.check(success, "Bit Test Failed: period {}, addr {}, data_pos {}".format(self.period, bit_addr, bit_data))
-            bit_delays[i] = results[port]
+            bit_delays.append(results[port])
             
         return bit_delays
-        
+
+    def simulate_bit_delay(self, bit_addr, bit_data):
+        """Trims the netlist for a bit and simulates its delay"""
+        self.set_probe(bit_addr, bit_data)
+        # The measurements are on the data bit and bitlines of the probe
+        self.create_measurement_objects()
+        debug.info(1,"Delay bit test: period {}, addr {}, data_pos {}".format(self.period, bit_addr, bit_data))
+        return self.run_delay_simulation()
         
     def get_test_bits(self):
         """Statically determines address and bit values to test"""
@@ -80,5 +100,22 @@ class worst_case(delay):
         data_positions = [0, (self.word_size-1)//2, 0, self.word_size-1]
         #Return them in a tuple form
         return [(bit_addrs[i], data_positions[i]) for i in range(len(bit_addrs))]
-        
-    
+
+    def get_sampled_bits(self, num_samples=3):
+        """Samples the array evenly with up to num_samples rows, columns of the column mux and data positions,
+        including the first and last of each. Returns them as (address, data position) tuples."""
+        def sample(size):
+            if size <= 1 or num_samples <= 1:
+                return [size-1]
+            return sorted(set(int(round(i*(size-1)/(num_samples-1))) for i in range(num_samples)))
+
+        col_addr_size = self.sram.col_addr_size
+        row_addr_size = self.addr_size - col_addr_size
+        test_bits = []
+        for row in sample(2**row_addr_size):
+            for col in sample(2**col_addr_size):
+                col_addr = format(col, "0{}b".format(col_addr_size)) if col_addr_size>0 else ""
+                bit_addr = col_addr + format(row, "0{}b".format(row_addr_size))
+                for data_pos in sample(self.word_size):
+                    test_bits.append((bit_addr, data_pos))
+        return test_bits
@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 import struct
+import mmap
+import numpy as np
 from .gdsPrimitives import *
 
 class Gds2reader:
@@ -10,6 +12,9 @@ class Gds2reader:
 
     def __init__(self,layoutObject,debugToTerminal = 0):
         self.fileHandle = None
+        # The memory map of the file and the iterator over its records
+        self.fileMap = None
+        self.records = None
         self.layoutObject = layoutObject
         self.debugToTerminal=debugToTerminal
 	
@@ -71,8 +76,35 @@ class Gds2reader:
         newFloat = struct.unpack('>d',asciiDouble)[0]
         print("Check:"+str(newFloat))
     
+    def scanRecords(self):
+        """
+        Walk the record headers of the memory mapped file in one pass and
+        yield the data of each record.
+        """
+        global offset
+        fileMap = self.fileMap
+        fileSize = len(fileMap)
+        position = 0
+        while position+2 <= fileSize:
+            recordLength = struct.unpack_from(">H",fileMap,position)[0]
+            # The end of the library may be padded with zeros
+            if recordLength < 2:
+                break
+            offset += recordLength
+            yield fileMap[position+2:position+recordLength]
+            position += recordLength
+
+    def readCoordinates(self,record):
+        """
+        Decode the XY points of a record into a list of (x,y) tuples.
+        """
+        points = np.frombuffer(record,dtype='>i4',offset=2).tolist()
+        return list(zip(points[0::2],points[1::2]))
+
     def readNextRecord(self):
         global offset
+        if self.records != None:
+            return next(self.records,None)
         recordLengthAscii = self.fileHandle.read(2) #first 2 bytes tell us the length of the record
         if len(recordLengthAscii)==0:
             return 
@@ -207,13 +239,10 @@ class Gds2reader:
                 if(self.debugToTerminal==1):
                     print("\t\t\tData Type: "+str(dataType))
             elif(idBits==b'\x10\x03'):  #XY Data Points
-                numDataPoints = len(record)-2  #packed as XY coordinates 4 bytes each
-                thisBoundary.coordinates=[]
-                for index in range(2,numDataPoints+2,8):  #incorporate the 2 byte offset
-                    x=struct.unpack(">i",record[index:index+4])[0]
-                    y=struct.unpack(">i",record[index+4:index+8])[0]
-                    thisBoundary.coordinates+=[(x,y)]
-                    if(self.debugToTerminal==1):
+                #packed as XY coordinates 4 bytes each
+                thisBoundary.coordinates=self.readCoordinates(record)
+                if(self.debugToTerminal==1):
+                    for (x,y) in thisBoundary.coordinates:
                         print("\t\t\tXY Point: "+str(x)+","+str(y))
             elif(idBits==b'\x11\x00'):  #End Of Element
                 break;
@@ -257,13 +286,10 @@ class Gds2reader:
                 if(self.debugToTerminal==1):
                     print("\t\t\tPath Width: "+str(pathWidth))
             elif(idBits==b'\x10\x03'):  #XY Data Points
-                numDataPoints = len(record)-2  #packed nas XY coordinates 4 bytes each
-                thisPath.coordinates=[]
-                for index in range(2,numDataPoints+2,8):  #incorporate the 2 byte offset
-                    x=struct.unpack(">i",record[index:index+4])[0]
-                    y=struct.unpack(">i",record[index+4:index+8])[0]
-                    thisPath.coordinates+=[(x,y)]
-                    if(self.debugToTerminal==1):
+                #packed as XY coordinates 4 bytes each
+                thisPath.coordinates=self.readCoordinates(record)
+                if(self.debugToTerminal==1):
+                    for (x,y) in thisPath.coordinates:
                         print("\t\t\tXY Point: "+str(x)+","+str(y))
             elif(idBits==b'\x11\x00'):  #End Of Element
                 break;
@@ -336,8 +362,8 @@ class Gds2reader:
                 if(self.debugToTerminal==1):
                     print("\t\tPLEX: "+str(plex))
             elif(idBits==b'\x12\x06'):  #Reference Name
-                aName = record[2::]
-                thisAref.aName=aName
+                aName = self.stripNonASCII(record[2::])
+                thisAref.aName=aName.rstrip()
                 if(self.debugToTerminal==1):
                     print("\t\tReference Name:"+aName)
             elif(idBits==b'\x1A\x01'):  #Transformation
@@ -360,17 +386,26 @@ class Gds2reader:
                 thisAref.rotateAngle=rotateAngle                
                 if(self.debugToTerminal==1):
                     print("\t\t\tRotate Angle (CCW):"+str(rotateAngle))
+            elif(idBits==b'\x13\x02'):  #Columns and Rows
+                columns = struct.unpack(">h",record[2:4])[0]
+                rows = struct.unpack(">h",record[4:6])[0]
+                thisAref.columns=columns
+                thisAref.rows=rows
+                if(self.debugToTerminal==1):
+                    print("\t\t\tColumns: "+str(columns)+" Rows: "+str(rows))
             elif(idBits==b'\x10\x03'):  #XY Data Points
-                index=2
-                topLeftX=struct.unpack(">i",record[index:index+4])[0]
-                topLeftY=struct.unpack(">i",record[index+4:index+8])[0]
-                rightMostX=struct.unpack(">i",record[index+8:index+12])[0]
-                bottomMostY=struct.unpack(">i",record[index+12:index+16])[0]
-                thisAref.coordinates=[(topLeftX,topLeftY),(rightMostX,topLeftY),(topLeftX,bottomMostY)]
-                if(self.debugToTerminal==1):
-                    print("\t\t\tTop Left Point: "+str(topLeftX)+","+str(topLeftY))
-                    print("\t\t\t\tArray Width: "+str(rightMostX-topLeftX))
-                    print("\t\t\t\tArray Height: "+str(topLeftY-bottomMostY))
+                # The origin, the origin displaced by all columns and
+                # the origin displaced by all rows
+                coordinates = []
+                for index in range(2,26,8):
+                    x=struct.unpack(">i",record[index:index+4])[0]
+                    y=struct.unpack(">i",record[index+4:index+8])[0]
+                    coordinates.append((x,y))
+                thisAref.coordinates=coordinates
+                if(self.debugToTerminal==1):
+                    print("\t\t\tOrigin: "+str(coordinates[0]))
+                    print("\t\t\t\tColumn Point: "+str(coordinates[1]))
+                    print("\t\t\t\tRow Point: "+str(coordinates[2]))
             elif(idBits==b'\x11\x00'):  #End Of Element
                 break;
         return thisAref
@@ -504,13 +539,10 @@ class Gds2reader:
                 if(self.debugToTerminal==1):
                     print("\t\tNode Type: "+str(nodeType))
             elif(idBits==b'\x10\x03'):  #XY Data Points
-                numDataPoints = len(record)-2  #packed as XY coordinates 4 bytes each
-                thisNode.coordinates=[]
-                for index in range(2,numDataPoints+2,8):  #incorporate the 2 byte offset
-                    x=struct.unpack(">i",record[index:index+4])[0]
-                    y=struct.unpack(">i",record[index+4:index+8])[0]
-                    thisNode.coordinates+=[(x,y)]
-                    if(self.debugToTerminal==1):
+                #packed as XY coordinates 4 bytes each
+                thisNode.coordinates=self.readCoordinates(record)
+                if(self.debugToTerminal==1):
+                    for (x,y) in thisNode.coordinates:
                         print("\t\t\tXY Point: "+str(x)+","+str(y))
             elif(idBits==b'\x11\x00'):  #End Of Element
                 break;
@@ -630,12 +662,82 @@ class Gds2reader:
         else:
             print("There was an error parsing the GDS header.  Aborting...")
             
-    def loadFromFile(self, fileName):
+    def loadFromFile(self, fileName, useMmap=True):
+        """
+        Read a GDS file into the layout. By default the file is memory mapped
+        and the records are sliced out of the map instead of read one at a time.
+        """
         self.fileHandle = open(fileName,"rb")
-        self.readGds2()
-        self.fileHandle.close()
+        try:
+            if useMmap:
+                self.fileMap = mmap.mmap(self.fileHandle.fileno(),0,access=mmap.ACCESS_READ)
+                self.records = self.scanRecords()
+            self.readGds2()
+        finally:
+            # release the map and the file even if the parse fails
+            if self.records != None:
+                self.records.close()
+                self.records = None
+            if self.fileMap != None:
+                self.fileMap.close()
+                self.fileMap = None
+            self.fileHandle.close()
         self.layoutObject.initialize()
 
+    def scanLabelsAndBoundaries(self, fileName):
+        """
+        Walk the records of a GDS file without building a layout and only decode
+        the structure names, the boundaries and the text labels. Returns the
+        structure names, the drawing layers in order of first use, a list of
+        (layer, coordinates) boundaries, a list of (layer, coordinate, string)
+        labels and whether the file references other structures.
+        """
+        structureNames = []
+        layers = []
+        boundaries = []
+        texts = []
+        hierarchical = False
+        element = None
+        self.fileHandle = open(fileName,"rb")
+        try:
+            self.fileMap = mmap.mmap(self.fileHandle.fileno(),0,access=mmap.ACCESS_READ)
+            self.records = self.scanRecords()
+            for record in self.records:
+                idBits = record[0:2]
+                if(idBits==b'\x06\x06'):  #Structure name
+                    structureNames.append(self.stripNonASCII(record[2::]))
+                elif(idBits==b'\x08\x00' or idBits==b'\x0C\x00'):  #Boundary or text
+                    element = {"type":idBits}
+                elif(idBits==b'\x0A\x00' or idBits==b'\x0B\x00'):  #Sref or aref
+                    hierarchical = True
+                elif(idBits==b'\x0D\x02'):  #Layer
+                    drawingLayer = struct.unpack(">h",record[2:4])[0]
+                    if drawingLayer not in layers:
+                        layers.append(drawingLayer)
+                    if element != None:
+                        element["layer"] = drawingLayer
+                elif(idBits==b'\x10\x03' and element != None):  #XY Data Points
+                    element["coordinates"] = self.readCoordinates(record)
+                elif(idBits==b'\x19\x06' and element != None):  #Text String
+                    element["string"] = record[2::].decode('utf-8')
+                elif(idBits==b'\x11\x00'):  #End Of Element
+                    if element == None:
+                        pass
+                    elif element["type"]==b'\x08\x00':
+                        boundaries.append((element["layer"],element["coordinates"]))
+                    else:
+                        texts.append((element["layer"],element["coordinates"][0],element["string"]))
+                    element = None
+        finally:
+            if self.records != None:
+                self.records.close()
+                self.records = None
+            if self.fileMap != None:
+                self.fileMap.close()
+                self.fileMap = None
+            self.fileHandle.close()
+        return (structureNames, layers, boundaries, texts, hierarchical)
+
 ##############################################
 
     def findStruct(self,fileName,findStructName):
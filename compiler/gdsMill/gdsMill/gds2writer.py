@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 import struct
+import numpy as np
+from itertools import chain
 from .gdsPrimitives import *
 
 class Gds2writer:
@@ -8,6 +10,8 @@ class Gds2writer:
     
     def __init__(self,layoutObject):
         self.fileHandle = 0
+        # The encoded records are collected here and flushed after each structure
+        self.buffer = bytearray()
         self.layoutObject = layoutObject
         self.debugToTerminal=0  #do we dump debug data to the screen
         
@@ -93,8 +97,37 @@ class Gds2writer:
         
     def writeRecord(self,record):
         recordLength = len(record)+2  #make sure to include this in the length
-        recordLengthAscii=struct.pack(">h",recordLength)
-        self.fileHandle.write(recordLengthAscii+record)
+        self.buffer += struct.pack(">h",recordLength)+record
+
+    def flushBuffer(self):
+        """ Write the buffered records to the file. """
+        self.fileHandle.write(self.buffer)
+        self.buffer = bytearray()
+
+    def packCoordinates(self,coordinates):
+        """
+        Pack a list of (x,y) points into big endian 4 byte integers.
+        Like int(), the values are truncated towards zero.
+        """
+        return struct.pack(">%di"%(2*len(coordinates)),*[int(value) for point in coordinates for value in point])
+
+    def packCoordinateLists(self,coordinateLists):
+        """
+        Pack many lists of (x,y) points with one conversion and
+        return the packed bytes of each list.
+        """
+        values = np.fromiter(chain.from_iterable(chain.from_iterable(coordinateLists)),dtype=float)
+        # astype would silently wrap values that don't fit in 4 bytes
+        if len(values) and not (values.min() > -2**31-1 and values.max() < 2**31):
+            raise struct.error("GDS coordinate out of the 4 byte integer range")
+        data = values.astype('>i4').tobytes()
+        packed = []
+        start = 0
+        for coordinates in coordinateLists:
+            end = start+8*len(coordinates)
+            packed.append(data[start:end])
+            start = end
+        return packed
 
     def writeHeader(self):
         ##  Header
@@ -183,7 +216,7 @@ class Gds2writer:
             print("End of GDSII Header Written")
         return 1
     
-    def writeBoundary(self,thisBoundary):
+    def writeBoundary(self,thisBoundary,packedCoordinates=None):
         idBits=b'\x08\x00'  #record Type
         self.writeRecord(idBits)
         if(thisBoundary.elementFlags!=""):
@@ -208,18 +241,14 @@ class Gds2writer:
             self.writeRecord(idBits+dataType)
         if(thisBoundary.coordinates!=""):
             idBits=b'\x10\x03' #XY Data Points
-            coordinateRecord = idBits
-            for coordinate in thisBoundary.coordinates:
-                x=struct.pack(">i",int(coordinate[0]))
-                y=struct.pack(">i",int(coordinate[1]))
-                coordinateRecord+=x
-                coordinateRecord+=y
-            self.writeRecord(coordinateRecord)
+            if packedCoordinates == None:
+                packedCoordinates = self.packCoordinates(thisBoundary.coordinates)
+            self.writeRecord(idBits+packedCoordinates)
         idBits=b'\x11\x00' #End Of Element
         coordinateRecord = idBits
         self.writeRecord(coordinateRecord)
     
-    def writePath(self,thisPath):  #writes out a path structure
+    def writePath(self,thisPath,packedCoordinates=None):  #writes out a path structure
         idBits=b'\x09\x00'  #record Type
         self.writeRecord(idBits)
         if(thisPath.elementFlags != ""):
@@ -248,13 +277,9 @@ class Gds2writer:
             self.writeRecord(idBits+pathWidth)
         if(thisPath.coordinates):
             idBits=b'\x10\x03' #XY Data Points
-            coordinateRecord = idBits
-            for coordinate in thisPath.coordinates:
-                x=struct.pack(">i",int(coordinate[0]))
-                y=struct.pack(">i",int(coordinate[1]))
-                coordinateRecord+=x
-                coordinateRecord+=y
-            self.writeRecord(coordinateRecord)
+            if packedCoordinates == None:
+                packedCoordinates = self.packCoordinates(thisPath.coordinates)
+            self.writeRecord(idBits+packedCoordinates)
         idBits=b'\x11\x00' #End Of Element
         coordinateRecord = idBits
         self.writeRecord(coordinateRecord)
@@ -328,7 +353,7 @@ class Gds2writer:
                 aName = thisAref.aName+"\0"
             else:
                 aName = thisAref.aName
-            self.writeRecord(idBits+aName)
+            self.writeRecord(idBits+aName.encode())
         if(thisAref.transFlags):
             idBits=b'\x1A\x01'
             mirrorFlag = int(thisAref.transFlags[0])<<15
@@ -349,20 +374,17 @@ class Gds2writer:
             idBits=b'\x1C\x05'            
             rotateAngle=self.ibmDataFromIeeeDouble(thisAref.rotateAngle)
             self.writeRecord(idBits+rotateAngle)
+        idBits=b'\x13\x02' #Columns and Rows
+        colRow = struct.pack(">h",int(thisAref.columns))+struct.pack(">h",int(thisAref.rows))
+        self.writeRecord(idBits+colRow)
         if(thisAref.coordinates):
             idBits=b'\x10\x03' #XY Data Points
-            coordinateRecord = idBits
-            for coordinate in thisAref.coordinates:
-                x=struct.pack(">i",coordinate[0])
-                y=struct.pack(">i",coordinate[1])
-                coordinateRecord+=x
-                coordinateRecord+=y
-            self.writeRecord(coordinateRecord)
+            self.writeRecord(idBits+self.packCoordinates(thisAref.coordinates))
         idBits=b'\x11\x00' #End Of Element
         coordinateRecord = idBits
         self.writeRecord(coordinateRecord)
     
-    def writeText(self,thisText):
+    def writeText(self,thisText,packedCoordinates=None):
         idBits=b'\x0C\x00'  #record Type
         self.writeRecord(idBits)
         if(thisText.elementFlags!=""):
@@ -418,13 +440,9 @@ class Gds2writer:
             self.writeRecord(idBits+transFlags)            
         if(thisText.coordinates!=""):
             idBits=b'\x10\x03' #XY Data Points
-            coordinateRecord = idBits
-            for coordinate in thisText.coordinates:
-                x=struct.pack(">i",int(coordinate[0]))
-                y=struct.pack(">i",int(coordinate[1]))
-                coordinateRecord+=x
-                coordinateRecord+=y
-            self.writeRecord(coordinateRecord)
+            if packedCoordinates == None:
+                packedCoordinates = self.packCoordinates(thisText.coordinates)
+            self.writeRecord(idBits+packedCoordinates)
         if(thisText.textString):
             idBits=b'\x19\x06'
             textString = thisText.textString
@@ -453,15 +471,9 @@ class Gds2writer:
             idBits=b'\x2A\x02'
             nodeType = struct.pack(">h",thisNode.nodeType)
             self.writeRecord(idBits+nodeType)            
-        if(thisText.coordinates!=""):
+        if(thisNode.coordinates!=""):
             idBits=b'\x10\x03' #XY Data Points
-            coordinateRecord = idBits
-            for coordinate in thisText.coordinates:
-                x=struct.pack(">i",int(coordinate[0]))
-                y=struct.pack(">i",int(coordinate[1]))
-                coordinateRecord+=x
-                coordinateRecord+=y
-            self.writeRecord(coordinateRecord)
+            self.writeRecord(idBits+self.packCoordinates(thisNode.coordinates))
         
         idBits=b'\x11\x00' #End Of Element
         coordinateRecord = idBits
@@ -492,34 +504,35 @@ class Gds2writer:
             self.writeRecord(idBits+boxValue)            
         if(thisBox.coordinates!=""):
             idBits=b'\x10\x03' #XY Data Points
-            coordinateRecord = idBits
-            for coordinate in thisBox.coordinates:
-                x=struct.pack(">i",int(coordinate[0]))
-                y=struct.pack(">i",int(coordinate[1]))
-                coordinateRecord+=x
-                coordinateRecord+=y
-            self.writeRecord(coordinateRecord)
+            self.writeRecord(idBits+self.packCoordinates(thisBox.coordinates))
         
         idBits=b'\x11\x00' #End Of Element
         coordinateRecord = idBits
         self.writeRecord(coordinateRecord)
             
     def writeNextStructure(self,structureName):
+        self.writeStructure(self.layoutObject.structures[structureName],structureName)
+
+    def writeStructure(self,thisStructure,structureName):
+        self.beginStructure(structureName,thisStructure.createDate,thisStructure.modDate)
+        self.writeElements(thisStructure)
+        self.endStructure()
+
+    def beginStructure(self,structureName,createDate,modDate):
         #first put in the structure head
-        thisStructure = self.layoutObject.structures[structureName]
         idBits=b'\x05\x02'
-        createYear = struct.pack(">h",thisStructure.createDate[0])
-        createMonth = struct.pack(">h",thisStructure.createDate[1])
-        createDay = struct.pack(">h",thisStructure.createDate[2])
-        createHour = struct.pack(">h",thisStructure.createDate[3])
-        createMinute = struct.pack(">h",thisStructure.createDate[4])
-        createSecond = struct.pack(">h",thisStructure.createDate[5])
-        modYear = struct.pack(">h",thisStructure.modDate[0])
-        modMonth = struct.pack(">h",thisStructure.modDate[1])
-        modDay = struct.pack(">h",thisStructure.modDate[2])
-        modHour = struct.pack(">h",thisStructure.modDate[3])
-        modMinute = struct.pack(">h",thisStructure.modDate[4])
-        modSecond = struct.pack(">h",thisStructure.modDate[5])
+        createYear = struct.pack(">h",createDate[0])
+        createMonth = struct.pack(">h",createDate[1])
+        createDay = struct.pack(">h",createDate[2])
+        createHour = struct.pack(">h",createDate[3])
+        createMinute = struct.pack(">h",createDate[4])
+        createSecond = struct.pack(">h",createDate[5])
+        modYear = struct.pack(">h",modDate[0])
+        modMonth = struct.pack(">h",modDate[1])
+        modDay = struct.pack(">h",modDate[2])
+        modHour = struct.pack(">h",modDate[3])
+        modMinute = struct.pack(">h",modDate[4])
+        modSecond = struct.pack(">h",modDate[5])
         self.writeRecord(idBits+createYear+createMonth+createDay+createHour+createMinute+createSecond\
                          +modYear+modMonth+modDay+modHour+modMinute+modSecond)
         #now the structure name
@@ -529,25 +542,35 @@ class Gds2writer:
             #pad with a zero
             structureName = structureName + '\x00'
         self.writeRecord(idBits+structureName.encode())
+
+    def writeElements(self,thisStructure):
         #now go through all the structure elements and write them in
         
-        for boundary in thisStructure.boundaries:
-            self.writeBoundary(boundary)
-        for path in thisStructure.paths:
-            self.writePath(path)
+        # pack the points of all boundaries, paths and texts at once
+        packedCoordinates = self.packCoordinateLists([boundary.coordinates for boundary in thisStructure.boundaries])
+        for (boundary,packed) in zip(thisStructure.boundaries,packedCoordinates):
+            self.writeBoundary(boundary,packed)
+        packedCoordinates = self.packCoordinateLists([path.coordinates for path in thisStructure.paths])
+        for (path,packed) in zip(thisStructure.paths,packedCoordinates):
+            self.writePath(path,packed)
         for sref in thisStructure.srefs:
             self.writeSref(sref)
         for aref in thisStructure.arefs:
             self.writeAref(aref)
-        for text in thisStructure.texts:
-            self.writeText(text)
+        packedCoordinates = self.packCoordinateLists([text.coordinates for text in thisStructure.texts])
+        for (text,packed) in zip(thisStructure.texts,packedCoordinates):
+            self.writeText(text,packed)
         for node in thisStructure.nodes:
             self.writeNode(node)
         for box in thisStructure.boxes:
             self.writeBox(box)
+
+    def endStructure(self):
         #put in the structure tail
         idBits=b'\x07\x00'
         self.writeRecord(idBits)
+        #stream each structure to the file so the whole library is never held encoded
+        self.flushBuffer()
     
     def writeGds2(self):
         self.writeHeader();  #first, put the header in
@@ -557,8 +580,25 @@ class Gds2writer:
         #at the end, put in the END LIB record
         idBits=b'\x04\x00'
         self.writeRecord(idBits)
+        self.flushBuffer()
         
     def writeToFile(self,fileName):
         self.fileHandle = open(fileName,"wb")
         self.writeGds2()
         self.fileHandle.close()
+
+    def openStream(self,fileName):
+        """
+        Open a file and write the header of the layout object. The
+        structures are then written one at a time with writeStructure
+        or element by element between beginStructure and endStructure.
+        """
+        self.fileHandle = open(fileName,"wb")
+        self.writeHeader()
+
+    def closeStream(self):
+        """ Write the END LIB record and close the file. """
+        idBits=b'\x04\x00'
+        self.writeRecord(idBits)
+        self.flushBuffer()
+        self.fileHandle.close()
@@ -132,6 +132,9 @@ class GdsAref:
         self.transFlags=[0,0,0]
         self.magFactor=""
         self.rotateAngle=""
+        self.columns=1
+        self.rows=1
+        # origin, origin displaced by the columns, origin displaced by the rows
         self.coordinates=""
 
 class GdsText:
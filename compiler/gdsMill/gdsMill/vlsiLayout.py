@@ -55,7 +55,9 @@ class VlsiLayout:
         self.xyTree = [] #This will contain a list of all structure names
                         #expanded to include srefs / arefs separately.
                         #each structure will have an X,Y,offset, and rotate associated
-                        #with it.  Populate via traverseTheHierarchy method.
+                        #with it.  Populate via populateCoordinateMap method.
+        self.instanceTransforms = {} #The stacked transforms of every instance of each structure
+        self.layerShapes = None #The flattened rectangles bucketed by layer. Built on demand.
         
         #temp variables used in delegate functions
         self.tempCoordinates=None
@@ -95,6 +97,32 @@ class VlsiLayout:
         del self.xyTree[:]
         self.populateCoordinateMap()
 
+    def copyLayout(self):
+        """
+        Return a new layout that shares all of the structures of this layout
+        except the root. The root gets new element lists so shapes, labels and
+        instances can be added to the copy without changing this layout.
+        """
+        newLayout = VlsiLayout(units=self.units)
+        newLayout.info = dict(self.info)
+        newLayout.layerNumbersInUse = list(self.layerNumbersInUse)
+        newLayout.structures = dict(self.structures)
+        newLayout.rootStructureName = self.rootStructureName
+        rootStructure = self.structures[self.rootStructureName]
+        newRoot = GdsStructure()
+        newRoot.name = rootStructure.name
+        newRoot.createDate = rootStructure.createDate
+        newRoot.modDate = rootStructure.modDate
+        for elements in ["boundaries","paths","srefs","arefs","texts","nodes","boxes"]:
+            setattr(newRoot,elements,list(getattr(rootStructure,elements)))
+        newLayout.structures[self.rootStructureName] = newRoot
+        newLayout.xyTree = list(self.xyTree)
+        newLayout.instanceTransforms = self.instanceTransforms
+        newLayout.layerShapes = self.layerShapes
+        for (label,pinShapes) in self.pins.items():
+            newLayout.pins[label] = list(pinShapes)
+        return newLayout
+
     def newLayout(self,newName):
         #if (newName == "" | newName == 0):
         #   print("ERROR: vlsiLayout.py:newLayout  newName is null")
@@ -154,6 +182,9 @@ class VlsiLayout:
                 for sref in self.structures[name].srefs: #go through each reference
                     if sref.sName in structureNames: #and compare to our list
                         structureNames.remove(sref.sName)
+            for aref in self.structures[name].arefs:
+                if aref.aName in structureNames:
+                    structureNames.remove(aref.aName)
 
         debug.check(len(structureNames)==1,"Multiple possible root structures in the layout: {}".format(str(structureNames)))
         self.rootStructureName = structureNames[0]
@@ -218,30 +249,93 @@ class VlsiLayout:
         
     
     def populateCoordinateMap(self):
-        def addToXyTree(startingStructureName = None,transformPath = None):
-            uVector = np.array([[1.0],[0.0],[0.0]]) #start with normal basis vectors
-            vVector = np.array([[0.0],[1.0],[0.0]])
-            origin = np.array([[0.0],[0.0],[1.0]]) #and an origin (Z component is 1.0 to indicate position instead of vector)
-            #make a copy of all the transforms and reverse it            
-            reverseTransformPath = transformPath[:]
-            if len(reverseTransformPath) > 1:
-                reverseTransformPath.reverse()      
-            #now go through each transform and apply them to our basis and origin in succession
-            for transform in reverseTransformPath:
-                origin = np.dot(transform[0], origin)  #rotate
-                uVector = np.dot(transform[0], uVector)  #rotate
-                vVector = np.dot(transform[0], vVector)  #rotate
-                origin = np.dot(transform[1], origin)  #scale
-                uVector = np.dot(transform[1], uVector)  #scale
-                vVector = np.dot(transform[1], vVector)  #scale
-                origin = np.dot(transform[2], origin)  #translate
-                #we don't need to do a translation on the basis vectors            
-                #uVector = transform[2] * uVector  #translate
-                #vVector = transform[2] * vVector  #translate
-            #populate the xyTree with each structureName and coordinate space
-            self.xyTree.append((startingStructureName,origin,uVector,vVector))
-        self.traverseTheHierarchy(delegateFunction = addToXyTree)
-        
+        """
+        Flatten the hierarchy below the root into the xyTree. Each structure is
+        only flattened once and the transforms of all of its instances are
+        kept stacked in instanceTransforms.
+        """
+        del self.xyTree[:]
+        flatCache = {}
+        (names, transforms) = self.flattenStructure(self.rootStructureName, flatCache)
+        #populate the xyTree with each structureName and coordinate space
+        for (name, transform) in zip(names, transforms):
+            self.xyTree.append((name, transform[:,2:3], transform[:,0:1], transform[:,1:2]))
+
+        # Group the transforms of every instance by structure name
+        instances = {}
+        for (index, name) in enumerate(names):
+            instances.setdefault(name, []).append(index)
+        self.instanceTransforms = {}
+        for (name, indices) in instances.items():
+            self.instanceTransforms[name] = transforms[indices]
+        # The shapes must be flattened again
+        self.layerShapes = None
+
+    def flattenStructure(self, structureName, flatCache):
+        """
+        Return the names of a structure and every structure instance below it
+        along with a (n,3,3) stack of their transforms relative to the structure.
+        Results are memoized in flatCache.
+        """
+        if structureName in flatCache:
+            return flatCache[structureName]
+
+        names = [structureName]
+        transforms = [np.identity(3)[np.newaxis]]
+        structure = self.structures[structureName]
+        for sref in structure.srefs:
+            (childNames, childTransforms) = self.flattenStructure(sref.sName, flatCache)
+            refTransform = self.referenceTransform(sref.rotateAngle, sref.transFlags, sref.coordinates)
+            names.extend(childNames)
+            transforms.append(np.matmul(refTransform, childTransforms))
+        for aref in structure.arefs:
+            (childNames, childTransforms) = self.flattenStructure(aref.aName, flatCache)
+            arrayTransforms = self.arrayTransforms(aref)
+            names.extend(childNames*len(arrayTransforms))
+            # all array elements times all child instances
+            transforms.append(np.matmul(arrayTransforms[:,np.newaxis], childTransforms[np.newaxis]).reshape(-1,3,3))
+
+        flatCache[structureName] = (names, np.concatenate(transforms))
+        return flatCache[structureName]
+
+    def referenceTransform(self, rotateAngle, transFlags, coordinates):
+        """
+        Return the 3x3 transform of a reference. The reference is rotated,
+        then mirrored in X and then translated.
+        """
+        if(rotateAngle == None or rotateAngle == ""):
+            angle = 0
+        else:
+            angle = math.radians(float(rotateAngle))
+        mRotate = np.array([[math.cos(angle),-math.sin(angle),0.0],
+                            [math.sin(angle),math.cos(angle),0.0],
+                            [0.0,0.0,1.0]])
+        if(transFlags[0]):
+            scaleY = -1.0
+        else:
+            scaleY = 1.0
+        mScale = np.array([[1.0,0.0,0.0],[0.0,scaleY,0.0],[0.0,0.0,1.0]])
+        mTranslate = np.array([[1.0,0.0,float(coordinates[0])],
+                               [0.0,1.0,float(coordinates[1])],
+                               [0.0,0.0,1.0]])
+        return np.dot(mTranslate, np.dot(mScale, mRotate))
+
+    def arrayTransforms(self, aref):
+        """
+        Return a (columns*rows,3,3) stack of the transforms of each element of an array reference.
+        """
+        columns = max(int(aref.columns), 1)
+        rows = max(int(aref.rows), 1)
+        (origin, columnPoint, rowPoint) = [np.array(c, dtype=float) for c in aref.coordinates[0:3]]
+        columnPitch = (columnPoint - origin)/columns
+        rowPitch = (rowPoint - origin)/rows
+        (column, row) = np.meshgrid(np.arange(columns), np.arange(rows), indexing="ij")
+        offsets = origin + column.reshape(-1,1)*columnPitch + row.reshape(-1,1)*rowPitch
+        transforms = np.repeat(self.referenceTransform(aref.rotateAngle, aref.transFlags, (0,0))[np.newaxis],
+                               len(offsets), axis=0)
+        transforms[:,0:2,2] = offsets
+        return transforms
+
     def microns(self,userUnits):
         """Utility function to convert user units to microns"""
         userUnit = self.units[1]/self.units[0]
@@ -320,37 +414,11 @@ class VlsiLayout:
                     self.layerNumbersInUse.append(layerNumber)
 
         #add a reference to the new layout structure in this layout's root
-        layoutToAddSref = GdsSref()
-        layoutToAddSref.sName = StructureName
-        layoutToAddSref.coordinates = offsetInLayoutUnits
-
-        if mirror or rotate:
-                
-            layoutToAddSref.transFlags = [0,0,0]
-            # transFlags = (mirror around x-axis, magnification, rotation)
-            # If magnification or rotation is true, it is the flags are then
-            # followed by an amount in the record
-            if mirror=="R90":
-                rotate = 90.0
-            if mirror=="R180":
-                rotate = 180.0
-            if mirror=="R270":
-                rotate = 270.0
-            if rotate:
-                #layoutToAddSref.transFlags[2] = 1
-                layoutToAddSref.rotateAngle = rotate
-            if mirror == "x" or mirror == "MX":
-                layoutToAddSref.transFlags[0] = 1
-            if mirror == "y" or mirror == "MY": #NOTE: "MY" option will override specified rotate angle
-                layoutToAddSref.transFlags[0] = 1
-                #layoutToAddSref.transFlags[2] = 1
-                layoutToAddSref.rotateAngle = 180.0
-            if mirror == "xy" or mirror == "XY": #NOTE: "XY" option will override specified rotate angle
-                #layoutToAddSref.transFlags[2] = 1
-                layoutToAddSref.rotateAngle = 180.0
+        layoutToAddSref = newSref(StructureName,offsetInLayoutUnits,mirror,rotate)
 
         #add the sref to the root structure
         self.structures[self.rootStructureName].srefs.append(layoutToAddSref)
+        self.layerShapes = None
         
     def addBox(self,layerNumber=0, purposeNumber=None, offsetInMicrons=(0,0), width=1.0, height=1.0,center=False):
         """
@@ -361,27 +429,10 @@ class VlsiLayout:
         widthInLayoutUnits = self.userUnits(width)
         heightInLayoutUnits = self.userUnits(height)
         #print("offsetInLayoutUnits",widthInLayoutUnits,"heightInLayoutUnits",heightInLayoutUnits)
-        if not center:
-            coordinates=[offsetInLayoutUnits,
-                         (offsetInLayoutUnits[0]+widthInLayoutUnits,offsetInLayoutUnits[1]),
-                         (offsetInLayoutUnits[0]+widthInLayoutUnits,offsetInLayoutUnits[1]+heightInLayoutUnits),
-                         (offsetInLayoutUnits[0],offsetInLayoutUnits[1]+heightInLayoutUnits),
-                         offsetInLayoutUnits]
-        else:
-            startPoint = (offsetInLayoutUnits[0]-widthInLayoutUnits/2.0, offsetInLayoutUnits[1]-heightInLayoutUnits/2.0) 
-            coordinates=[startPoint,
-                         (startPoint[0]+widthInLayoutUnits,startPoint[1]),
-                         (startPoint[0]+widthInLayoutUnits,startPoint[1]+heightInLayoutUnits),
-                         (startPoint[0],startPoint[1]+heightInLayoutUnits),
-                         startPoint]
-
-        boundaryToAdd = GdsBoundary()
-        boundaryToAdd.drawingLayer = layerNumber
-        boundaryToAdd.dataType = 0
-        boundaryToAdd.coordinates = coordinates
-        boundaryToAdd.purposeLayer = purposeNumber
+        boundaryToAdd = newBoundary(layerNumber,purposeNumber,offsetInLayoutUnits,widthInLayoutUnits,heightInLayoutUnits,center)
         #add the sref to the root structure
         self.structures[self.rootStructureName].boundaries.append(boundaryToAdd)
+        self.layerShapes = None
     
     def addPath(self, layerNumber=0, purposeNumber = None, coordinates=[(0,0)], width=1.0):
         """
@@ -394,30 +445,13 @@ class VlsiLayout:
             cX = self.userUnits(coordinate[0])
             cY = self.userUnits(coordinate[1])
             layoutUnitCoordinates.append((cX,cY))
-        pathToAdd = GdsPath()
-        pathToAdd.drawingLayer=layerNumber
-        pathToAdd.purposeLayer = purposeNumber
-        pathToAdd.pathWidth=widthInLayoutUnits
-        pathToAdd.coordinates=layoutUnitCoordinates
+        pathToAdd = newPath(layerNumber,purposeNumber,layoutUnitCoordinates,widthInLayoutUnits)
         #add the sref to the root structure
         self.structures[self.rootStructureName].paths.append(pathToAdd)
         
     def addText(self, text, layerNumber=0, purposeNumber = None, offsetInMicrons=(0,0), magnification=0.1, rotate = None):
         offsetInLayoutUnits = (self.userUnits(offsetInMicrons[0]),self.userUnits(offsetInMicrons[1]))
-        textToAdd = GdsText()
-        textToAdd.drawingLayer = layerNumber
-        textToAdd.purposeLayer = purposeNumber
-        textToAdd.dataType = 0
-        textToAdd.coordinates = [offsetInLayoutUnits]
-        textToAdd.transFlags = [0,0,0]  
-        if(len(text)%2 == 1):
-            text = text + '\x00'
-        textToAdd.textString = text
-        #textToAdd.transFlags[1] = 1
-        textToAdd.magFactor = magnification
-        if rotate:
-            #textToAdd.transFlags[2] = 1
-            textToAdd.rotateAngle = rotate
+        textToAdd = newText(text,layerNumber,purposeNumber,offsetInLayoutUnits,magnification,rotate)
         #add the sref to the root structure
         self.structures[self.rootStructureName].texts.append(textToAdd)
             
@@ -702,17 +736,21 @@ class VlsiLayout:
         """
         # Get the labels on a layer in the root level
         labels = self.getTexts(layer)
+        if len(labels)==0:
+            return
         # Get all of the shapes on the layer at all levels
         # and transform them to the current level
-        shapes =  self.getAllShapes(layer)
+        if self.layerShapes == None:
+            self.indexLayerShapes()
+        shapes = self.layerShapes.get(layer,np.zeros((0,4)))
+        shapeIndex = self.indexRectangles(shapes)
 
         for label in labels:
             label_coordinate = label.coordinates[0]
             user_coordinate = [x*self.units[0] for x in label_coordinate]
             pin_shapes = []
-            for boundary in shapes:
-                if self.labelInRectangle(user_coordinate,boundary):
-                    pin_shapes.append((layer, boundary))
+            for index in self.findEnclosingRectangles(shapeIndex,user_coordinate):
+                pin_shapes.append((layer, shapes[index].tolist()))
 
             label_text = label.textString
             # Remove the padding if it exists
@@ -725,26 +763,131 @@ class VlsiLayout:
                 self.pins[label_text] = []
             self.pins[label_text].append(pin_shapes)
         
-        
+    def indexRectangles(self,rectangles,nodeSize=16):
+        """
+        Build a packed R-tree over a (n,4) array of rectangles using
+        sort-tile-recursive packing. On each level the boxes are sorted into
+        vertical slices by x center and then by y center within each slice
+        and every nodeSize boxes in that order are grouped into a node. The
+        bounding boxes of the nodes are packed into the next level until a
+        single root node is left.
+        Returns the rectangles, the node size and the levels from the leaves
+        up. A level is the packing order of its boxes and the (m,4) bounding
+        boxes of its nodes.
+        """
+        levels = []
+        boxes = rectangles
+        while True:
+            numBoxes = len(boxes)
+            numNodes = max(1,int(math.ceil(numBoxes/nodeSize)))
+            sliceSize = nodeSize*int(math.ceil(math.sqrt(numNodes)))
+            xCenters = boxes[:,0]+boxes[:,2]
+            yCenters = boxes[:,1]+boxes[:,3]
+            order = np.argsort(xCenters,kind="stable")
+            for start in range(0,numBoxes,sliceSize):
+                tile = order[start:start+sliceSize]
+                order[start:start+sliceSize] = tile[np.argsort(yCenters[tile],kind="stable")]
+            if numBoxes==0:
+                nodeBoxes = np.zeros((0,4))
+            else:
+                sortedBoxes = boxes[order]
+                nodeStarts = np.arange(0,numBoxes,nodeSize)
+                nodeBoxes = np.stack([np.minimum.reduceat(sortedBoxes[:,0],nodeStarts),
+                                      np.minimum.reduceat(sortedBoxes[:,1],nodeStarts),
+                                      np.maximum.reduceat(sortedBoxes[:,2],nodeStarts),
+                                      np.maximum.reduceat(sortedBoxes[:,3],nodeStarts)],axis=-1)
+            levels.append((order,nodeBoxes))
+            if len(nodeBoxes)<=1:
+                break
+            boxes = nodeBoxes
+        return (rectangles,nodeSize,levels)
+
+    def findEnclosingRectangles(self,rectangleIndex,coordinate):
+        """
+        Return the sorted original indices of the rectangles that contain a coordinate
+        (including the edges) using an index from indexRectangles.
+        """
+        (rectangles,nodeSize,levels) = rectangleIndex
+        (x,y) = coordinate
+        # Start at the root and only descend into the nodes whose bounding box contains the point
+        nodes = np.arange(len(levels[-1][1]))
+        for (order,nodeBoxes) in reversed(levels):
+            boxes = nodeBoxes[nodes]
+            nodes = nodes[(boxes[:,0]<=x)&(boxes[:,2]>=x)&(boxes[:,1]<=y)&(boxes[:,3]>=y)]
+            if len(nodes)==0:
+                return []
+            # The boxes of the level below that are grouped in these nodes
+            positions = (nodes[:,np.newaxis]*nodeSize+np.arange(nodeSize)).ravel()
+            nodes = order[positions[positions<len(order)]]
+        candidates = rectangles[nodes]
+        inside = (candidates[:,0]<=x)&(candidates[:,2]>=x)&(candidates[:,1]<=y)&(candidates[:,3]>=y)
+        return np.sort(nodes[inside]).tolist()
 
     def getAllShapes(self,layer):
         """
         Return all gshapes on a given layer in [llx, lly, urx, ury] format and 
         user units.
         """
-        boundaries = set()
-        for TreeUnit in self.xyTree:
-            #print(TreeUnit[0])
-            boundaries.update(self.getShapesInStructure(layer,TreeUnit))
-
-        # Convert to user units
-        user_boundaries = []
-        for boundary in boundaries:
-            user_boundaries.append([boundary[0]*self.units[0],boundary[1]*self.units[0],
-                                    boundary[2]*self.units[0],boundary[3]*self.units[0]])
-                
-        return user_boundaries
+        if self.layerShapes == None:
+            self.indexLayerShapes()
+        if layer not in self.layerShapes:
+            return []
+        return self.layerShapes[layer].tolist()
+
+    def indexLayerShapes(self):
+        """
+        Flatten the shapes of all layers in one pass and bucket them by layer
+        into (n,4) arrays of unique [llx, lly, urx, ury] rectangles in user units.
+        """
+        buckets = {}
+        for (structureName, transforms) in self.instanceTransforms.items():
+            (layers, rectangles) = self.getRectanglesInStructure(structureName)
+            if len(rectangles)==0:
+                continue
+            # transform the shapes of all instances at once
+            rectangles = self.transformRectangles(rectangles,transforms)
+            layers = np.tile(layers,len(transforms))
+            for layer in np.unique(layers):
+                buckets.setdefault(int(layer),[]).append(rectangles[layers==layer])
 
+        self.layerShapes = {}
+        for (layer, rectangleList) in buckets.items():
+            rectangles = np.unique(np.concatenate(rectangleList),axis=0)
+            # Convert to user units
+            self.layerShapes[layer] = rectangles*self.units[0]
+
+    def getRectanglesInStructure(self,structureName):
+        """
+        Return the layers and a (n,4) array of the untransformed rectangles
+        in a structure in the form [llx, lly, urx, ury].
+        """
+        layers = []
+        rectangles = []
+        for boundary in self.structures[str(structureName)].boundaries:
+            # Only rectangles, see getShapesInStructure
+            if len(boundary.coordinates)!=5:
+                continue
+            left_bottom=boundary.coordinates[0]
+            right_top=boundary.coordinates[2]
+            layers.append(boundary.drawingLayer)
+            rectangles.append([left_bottom[0],left_bottom[1],right_top[0],right_top[1]])
+        return (np.array(layers,dtype=int),np.array(rectangles,dtype=float).reshape(-1,4))
+
+    def transformRectangles(self,rectangles,transforms):
+        """
+        Transform a (n,4) array of rectangles by a (m,3,3) stack of transforms
+        and return the (m*n,4) array of left, bottom, right, top values.
+        """
+        # (m,1) rows of each transform against (1,n) rectangle coordinates
+        (ux, vx, ox) = [transforms[:,0,i].reshape(-1,1) for i in range(3)]
+        (uy, vy, oy) = [transforms[:,1,i].reshape(-1,1) for i in range(3)]
+        (llx, lly, urx, ury) = [rectangles[:,i] for i in range(4)]
+        x0 = llx*ux+lly*vx
+        y0 = llx*uy+lly*vy
+        x1 = urx*ux+ury*vx
+        y1 = urx*uy+ury*vy
+        return np.stack([np.minimum(x0,x1)+ox, np.minimum(y0,y1)+oy,
+                         np.maximum(x0,x1)+ox, np.maximum(y0,y1)+oy], axis=-1).reshape(-1,4)
 
     def getShapesInStructure(self,layer,structure):
         """ 
@@ -829,3 +972,160 @@ def boundaryArea(A):
     area_A=(A[2]-A[0])*(A[3]-A[1])
     return area_A
 
+
+def newSref(structureName,offsetInLayoutUnits,mirror=None,rotate=None):
+    """
+    Returns a reference to a structure at an offset in layout units.
+    """
+    layoutToAddSref = GdsSref()
+    layoutToAddSref.sName = structureName
+    layoutToAddSref.coordinates = offsetInLayoutUnits
+
+    if mirror or rotate:
+            
+        layoutToAddSref.transFlags = [0,0,0]
+        # transFlags = (mirror around x-axis, magnification, rotation)
+        # If magnification or rotation is true, it is the flags are then
+        # followed by an amount in the record
+        if mirror=="R90":
+            rotate = 90.0
+        if mirror=="R180":
+            rotate = 180.0
+        if mirror=="R270":
+            rotate = 270.0
+        if rotate:
+            #layoutToAddSref.transFlags[2] = 1
+            layoutToAddSref.rotateAngle = rotate
+        if mirror == "x" or mirror == "MX":
+            layoutToAddSref.transFlags[0] = 1
+        if mirror == "y" or mirror == "MY": #NOTE: "MY" option will override specified rotate angle
+            layoutToAddSref.transFlags[0] = 1
+            #layoutToAddSref.transFlags[2] = 1
+            layoutToAddSref.rotateAngle = 180.0
+        if mirror == "xy" or mirror == "XY": #NOTE: "XY" option will override specified rotate angle
+            #layoutToAddSref.transFlags[2] = 1
+            layoutToAddSref.rotateAngle = 180.0
+    return layoutToAddSref
+
+def newBoundary(layerNumber,purposeNumber,offsetInLayoutUnits,widthInLayoutUnits,heightInLayoutUnits,center=False):
+    """
+    Returns a box boundary with its offset and size in layout units.
+    """
+    if not center:
+        coordinates=[offsetInLayoutUnits,
+                     (offsetInLayoutUnits[0]+widthInLayoutUnits,offsetInLayoutUnits[1]),
+                     (offsetInLayoutUnits[0]+widthInLayoutUnits,offsetInLayoutUnits[1]+heightInLayoutUnits),
+                     (offsetInLayoutUnits[0],offsetInLayoutUnits[1]+heightInLayoutUnits),
+                     offsetInLayoutUnits]
+    else:
+        startPoint = (offsetInLayoutUnits[0]-widthInLayoutUnits/2.0, offsetInLayoutUnits[1]-heightInLayoutUnits/2.0) 
+        coordinates=[startPoint,
+                     (startPoint[0]+widthInLayoutUnits,startPoint[1]),
+                     (startPoint[0]+widthInLayoutUnits,startPoint[1]+heightInLayoutUnits),
+                     (startPoint[0],startPoint[1]+heightInLayoutUnits),
+                     startPoint]
+
+    boundaryToAdd = GdsBoundary()
+    boundaryToAdd.drawingLayer = layerNumber
+    boundaryToAdd.dataType = 0
+    boundaryToAdd.coordinates = coordinates
+    boundaryToAdd.purposeLayer = purposeNumber
+    return boundaryToAdd
+
+def newPath(layerNumber,purposeNumber,layoutUnitCoordinates,widthInLayoutUnits):
+    """
+    Returns a path with its coordinates and width in layout units.
+    """
+    pathToAdd = GdsPath()
+    pathToAdd.drawingLayer=layerNumber
+    pathToAdd.purposeLayer = purposeNumber
+    pathToAdd.pathWidth=widthInLayoutUnits
+    pathToAdd.coordinates=layoutUnitCoordinates
+    return pathToAdd
+
+def newText(text,layerNumber,purposeNumber,offsetInLayoutUnits,magnification,rotate=None):
+    """
+    Returns a text label at an offset in layout units.
+    """
+    textToAdd = GdsText()
+    textToAdd.drawingLayer = layerNumber
+    textToAdd.purposeLayer = purposeNumber
+    textToAdd.dataType = 0
+    textToAdd.coordinates = [offsetInLayoutUnits]
+    textToAdd.transFlags = [0,0,0]  
+    if(len(text)%2 == 1):
+        text = text + '\x00'
+    textToAdd.textString = text
+    #textToAdd.transFlags[1] = 1
+    textToAdd.magFactor = magnification
+    if rotate:
+        #textToAdd.transFlags[2] = 1
+        textToAdd.rotateAngle = rotate
+    return textToAdd
+
+
+class StructureStream:
+    """
+    Class to write a single structure to a Gds2writer as it is built.
+    It has the same methods to add shapes and texts as VlsiLayout, but each
+    element is written as soon as it is added so the structure is never held
+    in memory. An instance only refers to another structure by name and that
+    structure must be written to the same stream on its own.
+    """
+
+    def __init__(self, writer, name, units=(0.001,1e-9), structure=None):
+        self.writer = writer
+        # The layout units per micron
+        self.scale = 1.0/units[0]
+        if structure:
+            #start with the elements of an existing structure
+            writer.beginStructure(name,structure.createDate,structure.modDate)
+            writer.writeElements(structure)
+        else:
+            modDate = datetime.now()
+            date = (modDate.year,
+                    modDate.month,
+                    modDate.day,
+                    modDate.hour,
+                    modDate.minute,
+                    modDate.second)
+            writer.beginStructure(name,date,date)
+
+    def close(self):
+        """
+        Method to end the structure
+        """
+        self.writer.endStructure()
+
+    def userUnits(self,microns):
+        """Utility function to convert microns to user units"""
+        return round(microns*self.scale,0)
+
+    def addInstance(self,nameOfLayout,offsetInMicrons=(0,0),mirror=None,rotate=None):
+        """
+        Method to add a reference to another structure at a particular offset.
+        """
+        offsetInLayoutUnits = (self.userUnits(offsetInMicrons[0]),self.userUnits(offsetInMicrons[1]))
+        self.writer.writeSref(newSref(nameOfLayout,offsetInLayoutUnits,mirror,rotate))
+
+    def addBox(self,layerNumber=0, purposeNumber=None, offsetInMicrons=(0,0), width=1.0, height=1.0,center=False):
+        """
+        Method to add a box to the structure
+        """
+        offsetInLayoutUnits = (self.userUnits(offsetInMicrons[0]),self.userUnits(offsetInMicrons[1]))
+        self.writer.writeBoundary(newBoundary(layerNumber,purposeNumber,offsetInLayoutUnits,
+                                              self.userUnits(width),self.userUnits(height),center))
+
+    def addPath(self, layerNumber=0, purposeNumber = None, coordinates=[(0,0)], width=1.0):
+        """
+        Method to add a path to the structure
+        """
+        layoutUnitCoordinates = [(self.userUnits(coordinate[0]),self.userUnits(coordinate[1])) for coordinate in coordinates]
+        self.writer.writePath(newPath(layerNumber,purposeNumber,layoutUnitCoordinates,self.userUnits(width)))
+
+    def addText(self, text, layerNumber=0, purposeNumber = None, offsetInMicrons=(0,0), magnification=0.1, rotate = None):
+        """
+        Method to add a text label to the structure
+        """
+        offsetInLayoutUnits = (self.userUnits(offsetInMicrons[0]),self.userUnits(offsetInMicrons[1]))
+        self.writer.writeText(newText(text,layerNumber,purposeNumber,offsetInLayoutUnits,magnification,rotate))
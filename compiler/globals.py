@@ -52,7 +52,13 @@ def parse_args():
         optparse.make_option("-c", "--characterize", action="store_false", dest="analytical_delay",
                              help="Perform characterization to calculate delays (default is analytical models)"),
         optparse.make_option("-d", "--dontpurge", action="store_false", dest="purge_temp",
-                             help="Don't purge the contents of the temp directory after a successful run")
+                             help="Don't purge the contents of the temp directory after a successful run"),
+        optparse.make_option("-j", "--threads", action="store", type="int", dest="num_threads",
+                             help="Number of parallel jobs to use for routing and characterization"),
+        optparse.make_option("--sim-cache", action="store_true", dest="use_sim_cache",
+                             help="Reuse the spice simulation results of earlier runs"),
+        optparse.make_option("--cell-cache", action="store_true", dest="use_cell_cache",
+                             help="Reuse modules generated by earlier runs")
         # -h --help is implicit.
     }
 
@@ -78,6 +78,24 @@ class options(optparse.Values):
     trim_netlist = True
     # Run with extracted parasitics
     use_pex = False
+    # Number of parallel jobs for routing and characterization
+    num_threads = 1
+    # Reuse the results of identical spice simulations from this and earlier runs
+    use_sim_cache = False
+    # The directory and the maximum size (in MB) of the simulation result cache
+    sim_cache_dir = os.path.expanduser("~/.cache/openram/sim")
+    sim_cache_size = 1024
+    # The number of threads of each spice simulation (hspice and xa)
+    spice_threads = 2
+    # The wall-clock limit (in seconds, 0 for none) of a spice simulation and how many
+    # times a simulation that times out or doesn't converge is retried with a lower accuracy
+    sim_timeout = 0
+    sim_retries = 2
+    # Reuse the modules generated by earlier runs with the same options and source code
+    use_cell_cache = False
+    # The directory and the maximum size (in MB) of the generated module cache
+    cell_cache_dir = os.path.expanduser("~/.cache/openram/cells")
+    cell_cache_size = 1024
 
     
     ###################
@@ -19,10 +19,18 @@ class grid:
     # costs are relative to a unit grid
     # non-preferred cost allows an off-direction jog of 1 grid
     # rather than 2 vias + preferred direction (cost 5)
-    VIA_COST = 2 
+    VIA_COST = 2
     NONPREFERRED_COST = 4
     PREFERRED_COST = 1
 
+    # Bits of the dense flag plane
+    BLOCKED = 1
+    SOURCE = 2
+    TARGET = 4
+    PATH = 8
+
+    # Regions with more grids than this use the sparse map only
+    MAX_DENSE_GRIDS = 2**24
 
     def __init__(self, ll, ur, track_width):
         """ Initialize the map and define the costs. """
@@ -30,76 +38,234 @@ class grid:
         # list of the source/target grid coordinates
         self.source = set()
         self.target = set()
+        # the targets indexed by row for the cost lookup
+        self.target_rows = None
 
         self.track_width = track_width
-        self.track_widths = [self.track_width, self.track_width, 1.0] 
+        self.track_widths = [self.track_width, self.track_width, 1.0]
         self.track_factor = [1/self.track_width, 1/self.track_width, 1.0]
-        
+
         # The bounds are in grids for this
         # This is really lower left bottom layer and upper right top layer in 3D.
         self.ll = vector3d(ll.x,ll.y,0).scale(self.track_factor).round()
         self.ur = vector3d(ur.x,ur.y,1).scale(self.track_factor).round()
-        
-        # let's leave the map sparse, cells are created on demand to reduce memory
+
+        # The sparse map holds cells outside of the dense region (or all of them
+        # if the region is too big). Cells are created on demand to reduce memory.
         self.map={}
 
+        # The dense planes cover ll to ur (inclusive) on both layers
+        self.dense_size = (int(self.ur.x-self.ll.x)+1, int(self.ur.y-self.ll.y)+1, 2)
+        num_grids = self.dense_size[0]*self.dense_size[1]*self.dense_size[2]
+        self.dense = num_grids <= grid.MAX_DENSE_GRIDS
+        if self.dense:
+            debug.info(2,"Dense routing grid {}".format(self.dense_size))
+            # The blocked/source/target/path flags are packed into one byte per grid
+            self.flags = np.zeros(self.dense_size, dtype=np.uint8)
+            # -1 means it isn't visited yet
+            self.cost = np.full(self.dense_size, -1, dtype=np.float32)
+        else:
+            debug.info(2,"Sparse routing grid {}".format(self.dense_size))
+
+    def dense_index(self,n):
+        """
+        Return the index of a point in the dense planes or None if
+        it is outside of the dense region.
+        """
+        if not self.dense:
+            return None
+        x = int(n.x-self.ll.x)
+        y = int(n.y-self.ll.y)
+        z = int(n.z)
+        if 0<=x<self.dense_size[0] and 0<=y<self.dense_size[1] and 0<=z<=1:
+            return (x,y,z)
+        return None
+
+    def dense_indices(self,points):
+        """
+        Split a collection of points into the index arrays of the points
+        in the dense region and a list of the remaining items.
+        """
+        if not self.dense or len(points)==0:
+            return (None,list(points))
+        # Nested collections are left to the caller
+        others = [p for p in points if not isinstance(p, vector3d)]
+        points = [p for p in points if isinstance(p, vector3d)]
+        coords = np.array([(p.x,p.y,p.z) for p in points]).reshape(-1,3)
+        xs = (coords[:,0] - self.ll.x).astype(np.int64)
+        ys = (coords[:,1] - self.ll.y).astype(np.int64)
+        zs = coords[:,2].astype(np.int64)
+        inside = (xs>=0) & (xs<self.dense_size[0]) & (ys>=0) & (ys<self.dense_size[1]) & (zs>=0) & (zs<=1)
+        outside = [p for p,i in zip(points,inside) if not i]
+        return ((xs[inside],ys[inside],zs[inside]),outside+others)
+
+    def set_flag(self,n,flag,value):
+        """
+        Set or clear a flag for a point or collection of points.
+        """
+        if isinstance(n, (list,tuple,set,frozenset)):
+            (index,sparse) = self.dense_indices(n)
+            if index:
+                if value:
+                    self.flags[index] |= flag
+                else:
+                    self.flags[index] &= ~flag & 0xff
+            for item in sparse:
+                self.set_flag(item,flag,value)
+            return
+
+        index = self.dense_index(n)
+        if index:
+            if value:
+                self.flags[index] |= flag
+            else:
+                self.flags[index] &= ~flag & 0xff
+        else:
+            self.add_map(n)
+            cell = self.map[n]
+            if flag==grid.BLOCKED:
+                cell.blocked=value
+            elif flag==grid.SOURCE:
+                cell.source=value
+            elif flag==grid.TARGET:
+                cell.target=value
+            elif flag==grid.PATH:
+                cell.path=value
+
+    def get_flag(self,n,flag):
+        """
+        Return whether a flag is set for a point.
+        """
+        index = self.dense_index(n)
+        if index:
+            return bool(self.flags[index] & flag)
+        self.add_map(n)
+        cell = self.map[n]
+        if flag==grid.BLOCKED:
+            return cell.blocked
+        elif flag==grid.SOURCE:
+            return cell.source
+        elif flag==grid.TARGET:
+            return cell.target
+        elif flag==grid.PATH:
+            return cell.path
+
     def add_all_grids(self):
         for x in range(self.ll.x, self.ur.x, 1):
             for y in range(self.ll.y, self.ur.y, 1):
                 self.add_map(vector3d(x,y,0))
                 self.add_map(vector3d(x,y,1))
-        
+
+    def get_all_grids(self):
+        """
+        Return all of the grid points that are in the map.
+        """
+        all_grids = []
+        if self.dense:
+            for x in range(self.dense_size[0]):
+                for y in range(self.dense_size[1]):
+                    all_grids.append(vector3d(x+self.ll.x,y+self.ll.y,0))
+                    all_grids.append(vector3d(x+self.ll.x,y+self.ll.y,1))
+        all_grids.extend(self.map.keys())
+        return all_grids
+
     def set_blocked(self,n,value=True):
-        if isinstance(n, (list,tuple,set,frozenset)):
-            for item in n:
-                self.set_blocked(item,value)
-        else:
-            self.add_map(n)
-            self.map[n].blocked=value
+        self.set_flag(n,grid.BLOCKED,value)
 
     def is_blocked(self,n):
         if isinstance(n, (list,tuple,set,frozenset)):
-            for item in n:
+            (index,sparse) = self.dense_indices(n)
+            if index and np.any(self.flags[index] & grid.BLOCKED):
+                return True
+            for item in sparse:
                 if self.is_blocked(item):
                     return True
             else:
                 return False
         else:
-            self.add_map(n)
-            return self.map[n].blocked
+            return self.get_flag(n,grid.BLOCKED)
 
 
     def set_path(self,n,value=True):
-        if isinstance(n, (list,tuple,set,frozenset)):
-            for item in n:
-                self.set_path(item,value)
-        else:
-            self.add_map(n)
-            self.map[n].path=value
+        self.set_flag(n,grid.PATH,value)
 
     def clear_blockages(self):
+        if self.dense:
+            self.flags &= ~grid.BLOCKED & 0xff
         for k in self.map:
             self.map[k].blocked=False
-            
+
+    def reset_cells(self):
+        """
+        Reset the dynamic info about routing in all cells.
+        See grid_cell.reset for what is cleared.
+        """
+        if self.dense:
+            self.flags &= grid.PATH
+            self.cost.fill(-1)
+        for p in self.map.values():
+            p.reset()
+
     def set_source(self,n,value=True):
         if isinstance(n, (list,tuple,set,frozenset)):
             for item in n:
                 self.set_source(item,value)
         else:
-            self.add_map(n)
-            self.map[n].source=value
+            self.set_flag(n,grid.SOURCE,value)
             self.source.add(n)
-        
+
     def set_target(self,n,value=True):
         if isinstance(n, (list,tuple,set,frozenset)):
+            points = [x for x in n if isinstance(x, vector3d)]
+            self.set_flag(points,grid.TARGET,value)
+            self.target.update(points)
             for item in n:
-                self.set_target(item,value)
+                if not isinstance(item, vector3d):
+                    self.set_target(item,value)
         else:
-            self.add_map(n)
-            self.map[n].target=value
+            self.set_flag(n,grid.TARGET,value)
             self.target.add(n)
+        # The target lookup must be rebuilt
+        self.target_rows = None
+
+    def get_min_cost(self,n):
+        """
+        Return the minimum cost found to a point (or -1 if not visited yet).
+        """
+        index = self.dense_index(n)
+        if index:
+            return float(self.cost[index])
+        self.add_map(n)
+        return self.map[n].min_cost
+
+    def set_min_cost(self,n,cost):
+        """
+        Set the minimum cost found to a point.
+        """
+        index = self.dense_index(n)
+        if index:
+            self.cost[index] = cost
+        else:
+            self.add_map(n)
+            self.map[n].min_cost = cost
+
+    def get_type(self,n):
+        """
+        Return the type character of a point for debug display.
+        """
+        for (flag,t) in [(grid.BLOCKED,"X"), (grid.SOURCE,"S"), (grid.TARGET,"T"), (grid.PATH,"P")]:
+            if self.get_flag(n,flag):
+                return t
+        return None
+
+    def get_cost(self,n):
+        """
+        Return the cost of a point in the frontier for debug display.
+        """
+        cost = self.get_min_cost(n)
+        if cost > 0:
+            return cost
 
-        
     def add_source(self,track_list,value=True):
         debug.info(3,"Adding source list={0}".format(str(track_list)))
         for n in track_list:
@@ -111,37 +277,38 @@ class grid:
     def add_target(self,track_list,value=True):
         debug.info(3,"Adding target list={0}".format(str(track_list)))
         for n in track_list:
-            debug.info(4,"Adding target ={0}".format(str(n)))                                
+            debug.info(4,"Adding target ={0}".format(str(n)))
             self.set_target(n,value)
-            self.set_blocked(n,False)            
+            self.set_blocked(n,False)
 
     def is_target(self,point):
         """
         Point is in the target set, so we are done.
         """
         return point in self.target
-            
+
     def add_map(self,n):
         """
-        Add a point to the map if it doesn't exist.
+        Add a point to the sparse map if it doesn't exist.
+        Points in the dense region always exist.
         """
         if isinstance(n, (list,tuple,set,frozenset)):
             for item in n:
                 self.add_map(item)
         else:
-            if n not in self.map:
+            if n not in self.map and self.dense_index(n)==None:
                 self.map[n]=grid_cell()
-        
+
 
     def block_path(self,path):
-        """ 
-        Mark the path in the routing grid as blocked. 
+        """
+        Mark the path in the routing grid as blocked.
         Also unsets the path flag.
         """
         path.set_path(False)
         path.set_blocked(True)
-            
-    
 
-        
-        
+
+
+
+
@@ -19,6 +19,8 @@ from vector3d import vector3d
 from globals import OPTS,print_time
 from pprint import pformat
 import grid_utils
+from grid import grid
+import multiprocessing
 from datetime import datetime
 
 class router(router_tech):
@@ -961,12 +963,7 @@ class router(router_tech):
         if path:
             debug.info(2,"Found path: cost={0} ".format(cost))
             debug.info(3,str(path))
-            
-            self.paths.append(path)
-            self.add_route(path)
-            
-            path_set = grid_utils.flatten_set(path)
-            self.path_blockages.append(path_set)
+            self.add_path(path)
         else:
             self.write_debug_gds("failed_route.gds")
             # clean up so we can try a reroute
@@ -974,6 +971,118 @@ class router(router_tech):
             return False
         return True
 
+    def add_path(self, path):
+        """
+        Add a found path to the design and block it for the later routes.
+        """
+        self.paths.append(path)
+        self.add_route(path)
+        
+        path_set = grid_utils.flatten_set(path)
+        self.path_blockages.append(path_set)
+
+    def prepare_net(self, net):
+        """ 
+        Set up the blockages, source and target on the grid for routing a net.
+        """
+        debug.error("Must override pure virtual function.",-1)
+
+    def route_net(self, net, detour_scale):
+        """ 
+        Route a single net on the shared grid.
+        """
+        self.prepare_net(net)
+        return self.run_router(detour_scale)
+
+    def net_sources(self, net):
+        """ 
+        Return the source grids of a net.
+        """
+        debug.error("Must override pure virtual function.",-1)
+
+    def net_region(self, net, detour_scale):
+        """
+        Return the [ll, ur] grid bounding box that a route of the net can explore.
+        Every step costs at least one, so a route never gets further from its
+        source than the cost bound of the A* search.
+        The targets of the net must already be set in the grid.
+        """
+        sources = self.net_sources(net)
+        cost_bound = max(detour_scale*self.rg.cost_to_target(x)*grid.PREFERRED_COST for x in sources)
+        # One more grid for the target that is reached from the last expansion
+        halo = math.ceil(cost_bound) + 1
+        lx = min(x.x for x in sources) - halo
+        ly = min(x.y for x in sources) - halo
+        ux = max(x.x for x in sources) + halo
+        uy = max(x.y for x in sources) + halo
+        return [vector(lx,ly), vector(ux,uy)]
+
+    def schedule_nets(self, nets, detour_scale):
+        """
+        Group consecutive nets into batches whose routing regions do not overlap.
+        Nets in a batch cannot block each other, so they can be routed
+        concurrently and still get the same paths as routing in order.
+        """
+        batches = []
+        batch = []
+        regions = []
+        for net in nets:
+            region = self.net_region(net, detour_scale)
+            overlaps = any(region[0].x<=r[1].x and r[0].x<=region[1].x and
+                           region[0].y<=r[1].y and r[0].y<=region[1].y for r in regions)
+            if overlaps:
+                batches.append(batch)
+                batch = []
+                regions = []
+            batch.append(net)
+            regions.append(region)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def route_nets(self, nets, detour_scale):
+        """
+        Route a list of nets in order. If OPTS.num_threads is more than one,
+        batches of non-overlapping nets are routed concurrently in forked
+        processes that each work on a copy-on-write snapshot of the grid. The
+        paths are added in the original net order and any path that conflicts
+        with a previous path in the batch is ripped up and rerouted.
+        """
+        if OPTS.num_threads<=1 or len(nets)<=1 or "fork" not in multiprocessing.get_all_start_methods():
+            for net in nets:
+                self.route_net(net, detour_scale)
+            return
+
+        global active_router
+        batches = self.schedule_nets(nets, detour_scale)
+        debug.info(1,"Routing {0} nets in {1} batches with {2} processes.".format(len(nets),
+                                                                                   len(batches),
+                                                                                   OPTS.num_threads))
+        for batch in batches:
+            if len(batch)==1:
+                self.route_net(batch[0], detour_scale)
+                continue
+
+            # The workers are forked from the current state of the grid
+            active_router = self
+            context = multiprocessing.get_context("fork")
+            with context.Pool(min(OPTS.num_threads,len(batch))) as pool:
+                results = pool.map(route_net_job, [(net, detour_scale) for net in batch])
+            active_router = None
+
+            routed_grids = set()
+            for (net,(path,cost)) in zip(batch,results):
+                path_set = grid_utils.flatten_set(path) if path else set()
+                if not path or path_set & routed_grids:
+                    debug.info(2,"Rerouting net {}".format(net))
+                    if self.route_net(net, detour_scale):
+                        routed_grids.update(self.path_blockages[-1])
+                    continue
+                debug.info(2,"Found path: cost={0} ".format(cost))
+                debug.info(3,str(path))
+                self.add_path(path)
+                routed_grids.update(path_set)
+
 
     def annotate_pin_and_tracks(self, pin, tracks):
         """"
@@ -1019,7 +1128,7 @@ class router(router_tech):
                            offset=shape[0],
                            width=shape[1].x-shape[0].x,
                            height=shape[1].y-shape[0].y)
-        t=self.rg.map[g].get_type()
+        t=self.rg.get_type(g)
                 
         # midpoint offset
         off=vector((shape[1].x+shape[0].x)/2,
@@ -1035,7 +1144,7 @@ class router(router_tech):
                                 layer="text",
                                 offset=type_off)
 
-        t=self.rg.map[g].get_cost()
+        t=self.rg.get_cost(g)
         partial_track=vector(self.track_width/6.0,0) 
         if t!=None:
             if g[2]==1:
@@ -1068,7 +1177,7 @@ class router(router_tech):
         
         if show_all_grids:
             self.rg.add_all_grids()
-            for g in self.rg.map:
+            for g in self.rg.get_all_grids():
                 self.annotate_grid(g)
             
         if show_blockages:
@@ -1082,7 +1191,7 @@ class router(router_tech):
                                    height=ur.y-ll.y)
         if show_blockage_grids:
             self.set_blockages(self.blocked_grids,True)
-            for g in self.rg.map:
+            for g in self.rg.get_all_grids():
                 self.annotate_grid(g)
 
         if show_enclosures:
@@ -1097,6 +1206,18 @@ class router(router_tech):
                                            width=pin.width(),
                                            height=pin.height())
     
+# The router whose grid is copied by the forked routing processes
+active_router = None
+
+def route_net_job(args):
+    """
+    Route a net on the forked copy of the active router's grid and return the
+    path without adding it to the design.
+    """
+    (net, detour_scale) = args
+    active_router.prepare_net(net)
+    return active_router.rg.route(detour_scale)
+
 # FIXME: This should be replaced with vector.snap_to_grid at some point
 
 def snap_to_grid(offset):
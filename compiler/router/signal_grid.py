@@ -8,11 +8,13 @@
 from itertools import tee
 import debug
 from heapq import heappush,heappop
-from copy import deepcopy
+from bisect import bisect_left
+import math
 
 from grid import grid
 from grid_path import grid_path
 from vector3d import vector3d
+from direction import direction
 
 class signal_grid(grid):
     """
@@ -25,27 +27,32 @@ class signal_grid(grid):
         
         # priority queue for the maze routing
         self.q = []
+        # the node each visited node was reached from
+        self.parent = {}
+        # the neighbor offsets in each of the four cardinal directions plus up or down
+        self.offsets = direction.cardinal_offsets(True)
 
     def reinit(self):
         """ Reinitialize everything for a new route. """
 
         # Reset all the cells in the map
-        for p in self.map.values():
-            p.reset()
+        self.reset_cells()
         
         # clear source and target pins
-        self.source=[]
-        self.target=[]
+        self.source=set()
+        self.target=set()
+        self.target_rows = None
         
         # Clear the queue 
         while len(self.q)>0:
             heappop(self.q)
+        self.parent = {}
         self.counter = 0
 
     def init_queue(self):
         """
         Populate the queue with all the source pins with cost
-        to the target. Each item is a path of the grid cells.
+        to the target. Each item is a grid node with its cost so far.
         We will use an A* search, so this cost must be pessimistic.
         Cost so far will be the length of the path.
         """
@@ -57,7 +64,9 @@ class signal_grid(grid):
         for s in self.source:
             cost = self.cost_to_target(s)
             debug.info(3,"Init: cost=" + str(cost) + " " + str([s]))
-            heappush(self.q,(cost,self.counter,grid_path([vector3d(s)])))
+            self.set_min_cost(s, 0)
+            self.parent[s] = None
+            heappush(self.q,(cost,self.counter,0,s))
             self.counter+=1
 
             
@@ -65,6 +74,9 @@ class signal_grid(grid):
         """
         This does the A* maze routing with preferred direction routing.
         This only works for 1 track wide routes!
+        The queue holds single grid nodes. The cost so far of each node is kept
+        in the grid and the path is only reconstructed from the parents
+        once a target is reached.
         """
         
         # We set a cost bound of the HPWL for run-time. This can be 
@@ -80,68 +92,92 @@ class signal_grid(grid):
         # Make sure the queue is empty if we run another route
         while len(self.q)>0:
             heappop(self.q)
+        self.parent = {}
             
         # Put the source items into the queue
         self.init_queue()
-        cheapest_path = None
-        cheapest_cost = None
 
-            
         # Keep expanding and adding to the priority queue until we are done
         while len(self.q)>0:
-            # should we keep the path in the queue as well or just the final node?
-            (cost,count,curpath) = heappop(self.q)
+            (cost,count,current_cost,cur) = heappop(self.q)
+            # Skip stale entries that were improved after being enqueued
+            if current_cost > self.get_min_cost(cur):
+                continue
             debug.info(3,"Queue size: size=" + str(len(self.q)) + " " + str(cost))
-            debug.info(4,"Expanding: cost=" + str(cost) + " " + str(curpath))
+            debug.info(4,"Expanding: cost=" + str(cost) + " " + str(cur))
             
-            # expand the last element
-            neighbors =  self.expand_dirs(curpath)
+            # expand the current node
+            neighbors =  self.expand_dirs(cur)
             debug.info(4,"Neighbors: " + str(neighbors))
             
             for n in neighbors:
-                # make a new copy of the path to not update the old ones
-                newpath = deepcopy(curpath)
-                # node is added to the map by the expand routine
-                newpath.append(n)
+                new_cost = current_cost + self.step_cost(cur, n)
                 # check if we hit the target and are done
-                if self.is_target(n[0]): # This uses the [0] item because we are assuming 1-track wide
-                    return (newpath,newpath.cost())
+                if self.is_target(n):
+                    self.parent[n] = cur
+                    return (self.reconstruct_path(n), new_cost)
                 else:
                     # current path cost + predicted cost
-                    current_cost = newpath.cost()
-                    target_cost = self.cost_to_target(n[0])
-                    predicted_cost = current_cost +  target_cost
+                    target_cost = self.cost_to_target(n)
+                    predicted_cost = new_cost + target_cost
                     # only add the cost if it is less than our bound
                     if (predicted_cost < cost_bound):
-                        if (self.map[n[0]].min_cost==-1 or predicted_cost<self.map[n[0]].min_cost):
-                            self.map[n[0]].min_path = newpath
-                            self.map[n[0]].min_cost = predicted_cost
-                            debug.info(4,"Enqueuing: cost=" + str(current_cost) + "+" + str(target_cost) + " " + str(newpath))
+                        min_cost = self.get_min_cost(n)
+                        if (min_cost==-1 or new_cost<min_cost):
+                            self.set_min_cost(n, new_cost)
+                            self.parent[n] = cur
+                            debug.info(4,"Enqueuing: cost=" + str(new_cost) + "+" + str(target_cost) + " " + str(n))
                             # add the cost to get to this point if we haven't reached it yet
-                            heappush(self.q,(predicted_cost,self.counter,newpath))
+                            heappush(self.q,(predicted_cost,self.counter,new_cost,n))
                             self.counter += 1
-                        #else:
-                        #    print("Better previous cost.")
-                    #else:
-                    #    print("Cost bounded")
 
         debug.warning("Unable to route path. Expand the detour_scale to allow detours.")
         return (None,None)
 
-    def expand_dirs(self,curpath):
+    def reconstruct_path(self, n):
+        """
+        Follow the parents from a node back to a source and return the grid path.
+        """
+        nodes = []
+        while n != None:
+            nodes.append(n)
+            n = self.parent[n]
+        nodes.reverse()
+        path = grid_path()
+        for n in nodes:
+            path.append([n])
+        return path
+
+    def step_cost(self, p0, p1):
+        """
+        The cost of moving from one grid to an adjacent one. This is
+        the same per-step cost as grid_path.cost.
+        """
+        if p0.z != p1.z: # via
+            return grid.VIA_COST
+        elif p0.x != p1.x and p0.z==1: # horizontal on vertical layer
+            return grid.NONPREFERRED_COST
+        elif p0.y != p1.y and p0.z==0: # vertical on horizontal layer
+            return grid.NONPREFERRED_COST
+        else:
+            return grid.PREFERRED_COST
+
+    def expand_dirs(self,cur):
         """
         Expand each of the four cardinal directions plus up or down
-        but not expanding to blocked cells. Expands in all directions
-        regardless of preferred directions.
+        but not expanding to blocked cells or back to the parent.
+        Expands in all directions regardless of preferred directions.
         """
-        
-        # Expand all directions. 
-        neighbors = curpath.expand_dirs()
-        
-        # Filter the blocked ones
-        unblocked_neighbors = [x for x in neighbors if not self.is_blocked(x)]
+        parent = self.parent.get(cur)
+        neighbors = []
+        for offset in self.offsets:
+            n = cur + offset
+            if n.z>1 or n.z<0 or n==parent:
+                continue
+            if not self.is_blocked(n):
+                neighbors.append(n)
 
-        return unblocked_neighbors
+        return neighbors
 
 
     def hpwl(self, src, dest):
@@ -156,15 +192,53 @@ class signal_grid(grid):
             hpwl += grid.VIA_COST
         return hpwl
             
+    def index_targets(self):
+        """
+        Index the target points by row (y) with the sorted x
+        coordinates in each row for the cost to target lookup.
+        """
+        rows = {}
+        for t in self.target:
+            rows.setdefault(t.y, set()).add(t.x)
+        self.target_rows = {y: sorted(xs) for (y,xs) in rows.items()}
+        self.target_ys = sorted(self.target_rows.keys())
+
+    def row_cost_to_target(self, source, y):
+        """
+        Find the cheapest HPWL distance to any target in row y.
+        """
+        xs = self.target_rows[y]
+        i = bisect_left(xs, source.x)
+        dx = min(abs(xs[j]-source.x) for j in (i-1,i) if 0<=j<len(xs))
+        cost = dx + abs(y-source.y)
+        if dx!=0 and y!=source.y:
+            cost += grid.VIA_COST
+        return cost
+
     def cost_to_target(self,source):
         """
         Find the cheapest HPWL distance to any target point ignoring 
         blockages for A* search.
+        The rows are searched outward from the source row until they are
+        further away than the best cost found.
         """
-        any_target_element = next(iter(self.target))
-        cost = self.hpwl(source,any_target_element)
-        for t in self.target:
-            cost = min(self.hpwl(source,t),cost)
+        if self.target_rows == None:
+            self.index_targets()
+
+        cost = math.inf
+        below = bisect_left(self.target_ys, source.y) - 1
+        above = below + 1
+        while below>=0 or above<len(self.target_ys):
+            # Pick the nearer of the next rows below and above
+            if above>=len(self.target_ys) or (below>=0 and source.y-self.target_ys[below] <= self.target_ys[above]-source.y):
+                y = self.target_ys[below]
+                below -= 1
+            else:
+                y = self.target_ys[above]
+                above += 1
+            if abs(y-source.y) >= cost:
+                break
+            cost = min(cost, self.row_cost_to_target(source, y))
 
         return cost
 
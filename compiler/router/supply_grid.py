@@ -29,9 +29,9 @@ class supply_grid(signal_grid):
         """ Reinitialize everything for a new route. """
         self.source = set()
         self.target = set()
+        self.target_rows = None
         # Reset all the cells in the map
-        for p in self.map.values():
-            p.reset()
+        self.reset_cells()
         
 
     def find_start_wave(self, wave, direct):
@@ -376,33 +376,52 @@ class supply_router(router):
         debug.info(1,"Maze routing {0} with {1} pin components to connect.".format(pin_name,
                                                                                    remaining_components))
 
-        for index,pg in enumerate(self.pin_groups[pin_name]):
-            if pg.is_routed():
-                continue
-            
-            debug.info(3,"Routing component {0} {1}".format(pin_name, index))
+        nets = [(pin_name,index) for (index,pg) in enumerate(self.pin_groups[pin_name]) if not pg.is_routed()]
+        # The rails are the target of every component, which is needed
+        # to find the routing region of each one
+        self.rg.reinit()
+        self.add_supply_rail_target(pin_name)
+        self.route_nets(nets, detour_scale=5)
+
+    def net_sources(self, net):
+        """
+        The source of a net is a single pin component.
+        """
+        (pin_name, index) = net
+        return self.pin_groups[pin_name][index].grids
 
-            # Clear everything in the routing grid.
-            self.rg.reinit()
+    def prepare_net(self, net):
+        """
+        Set up the grid to route a single pin component to the supply rails.
+        """
+        (pin_name, index) = net
+        debug.info(3,"Routing component {0} {1}".format(pin_name, index))
 
-            # This is inefficient since it is non-incremental, but it was
-            # easier to debug.
-            self.prepare_blockages(pin_name)
+        # Clear everything in the routing grid.
+        self.rg.reinit()
+
+        # This is inefficient since it is non-incremental, but it was
+        # easier to debug.
+        self.prepare_blockages(pin_name)
             
-            # Add the single component of the pin as the source
-            # which unmarks it as a blockage too
-            self.add_pin_component_source(pin_name,index)
+        # Add the single component of the pin as the source
+        # which unmarks it as a blockage too
+        self.add_pin_component_source(pin_name,index)
 
-            # Add all of the rails as targets
-            # Don't add the other pins, but we could?
-            self.add_supply_rail_target(pin_name)
+        # Add all of the rails as targets
+        # Don't add the other pins, but we could?
+        self.add_supply_rail_target(pin_name)
 
-            # Actually run the A* router
-            if not self.run_router(detour_scale=5):
-                self.write_debug_gds("debug_route.gds",False)
-                
-            #if index==3 and pin_name=="vdd":
-            #    self.write_debug_gds("route.gds",False)
+    def route_net(self, net, detour_scale):
+        """
+        Route a single pin component to the supply rails.
+        """
+        self.prepare_net(net)
+        # Actually run the A* router
+        if not self.run_router(detour_scale=detour_scale):
+            self.write_debug_gds("debug_route.gds",False)
+            return False
+        return True
 
     
     def add_supply_rail_target(self, pin_name):
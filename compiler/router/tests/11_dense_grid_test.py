@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"Check that the dense and the sparse routing grids give the same routes"
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],"../.."))
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+class dense_grid_test(openram_test):
+    """
+    Route on a grid with dense planes and on one with only the sparse map.
+    """
+
+    def route_maze(self):
+        """
+        Route around a wall on a small grid. Some of the blockages and
+        the target are outside of the grid region.
+        """
+        from signal_grid import signal_grid
+        from vector import vector
+        from vector3d import vector3d
+        rg = signal_grid(vector(0,0), vector(10,10), 1.0)
+        rg.set_blocked([vector3d(5,y,z) for y in range(0,9) for z in range(2)])
+        rg.set_blocked([vector3d(x,3,1) for x in range(-3,5)])
+        rg.set_blocked(vector3d(5,4,0), False)
+        rg.add_source([vector3d(1,1,0)])
+        rg.add_target([vector3d(12,2,0)])
+        flags = [(x,y,z,rg.get_type(vector3d(x,y,z)))
+                 for x in range(-3,14) for y in range(-1,12) for z in range(2)]
+        (path,cost) = rg.route(detour_scale=5)
+        rg.reinit()
+        reset_flags = [(x,y,z,rg.get_type(vector3d(x,y,z)))
+                       for x in range(-3,14) for y in range(-1,12) for z in range(2)]
+        return (flags, [str(p) for p in path], cost, reset_flags)
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        from grid import grid
+        OPTS.route_supplies = True
+
+        results = []
+        max_dense_grids = grid.MAX_DENSE_GRIDS
+        for dense in [True, False]:
+            debug.info(1,"Routing with a {} grid".format("dense" if dense else "sparse"))
+            grid.MAX_DENSE_GRIDS = max_dense_grids if dense else 0
+            results.append((self.route_maze(), self.route_sram()))
+        grid.MAX_DENSE_GRIDS = max_dense_grids
+
+        ((dense_maze, dense_sram), (sparse_maze, sparse_sram)) = results
+        self.assertEqual(dense_maze, sparse_maze)
+        (flags, path, cost, reset_flags) = dense_maze
+        self.assertGreater(len(path), 0)
+        self.assertIn((12,2,0,"T"), flags)
+        self.assertIn((-3,3,1,"X"), flags)
+        self.assertNotIn((5,4,0,"X"), flags)
+        self.assertEqual(sorted(dense_sram.keys()), sorted(sparse_sram.keys()))
+        for name in dense_sram.keys():
+            self.assertEqual(dense_sram[name], sparse_sram[name])
+
+        # fails if there are any DRC errors on any cells
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
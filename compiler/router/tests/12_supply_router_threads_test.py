@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"Check that routing the supplies in parallel gives the same routes as in order"
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],"../.."))
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+import debug
+
+OPTS = globals.OPTS
+
+class supply_router_threads_test(openram_test):
+    """
+    Route the supplies of an SRAM with one and with several processes.
+    """
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        OPTS.route_supplies = True
+
+        results = []
+        for num_threads in [1, 2]:
+            debug.info(1,"Routing with {} processes".format(num_threads))
+            OPTS.num_threads = num_threads
+            results.append(self.route_sram())
+        OPTS.num_threads = 1
+
+        (serial_sram, parallel_sram) = results
+        self.assertEqual(sorted(serial_sram.keys()), sorted(parallel_sram.keys()))
+        for name in serial_sram.keys():
+            self.assertEqual(serial_sram[name], parallel_sram[name])
+
+        # fails if there are any DRC errors on any cells
+        globals.end_openram()
+
+# instantiate a copy of the class to actually run the test
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -247,6 +247,33 @@ class openram_test(unittest.TestCase):
             debug.info(2,"MATCH {0} {1}".format(filename1,filename2))
         return True
 
+    def route_sram(self):
+        """
+        Build a 4 bit, 16 word SRAM with routed supplies and return the shapes,
+        instances and labels of each structure in its layout.
+        """
+        from sram_factory import factory
+        from sram_config import sram_config
+        import gdsMill
+        from tech import GDS
+        factory.reset()
+        c = sram_config(word_size=4,
+                        num_words=16,
+                        num_banks=1)
+        c.words_per_row=1
+        c.recompute_sizes()
+        s = factory.create(module_type="sram", sram_config=c)
+        gds_file = OPTS.openram_temp + "temp.gds"
+        s.gds_write(gds_file)
+        layout = gdsMill.VlsiLayout(units=GDS["unit"])
+        gdsMill.Gds2reader(layout).loadFromFile(gds_file)
+        structures = {}
+        for (name, structure) in layout.structures.items():
+            structures[name] = (sorted((b.drawingLayer, b.coordinates) for b in structure.boundaries),
+                                sorted((s.sName, s.coordinates, s.transFlags) for s in structure.srefs),
+                                sorted((t.textString, t.coordinates) for t in structure.texts))
+        return structures
+
 def header(filename, technology):
     # Skip the header for gitlab regression
     import getpass
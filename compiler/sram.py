@@ -47,6 +47,10 @@ class sram():
         self.s.create_netlist()
         if not OPTS.netlist_only:
             self.s.create_layout()
+
+        from sram_factory import factory
+        factory.report()
+        factory.save_cells()
         
         if not OPTS.is_unit_test:
             print_time("SRAM creation", datetime.datetime.now(), start_time)
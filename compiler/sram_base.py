@@ -18,6 +18,7 @@ from design import design
 from verilog import verilog
 from lef import lef
 from sram_factory import factory
+from hierarchy_spice import open_netlist
 import logical_effort
 
 class sram_base(design, verilog, lef):
@@ -491,7 +492,7 @@ class sram_base(design, verilog, lef):
         ############################################################
         # Spice circuit
         ############################################################
-        sp = open(sp_name, 'w')
+        sp = open_netlist(sp_name)
 
         sp.write("**************************************************\n")
         sp.write("* OpenRAM generated memory.\n")
@@ -505,9 +506,7 @@ class sram_base(design, verilog, lef):
         # sp.write("* User: {0}\n".format(getpass.getuser()))
         # sp.write(".global {0} {1}\n".format(spice["vdd_name"], 
         #                                     spice["gnd_name"]))
-        usedMODS = list()
-        self.sp_write_file(sp, usedMODS)
-        del usedMODS
+        self.sp_write_file(sp, set())
         sp.close()
 
         
@@ -27,6 +27,19 @@ class sram_factory:
         self.module_indices = {}
         # A dictionary of instance lists indexed by module type
         self.objects = {}
+        # A dictionary of instances indexed by module type and then by the key of their arguments
+        self.object_index = {}
+        # The number of reused and created instances indexed by module type
+        self.hits = {}
+        self.misses = {}
+        # The module type and arguments of each instance indexed by its id
+        self.object_args = {}
+        # The cache keys, instances and factory calls of the modules that were not found in the cell cache
+        self.new_cells = []
+        # The factory calls made while each module that is being created is built
+        self.call_stack = []
+        # The number of instances loaded from the cell cache
+        self.cache_loads = 0
 
     def reset(self):
         """
@@ -49,6 +62,11 @@ class sram_factory:
             module_name = getattr(OPTS, module_type)
         else:
             module_name = module_type
+
+        # The modules created by a module are created again in the same order
+        # when it is loaded from the cell cache so that they get the same names
+        if len(self.call_stack)>0:
+            self.call_stack[-1].append((module_type, kwargs))
         
         # Either retrieve the already loaded module or load it
         try:
@@ -59,17 +77,25 @@ class sram_factory:
             self.modules[module_type] = mod
             self.module_indices[module_type] = 0
             self.objects[module_type] = []
+            self.object_index[module_type] = {}
+            self.hits[module_type] = 0
+            self.misses[module_type] = 0
             
         # Either retreive a previous object or create a new one
-        #print("new",kwargs)
-        for obj in self.objects[module_type]:
-            (obj_kwargs, obj_item) = obj
-            # Must have the same dictionary exactly (conservative)
-            if obj_kwargs == kwargs:
-                #debug.info(0, "Existing module: type={0} name={1} kwargs={2}".format(module_type, obj_item.name, str(kwargs)))
-                return obj_item
-            #else:
-            #    print("obj",obj_kwargs)
+        key = self.get_key(kwargs)
+        if key != None:
+            if key in self.object_index[module_type]:
+                self.hits[module_type] += 1
+                return self.object_index[module_type][key]
+        else:
+            # Arguments that can't be hashed are compared with every previous object
+            for obj in self.objects[module_type]:
+                (obj_kwargs, obj_item) = obj
+                # Must have the same dictionary exactly (conservative)
+                if obj_kwargs == kwargs:
+                    self.hits[module_type] += 1
+                    return obj_item
+        self.misses[module_type] += 1
 
         # Use the default  name if there are default arguments
         # This is especially for library cells so that the spice and gds files can be found.
@@ -78,11 +104,92 @@ class sram_factory:
             module_name = "{0}_{1}".format(module_name, self.module_indices[module_type])
             self.module_indices[module_type] += 1
             
-        #debug.info(0, "New module: type={0} name={1} kwargs={2}".format(module_type,module_name,str(kwargs)))
-        obj = mod(name=module_name,**kwargs)
+        # Generated modules are loaded from the cell cache of earlier runs if they are there
+        obj = None
+        cache_key = None
+        self.call_stack.append([])
+        try:
+            if OPTS.use_cell_cache and len(kwargs)>0:
+                import cell_cache
+                cache_key = cell_cache.get_key(module_type, module_name, kwargs)
+                if cache_key != None:
+                    obj = cell_cache.load(self, cache_key, module_name)
+            if obj != None:
+                self.cache_loads += 1
+            else:
+                #debug.info(0, "New module: type={0} name={1} kwargs={2}".format(module_type,module_name,str(kwargs)))
+                obj = mod(name=module_name,**kwargs)
+                if cache_key != None and not obj.is_library_cell:
+                    self.new_cells.append((cache_key, obj, self.call_stack[-1]))
+        finally:
+            self.call_stack.pop()
         self.objects[module_type].append((kwargs,obj))
+        self.object_args[id(obj)] = (module_type, kwargs)
+        if key != None:
+            self.object_index[module_type][key] = obj
         return obj
 
+    def get_key(self, value):
+        """
+        Return a hashable key of an argument value so that equal values have
+        equal keys. The type of sequences is part of the key because a list
+        is never equal to a tuple. Returns None if the value can't be hashed.
+        """
+        if isinstance(value, dict):
+            items = []
+            for (name, item) in value.items():
+                item_key = self.get_key(item)
+                if item_key == None:
+                    return None
+                items.append((name, item_key))
+            return (dict, frozenset(items))
+        elif isinstance(value, (list, tuple)):
+            items = []
+            for item in value:
+                item_key = self.get_key(item)
+                if item_key == None:
+                    return None
+                items.append(item_key)
+            return (type(value), tuple(items))
+        elif isinstance(value, (set, frozenset)):
+            return (frozenset, frozenset(value))
+        try:
+            hash(value)
+        except TypeError:
+            return None
+        return value
+
+    def get_args(self, obj):
+        """ Return the module type and arguments an instance was created with or None. """
+        return self.object_args.get(id(obj))
+
+    def save_cells(self):
+        """
+        Save the modules that were generated in this run to the cell cache.
+        This is done once the modules are complete since parent modules may
+        still add to them after they are created.
+        """
+        if not OPTS.use_cell_cache or len(self.new_cells)==0:
+            return
+        import cell_cache
+        saved = 0
+        for (cache_key, obj, calls) in self.new_cells:
+            if cell_cache.store(self, cache_key, obj, calls):
+                saved += 1
+        cell_cache.evict()
+        debug.info(1, "Saved {0} of {1} generated modules to the cell cache".format(saved, len(self.new_cells)))
+        self.new_cells = []
+
+    def report(self):
+        """ Report how many modules of each type were created and reused. """
+        for module_type in sorted(self.objects.keys()):
+            debug.info(1, "Factory {0}: {1} created, {2} reused".format(module_type,
+                                                                         self.misses[module_type],
+                                                                         self.hits[module_type]))
+        debug.info(1, "Factory total: {0} created, {1} reused, {2} loaded from the cell cache".format(sum(self.misses.values()),
+                                                                                                    sum(self.hits.values()),
+                                                                                                    self.cache_loads))
+
         
 # Make a factory
 factory = sram_factory()
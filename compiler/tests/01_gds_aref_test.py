@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"Check that array references are written, read and flattened like a grid of structure references"
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class gds_aref_test(openram_test):
+
+    # (columns, rows, origin, column pitch, row pitch, mirror, rotate angle)
+    arrays = [(3, 2, (100,200), (50,0), (0,80), 0, ""),
+              (2, 4, (-300,0), (0,70), (-60,0), 1, 90.0)]
+
+    def new_structure(self, name):
+        import gdsMill
+        structure = gdsMill.GdsStructure()
+        structure.name = name
+        structure.createDate = (2019,1,1,0,0,0)
+        structure.modDate = (2019,1,1,0,0,0)
+        return structure
+
+    def write_layout(self, gds_file, use_arefs):
+        """
+        Write a cell with two shapes and a main structure that places it in two
+        arrays, either as array references or as the grid of structure references.
+        """
+        import gdsMill
+        layout = gdsMill.VlsiLayout(units=(0.001,1e-9))
+        cell = self.new_structure("cell")
+        for (layer, (llx, lly, urx, ury)) in [(1, (0,0,10,20)), (2, (5,-5,30,5))]:
+            boundary = gdsMill.GdsBoundary()
+            boundary.drawingLayer = layer
+            boundary.dataType = 0
+            boundary.coordinates = [(llx,lly), (llx,ury), (urx,ury), (urx,lly), (llx,lly)]
+            cell.boundaries.append(boundary)
+        top = self.new_structure("main")
+        for (columns, rows, origin, column_pitch, row_pitch, mirror, angle) in self.arrays:
+            if use_arefs:
+                aref = gdsMill.GdsAref()
+                aref.aName = "cell"
+                aref.transFlags = [mirror,0,0]
+                aref.rotateAngle = angle
+                aref.columns = columns
+                aref.rows = rows
+                aref.coordinates = [origin,
+                                    (origin[0]+columns*column_pitch[0], origin[1]+columns*column_pitch[1]),
+                                    (origin[0]+rows*row_pitch[0], origin[1]+rows*row_pitch[1])]
+                top.arefs.append(aref)
+                continue
+            for column in range(columns):
+                for row in range(rows):
+                    sref = gdsMill.GdsSref()
+                    sref.sName = "cell"
+                    sref.transFlags = [mirror,0,0]
+                    sref.rotateAngle = angle
+                    sref.coordinates = (origin[0]+column*column_pitch[0]+row*row_pitch[0],
+                                        origin[1]+column*column_pitch[1]+row*row_pitch[1])
+                    top.srefs.append(sref)
+        layout.structures["cell"] = cell
+        layout.structures["main"] = top
+        layout.rootStructureName = "main"
+        gdsMill.Gds2writer(layout).writeToFile(gds_file)
+
+    def read_layout(self, gds_file):
+        import gdsMill
+        layout = gdsMill.VlsiLayout(units=(0.001,1e-9))
+        gdsMill.Gds2reader(layout).loadFromFile(gds_file)
+        return layout
+
+    def flat_shapes(self, layout):
+        """ Return the sorted layer and corner points of every flattened shape. """
+        import numpy as np
+        (names, transforms) = layout.flattenStructure("main", {})
+        shapes = []
+        for (name, transform) in zip(names, transforms):
+            for boundary in layout.structures[name].boundaries:
+                points = np.array([(x, y, 1) for (x, y) in boundary.coordinates[0:4]], dtype=float)
+                corners = np.rint(np.dot(transform, points.T).T[:,0:2]).astype(int)
+                shapes.append((boundary.drawingLayer, tuple(sorted(map(tuple, corners.tolist())))))
+        return sorted(shapes)
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+
+        aref_file = OPTS.openram_temp + "aref.gds"
+        sref_file = OPTS.openram_temp + "sref.gds"
+        self.write_layout(aref_file, True)
+        self.write_layout(sref_file, False)
+
+        debug.info(2, "Reading the array references back")
+        aref_layout = self.read_layout(aref_file)
+        arefs = aref_layout.structures["main"].arefs
+        self.assertEqual(len(arefs), len(self.arrays))
+        for (aref, (columns, rows, origin, column_pitch, row_pitch, mirror, angle)) in zip(arefs, self.arrays):
+            self.assertEqual(aref.aName, "cell")
+            self.assertEqual((aref.columns, aref.rows), (columns, rows))
+            self.assertEqual(aref.coordinates[0], origin)
+            self.assertEqual(bool(aref.transFlags[0]), bool(mirror))
+            self.assertEqual(len(aref_layout.arrayTransforms(aref)), columns*rows)
+
+        debug.info(2, "Flattening the array and the structure references")
+        sref_layout = self.read_layout(sref_file)
+        aref_shapes = self.flat_shapes(aref_layout)
+        self.assertEqual(len(aref_shapes), 2*sum(columns*rows for (columns, rows, *rest) in self.arrays))
+        self.assertEqual(aref_shapes, self.flat_shapes(sref_layout))
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
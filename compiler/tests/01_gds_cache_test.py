@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"Check that library cell GDS files are only parsed when their layout is used"
+
+import unittest
+from testutils import header,openram_test
+import sys,os,glob
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+from sram_factory import factory
+import debug
+
+class gds_cache_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        import gds_cache
+        import gdsMill
+        import utils
+        from tech import GDS,layer
+
+        debug.info(2, "Reading the size and pins of the library cells")
+        gds_cache.clear()
+        utils.get_libcell_size("dff", GDS["unit"], layer["boundary"])
+        utils.get_libcell_pins(["D", "Q", "clk", "vdd", "gnd"], "dff", GDS["unit"])
+        a = factory.create(module_type="dff")
+        self.assertEqual(len(gds_cache.layouts), 0)
+
+        debug.info(2, "Using the layout geometry")
+        a.gds.structures
+        self.assertEqual(len(gds_cache.layouts), 1)
+
+        debug.info(2, "Measuring a structure without a border")
+        gds_file = OPTS.openram_temp + "pinv.gds"
+        factory.create(module_type="pinv").gds_write(gds_file)
+        shared = gds_cache.load(gds_file, GDS["unit"])
+        (root, xy_tree) = (shared.rootStructureName, list(shared.xyTree))
+        name = sorted(n for n in shared.structures.keys() if n != root)[0]
+        no_border = max(gds_cache.summary(gds_file, GDS["unit"]).layers) + 1
+        self.assertEqual(utils.get_gds_size(name, gds_file, GDS["unit"], no_border),
+                         shared.copyLayout().measureSize(name))
+        # The shared layout isn't changed by the measurement
+        self.assertEqual(shared.rootStructureName, root)
+        self.assertEqual(shared.xyTree, xy_tree)
+
+        debug.info(2, "Comparing the scanned and the parsed library cells")
+        for gds_file in sorted(glob.glob(OPTS.openram_tech + "gds_lib/*.gds")):
+            cell_summary = gds_cache.summary(gds_file, GDS["unit"])
+            cell_vlsi = gdsMill.VlsiLayout(units=GDS["unit"])
+            gdsMill.Gds2reader(cell_vlsi).loadFromFile(gds_file)
+            self.assertEqual(cell_summary.get_layout_border(layer["boundary"]),
+                             cell_vlsi.getLayoutBorder(layer["boundary"]))
+            for pin_name in cell_vlsi.pins:
+                self.assertEqual(cell_summary.get_pin_shapes(pin_name),
+                                 cell_vlsi.getPinShape(pin_name))
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"Check that the factory reuses a module only when its arguments are equal"
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+from sram_factory import factory
+import debug
+
+class unhashable_size():
+    """ An argument that can be compared but not hashed. """
+    def __init__(self, size):
+        self.size = size
+
+    def __eq__(self, other):
+        return isinstance(other, unhashable_size) and self.size == other.size
+
+class sram_factory_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+
+        # A module that only keeps its name
+        with open(OPTS.openram_temp + "factory_cell.py", "w") as f:
+            f.write("\n".join(["class factory_cell():",
+                               "    def __init__(self, name, **kwargs):",
+                               "        self.name = name",
+                               "        self.is_library_cell = False"]) + "\n")
+        sys.path.insert(0, OPTS.openram_temp)
+        factory.reset()
+
+        debug.info(2, "A list never matches a tuple")
+        a = factory.create(module_type="factory_cell", sizes=[1, 2])
+        b = factory.create(module_type="factory_cell", sizes=(1, 2))
+        self.assertIsNot(a, b)
+        self.assertNotEqual(a.name, b.name)
+        self.assertIs(factory.create(module_type="factory_cell", sizes=[1, 2]), a)
+        self.assertNotEqual(factory.get_key([1, 2]), factory.get_key((1, 2)))
+
+        debug.info(2, "The order of dictionaries doesn't matter")
+        c = factory.create(module_type="factory_cell", size=1, sizes={"nmos": 1, "pmos": 2})
+        self.assertIs(factory.create(module_type="factory_cell", sizes={"pmos": 2, "nmos": 1}, size=1), c)
+        self.assertIsNot(factory.create(module_type="factory_cell", size=1, sizes={"nmos": 1, "pmos": 3}), c)
+
+        debug.info(2, "Unhashable arguments are compared with every module")
+        self.assertEqual(factory.get_key({"size": unhashable_size(1)}), None)
+        self.assertEqual(factory.get_key([[1], unhashable_size(1)]), None)
+        d = factory.create(module_type="factory_cell", size=unhashable_size(1))
+        self.assertIs(factory.create(module_type="factory_cell", size=unhashable_size(1)), d)
+        self.assertIsNot(factory.create(module_type="factory_cell", size=unhashable_size(2)), d)
+
+        # Three modules were reused and six were created
+        self.assertEqual(factory.hits["factory_cell"], 3)
+        self.assertEqual(factory.misses["factory_cell"], 6)
+        self.assertEqual(factory.get_args(d), ("factory_cell", {"size": unhashable_size(1)}))
+
+        sys.path.remove(OPTS.openram_temp)
+        factory.reset()
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+Check that an SRAM built with cached modules is the same as one built without them
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+from sram_factory import factory
+import debug
+
+class sram_cell_cache_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        from sram_config import sram_config
+        import gdsMill
+        from tech import GDS
+
+        OPTS.use_cell_cache = True
+        OPTS.cell_cache_dir = OPTS.openram_temp + "cell_cache"
+
+        results = []
+        for build in ["cold", "warm", "truncated"]:
+            debug.info(1, "Building the SRAM with a {} cell cache".format(build))
+            if build == "truncated":
+                # Cut every entry in the middle of its module
+                for name in os.listdir(OPTS.cell_cache_dir):
+                    cache_file = os.path.join(OPTS.cell_cache_dir, name)
+                    with open(cache_file, "r+b") as f:
+                        f.truncate(os.path.getsize(cache_file) - 16)
+            factory.reset()
+            c = sram_config(word_size=4,
+                            num_words=16,
+                            num_banks=1)
+            c.words_per_row=1
+            c.recompute_sizes()
+            a = factory.create(module_type="sram", sram_config=c)
+            factory.save_cells()
+            loads = factory.cache_loads
+
+            sp_file = OPTS.openram_temp + build + ".sp"
+            gds_file = OPTS.openram_temp + build + ".gds"
+            a.sp_write(sp_file)
+            a.gds_write(gds_file)
+            with open(sp_file, "r") as f:
+                netlist = f.read()
+            layout = gdsMill.VlsiLayout(units=GDS["unit"])
+            gdsMill.Gds2reader(layout).loadFromFile(gds_file)
+            structures = {}
+            for (name, structure) in layout.structures.items():
+                structures[name] = (sorted((b.drawingLayer, b.coordinates) for b in structure.boundaries),
+                                    sorted((s.sName, s.coordinates, s.transFlags) for s in structure.srefs),
+                                    sorted((t.textString, t.coordinates) for t in structure.texts))
+            results.append((loads, netlist, structures))
+
+        ((cold_loads, cold_netlist, cold_structures), (warm_loads, warm_netlist, warm_structures),
+         (truncated_loads, truncated_netlist, truncated_structures)) = results
+        self.assertEqual(cold_loads, 0)
+        self.assertGreater(warm_loads, 0)
+        # Truncated entries are rebuilt
+        self.assertEqual(truncated_loads, 0)
+        # The modules have the same names in the netlist and the layout
+        for (netlist, structures) in [(warm_netlist, warm_structures), (truncated_netlist, truncated_structures)]:
+            self.assertEqual(cold_netlist, netlist)
+            self.assertEqual(sorted(cold_structures.keys()), sorted(structures.keys()))
+            for name in cold_structures.keys():
+                self.assertEqual(cold_structures[name], structures[name])
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
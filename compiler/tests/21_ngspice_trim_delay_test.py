@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+Compare the delay of the trimmed characterization netlist with the full netlist
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+from sram_factory import factory
+import debug
+
+class trim_delay_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        OPTS.spice_name="ngspice"
+        OPTS.analytical_delay = False
+        OPTS.netlist_only = True
+
+        # This is a hack to reload the characterizer __init__ with the spice version
+        from importlib import reload
+        import characterizer
+        reload(characterizer)
+        from characterizer import delay
+        from sram_config import sram_config
+        c = sram_config(word_size=4,
+                        num_words=32,
+                        num_banks=1)
+        c.words_per_row=2
+        c.recompute_sizes()
+        debug.info(1, "Testing the trimmed timing of a 4bit, 32words SRAM with a 2 way column mux")
+        s = factory.create(module_type="sram", sram_config=c)
+
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+
+        probe_address = "1" * s.s.addr_size
+        probe_data = s.s.word_size - 1
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        import tech
+        loads = [tech.spice["msflop_in_cap"]*4]
+        slews = [tech.spice["rise_time"]*2]
+
+        results = {}
+        for trim in [False, True]:
+            debug.info(1, "Characterizing with trim_netlist={}".format(trim))
+            OPTS.trim_netlist = trim
+            d = delay(s.s, tempspice, corner)
+            data, port_data = d.analyze(probe_address, probe_data, slews, loads)
+            # Only the timing is compared since the trimmed netlist has less leakage
+            results[trim] = {k: port_data[0][k] for k in ["delay_hl", "delay_lh", "slew_hl", "slew_lh"]}
+
+        for k in sorted(results[False].keys()):
+            (full, trimmed) = (results[False][k][0], results[True][k][0])
+            debug.info(1, "{0}: full {1} trimmed {2} error {3:.2%}".format(k, full, trimmed,
+                                                                           abs(trimmed-full)/abs(full)))
+
+        # The trimmed netlist keeps the load of the probed paths so the delays must match
+        self.assertTrue(self.check_golden_data(results[True], results[False], 0.05))
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+Check the hits and misses of the spice simulation result cache
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class sim_cache_test(openram_test):
+
+    def write_file(self, name, lines):
+        filename = OPTS.openram_temp + name
+        with open(filename, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return filename
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        from characterizer import sim_cache
+        OPTS.sim_cache_dir = OPTS.openram_temp + "sim_cache"
+
+        # A stimulus that includes a netlist that includes a subcircuit and a model library
+        self.write_file("inv.sp", [".SUBCKT inv A Z vdd gnd",
+                                   "Mp Z A vdd vdd pmos_vtg W=0.27u L=0.05u",
+                                   "Mn Z A gnd gnd nmos_vtg W=0.09u L=0.05u",
+                                   ".ENDS inv"])
+        self.write_file("models.lib", [".lib tt",
+                                       ".model nmos_vtg nmos level=1",
+                                       ".model pmos_vtg pmos level=1",
+                                       ".endl tt"])
+        self.write_file("top.sp", [".include \"inv.sp\"",
+                                   ".lib 'models.lib' tt",
+                                   "Xinv a z vdd gnd inv"])
+        stim_file = self.write_file("stim.sp", ["* stimulus",
+                                                ".include \"{}\"".format(OPTS.openram_temp + "top.sp"),
+                                                ".tran 10p 1n"])
+        output_file = self.write_file("timing.lis", ["delay = 1.0e-10"])
+
+        debug.info(1, "Storing a result and finding it again")
+        key = sim_cache.get_key(stim_file)
+        self.assertFalse(sim_cache.lookup(key, output_file))
+        sim_cache.store(key, output_file)
+        self.assertEqual(sim_cache.get_key(stim_file), key)
+        self.assertTrue(sim_cache.lookup(key, output_file))
+
+        debug.info(1, "Finding the same key in parallel jobs")
+        from characterizer.charutils import run_sim_jobs
+        OPTS.num_threads = 2
+        self.assertEqual(run_sim_jobs(sim_cache.get_key, [(stim_file,), (stim_file,)]), [key, key])
+        OPTS.num_threads = 1
+
+        debug.info(1, "Changing a file included by an included file")
+        self.write_file("inv.sp", [".SUBCKT inv A Z vdd gnd",
+                                   "Mp Z A vdd vdd pmos_vtg W=0.54u L=0.05u",
+                                   "Mn Z A gnd gnd nmos_vtg W=0.09u L=0.05u",
+                                   ".ENDS inv"])
+        inv_key = sim_cache.get_key(stim_file)
+        self.assertNotEqual(inv_key, key)
+        self.assertFalse(sim_cache.lookup(inv_key, output_file))
+
+        debug.info(1, "Changing a library and the section that is used")
+        self.write_file("models.lib", [".lib tt",
+                                       ".model nmos_vtg nmos level=1 vto=0.4",
+                                       ".model pmos_vtg pmos level=1",
+                                       ".endl tt"])
+        lib_key = sim_cache.get_key(stim_file)
+        self.assertNotEqual(lib_key, inv_key)
+        self.write_file("top.sp", [".include \"inv.sp\"",
+                                   ".lib 'models.lib' ff",
+                                   "Xinv a z vdd gnd inv"])
+        section_key = sim_cache.get_key(stim_file)
+        self.assertNotEqual(section_key, lib_key)
+        self.assertFalse(sim_cache.lookup(section_key, output_file))
+
+        debug.info(1, "Storing only the results of simulations at full accuracy")
+        from characterizer.stimuli import stimuli
+        OPTS.use_sim_cache = True
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = self.write_file("fake_ngspice", ["#!/bin/sh",
+                                                          "if grep -q \"RELTOL=0.001 \" \"$4\" && [ -n \"$FAIL_FIRST\" ]; then",
+                                                          "  echo \"doAnalyses: TRAN:  Timestep too small\"",
+                                                          "  exit 1",
+                                                          "fi",
+                                                          "echo \"delay = 1.5e-9\" > \"$3\""])
+        os.chmod(OPTS.spice_exe, 0o755)
+        OPTS.sim_retries = 2
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        for (fail_first, stored) in [(True, False), (False, True)]:
+            if fail_first:
+                os.environ["FAIL_FIRST"] = "1"
+            else:
+                os.environ.pop("FAIL_FIRST", None)
+            sf = open(stim_file, "w")
+            sf.write("* stimulus {}\n".format(fail_first))
+            stim = stimuli(sf, corner)
+            stim.write_control(1)
+            sf.close()
+            stim_key = sim_cache.get_key(stim_file)
+            stim.run_sim()
+            self.assertEqual(stim.runlvl < 4, fail_first)
+            self.assertEqual(sim_cache.lookup(stim_key, output_file), stored)
+        os.environ.pop("FAIL_FIRST", None)
+        OPTS.use_sim_cache = False
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+Check the timeouts, kills and retries of simulation jobs
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os,time
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class sim_manager_test(openram_test):
+
+    def is_running(self, pid):
+        """ Return whether a process exists and isn't a zombie. """
+        try:
+            with open("/proc/{}/status".format(pid), "r") as f:
+                return "\nState:\tZ" not in f.read()
+        except IOError:
+            return False
+
+    def write_simulator(self, lines):
+        """ Write a shell script that stands in for ngspice. """
+        simulator = OPTS.openram_temp + "fake_ngspice"
+        with open(simulator, "w") as f:
+            f.write("\n".join(["#!/bin/sh", "echo run >> {}calls".format(OPTS.openram_temp)] + lines) + "\n")
+        os.chmod(simulator, 0o755)
+        if os.path.exists(OPTS.openram_temp + "calls"):
+            os.remove(OPTS.openram_temp + "calls")
+        return simulator
+
+    def run_stimulus(self):
+        """ Write an empty stimulus and simulate it. Return the number of simulator calls. """
+        from characterizer.stimuli import stimuli
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        sf = open(OPTS.openram_temp + "stim.sp", "w")
+        stim = stimuli(sf, corner)
+        stim.write_control(1)
+        sf.close()
+        try:
+            stim.run_sim()
+        finally:
+            with open(OPTS.openram_temp + "calls", "r") as f:
+                calls = len(f.readlines())
+        return calls
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        from characterizer.sim_manager import sim_job, run_sim_job
+
+        debug.info(1, "Running a job and keeping its output")
+        job = sim_job("echo out; echo err >&2; exit 1",
+                      OPTS.openram_temp + "stdout.log",
+                      OPTS.openram_temp + "stderr.log").run()
+        self.assertEqual((job.retcode, job.stdout, job.stderr), (1, "out\n", "err\n"))
+        self.assertFalse(job.timed_out)
+        self.assertTrue(job.failed())
+        self.assertFalse(job.failed(1))
+        self.assertFalse(job.did_not_converge())
+        with open(OPTS.openram_temp + "stdout.log", "r") as f:
+            self.assertEqual(f.read(), "out\n")
+
+        debug.info(1, "Retrying a job until it converges or can't be relaxed")
+        relaxed = []
+        def relax():
+            relaxed.append(len(relaxed))
+            return len(relaxed) < 2
+        job = run_sim_job("echo Timestep too small",
+                          OPTS.openram_temp + "stdout.log",
+                          OPTS.openram_temp + "stderr.log",
+                          retries=5,
+                          relax=relax)
+        self.assertTrue(job.did_not_converge())
+        self.assertEqual(relaxed, [0, 1])
+        relaxed = []
+        job = run_sim_job("echo Timestep too small",
+                          OPTS.openram_temp + "stdout.log",
+                          OPTS.openram_temp + "stderr.log",
+                          retries=1,
+                          relax=relax)
+        self.assertEqual(relaxed, [0])
+
+        debug.info(1, "Killing a job and its children on a timeout")
+        pid_file = OPTS.openram_temp + "sleep.pid"
+        job = sim_job("sleep 30 & echo $! > {}; wait".format(pid_file),
+                      OPTS.openram_temp + "stdout.log",
+                      OPTS.openram_temp + "stderr.log",
+                      timeout=1)
+        start_time = time.time()
+        job.run()
+        self.assertLess(time.time() - start_time, 10)
+        self.assertTrue(job.timed_out)
+        self.assertTrue(job.failed())
+        self.assertTrue(job.did_not_converge())
+        with open(pid_file, "r") as f:
+            pid = int(f.read())
+        for i in range(50):
+            if not self.is_running(pid):
+                break
+            time.sleep(0.1)
+        self.assertFalse(self.is_running(pid))
+
+        debug.info(1, "Retrying a simulation that doesn't converge with a lower accuracy")
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = self.write_simulator(["if ! grep -q \"RELTOL=0.01 \" \"$4\"; then",
+                                               "  echo \"doAnalyses: TRAN:  Timestep too small\"",
+                                               "  exit 1",
+                                               "fi",
+                                               "echo \"delay = 1.5e-9\" > \"$3\""])
+        OPTS.sim_retries = 2
+        self.assertEqual(self.run_stimulus(), 3)
+        with open(OPTS.openram_temp + "stim.sp", "r") as f:
+            self.assertIn("RELTOL=0.01 ", f.read())
+
+        debug.info(1, "Failing a simulation that times out without retries")
+        OPTS.spice_exe = self.write_simulator(["sleep 30"])
+        OPTS.sim_timeout = 1
+        OPTS.sim_retries = 0
+        with self.assertRaises(AssertionError):
+            self.run_stimulus()
+        with open(OPTS.openram_temp + "calls", "r") as f:
+            self.assertEqual(len(f.readlines()), 1)
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"Check that the measurements of a simulator output file are read once per simulation"
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+import debug
+
+class spice_measures_test(openram_test):
+
+    def write_list(self, lines):
+        """ Write a timing.lis and return its modification time in ns. """
+        list_file = OPTS.openram_temp + "timing.lis"
+        with open(list_file, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return os.stat(list_file).st_mtime_ns
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        from characterizer import charutils
+        from characterizer.charutils import get_spice_measures, parse_spice_list
+        OPTS.spice_name = "ngspice"
+
+        debug.info(1, "Reading ngspice and hspice measurements")
+        self.write_list(["Circuit: * Functional test stimulus file",
+                         "avdout0_0ck1        =  9.000000e+00",
+                         "vdout0_0ck1         =  4.950000e+00",
+                         "vdout0_1ck1         =  1.200000e-02",
+                         "vdout0_1ck10        =  3.300000e+00",
+                         "delay_lh0           =  1.234500e-10 targ=  5.123450e-09 trig=  5.000000e-09",
+                         "delay_hl0           =  failed",
+                         "slew_lh0= 45.6p  targ= 5.1n   trig= 5.0n",
+                         "vdout0_0ck1         =  0.000000e+00"])
+        measures = get_spice_measures("timing")
+        self.assertEqual(measures["vdout0_0ck1"], "4.950000e+00")
+        self.assertEqual(measures["delay_hl0"], "Failed")
+        # The measurement names are found with the names the characterizer writes
+        dout_port = "DOUT0"
+        self.assertEqual(parse_spice_list("timing", "v{0}_{1}ck{2}".format(dout_port.lower(), 0, 1)), 4.95)
+        self.assertEqual(parse_spice_list("timing", "V{0}_{1}ck{2}".format(dout_port, 1, 1)), 0.012)
+        self.assertEqual(parse_spice_list("timing", "v{0}_{1}ck{2}".format(dout_port.lower(), 1, 10)), 3.3)
+        self.assertEqual(parse_spice_list("timing", "delay_lh0"), 1.2345e-10)
+        self.assertAlmostEqual(parse_spice_list("timing", "slew_lh0"), 45.6e-12)
+        self.assertEqual(parse_spice_list("timing", "delay_hl0"), "Failed")
+        self.assertEqual(parse_spice_list("timing", "v{0}_{1}ck{2}".format(dout_port.lower(), 2, 1)), "Failed")
+
+        debug.info(1, "Reading a file again only when it changes")
+        self.assertIs(get_spice_measures("timing"), measures)
+        self.write_list(["delay_lh0 = 2.5e-10"])
+        self.assertEqual(parse_spice_list("timing", "delay_lh0"), 2.5e-10)
+        self.assertEqual(parse_spice_list("timing", "vdout0_0ck1"), "Failed")
+
+        debug.info(1, "Forgetting the measurements after a simulation")
+        from characterizer.stimuli import stimuli
+        mtime_ns = self.write_list(["delay = 1.0e-9"])
+        self.assertEqual(parse_spice_list("timing", "delay"), 1.0e-9)
+        # The simulator writes a file of the same size
+        simulator = OPTS.openram_temp + "fake_ngspice"
+        with open(simulator, "w") as f:
+            f.write("\n".join(["#!/bin/sh", "echo \"delay = 2.0e-9\" > \"$3\""]) + "\n")
+        os.chmod(simulator, 0o755)
+        OPTS.spice_exe = simulator
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        sf = open(OPTS.openram_temp + "stim.sp", "w")
+        stim = stimuli(sf, corner)
+        stim.write_control(1)
+        sf.close()
+        stim.run_sim()
+        self.assertEqual(charutils.spice_measures, {})
+        # Even with the same modification time the new measurements are read
+        os.utime(OPTS.openram_temp + "timing.lis", ns=(mtime_ns, mtime_ns))
+        self.assertEqual(parse_spice_list("timing", "delay"), 2.0e-9)
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
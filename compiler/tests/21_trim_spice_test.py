@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+Check that the trimmed characterization netlist keeps the load of the kept nets
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+from sram_factory import factory
+import debug
+
+class trim_spice_test(openram_test):
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        OPTS.netlist_only = True
+
+        from characterizer import trim_spice
+        from sram_config import sram_config
+        import tech
+        c = sram_config(word_size=4,
+                        num_words=32,
+                        num_banks=1)
+        c.words_per_row=2
+        c.recompute_sizes()
+        debug.info(1, "Trimming a 4bit, 32words SRAM with a 2 way column mux")
+        s = factory.create(module_type="sram", sram_config=c)
+
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+
+        trimsp = trim_spice(tempspice, OPTS.openram_temp + "reduced.sp")
+        trimsp.set_configuration(s.s.num_banks, s.s.num_rows, s.s.num_cols, s.s.word_size)
+        trimsp.trim("1" * s.s.addr_size, s.s.word_size - 1)
+
+        # The bitcell array is trimmed
+        self.assertGreater(sum(len(removed) for removed in trimsp.removed_insts.values()), 0)
+
+        # Outside of the bitcell array every instance on a port that a kept instance connects to
+        # is kept (e.g. all of the sense amps on the sense enable and the wordline driver gates
+        # on the wordline enable). The bitcell array only keeps the probed lines.
+        supplies = set([tech.spice["vdd_name"], tech.spice["gnd_name"]])
+        array_name = trimsp.find_bitcell_array()
+        for (name, removed) in trimsp.removed_insts.items():
+            if name == array_name:
+                continue
+            subckt = trimsp.subckts[name]
+            for port in subckt.ports:
+                if port in supplies:
+                    continue
+                insts = subckt.net_insts.get(port, set())
+                if len(insts - removed) > 0:
+                    self.assertEqual(insts & removed, set(), "{0} lost load on {1}".format(name, port))
+
+        # A subcircuit that is trimmed twice only loses what neither call keeps
+        trimsp.removed_insts = {}
+        trimsp.keep_insts(array_name, [0, 1])
+        trimsp.keep_insts(array_name, [1, 2])
+        self.assertEqual(trimsp.removed_insts[array_name], set(range(3, len(trimsp.subckts[array_name].insts))))
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+Check that the bit delays of the worst case characterizer are the same
+when the bits are simulated in order and in parallel
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+from sram_factory import factory
+import debug
+
+class worst_case_bits_test(openram_test):
+
+    def bit_delay(self, addr, data_pos):
+        """ The read delay in ns that the stand-in simulator gives a bit. """
+        return 0.2 + 0.01*((7*int(addr, 2) + 3*data_pos) % 11)
+
+    def write_simulator(self):
+        """
+        Write a simulator that stands in for ngspice. The delays depend on the probed
+        address, which is written in the stimulus comments, and on the probed data bit.
+        Every other measurement gets a small valid value.
+        """
+        simulator = OPTS.openram_temp + "fake_ngspice"
+        with open(simulator, "w") as f:
+            f.write("\n".join(["#!{}".format(sys.executable),
+                               "import re,sys",
+                               "(output, stim) = (sys.argv[3], sys.argv[4])",
+                               "contents = open(stim).read()",
+                               "addr = re.search(r'W data 0 address (\\d+) to write value', contents).group(1)",
+                               "data_pos = int(re.search(r'TARG v\\(DOUT0_(\\d+)\\)', contents).group(1))",
+                               "delay = (0.2 + 0.01*((7*int(addr, 2) + 3*data_pos) % 11))*1e-9",
+                               "with open(output, 'w') as f:",
+                               "    for name in re.findall(r'^\\.meas tran (\\S+)', contents, re.MULTILINE):",
+                               "        f.write('{0} = {1}\\n'.format(name, delay if name.startswith('delay') else 1e-10))"]) + "\n")
+        os.chmod(simulator, 0o755)
+        return simulator
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        OPTS.analytical_delay = False
+        OPTS.netlist_only = True
+
+        # The simulator is set by the test instead of being found by the characterizer
+        from characterizer.worst_case import worst_case
+        from sram_config import sram_config
+        c = sram_config(word_size=4,
+                        num_words=32,
+                        num_banks=1)
+        c.words_per_row=2
+        c.recompute_sizes()
+        s = factory.create(module_type="sram", sram_config=c)
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        OPTS.spice_name = "ngspice"
+        OPTS.spice_exe = self.write_simulator()
+
+        results = []
+        for num_threads in [1, 3]:
+            debug.info(1, "Worst case bits with {} processes".format(num_threads))
+            OPTS.num_threads = num_threads
+            w = worst_case(s.s, tempspice, corner)
+            test_bits = w.get_sampled_bits()
+            results.append((test_bits, w.analyze("1"*s.s.addr_size, s.s.word_size-1, [0.1], [4.0], test_bits)))
+        OPTS.num_threads = 1
+
+        ((serial_bits, (serial_delays, serial_worst)), (parallel_bits, (parallel_delays, parallel_worst))) = results
+        self.assertEqual(serial_bits, parallel_bits)
+        self.assertEqual(serial_delays, parallel_delays)
+        self.assertEqual(serial_worst, parallel_worst)
+
+        # The first, middle and last rows, both mux columns and the first, middle and last data bits
+        self.assertEqual(len(serial_bits), 3*2*3)
+        self.assertIn(("0"*s.s.addr_size, 0), serial_bits)
+        self.assertIn(("1"*s.s.addr_size, s.s.word_size-1), serial_bits)
+
+        # Each bit is measured on its own address and data bit
+        for (addr, data_pos) in serial_bits:
+            self.assertAlmostEqual(serial_delays[(addr, data_pos)]["delay_lh"], self.bit_delay(addr, data_pos))
+        self.assertEqual(serial_worst, max(serial_bits, key=lambda bit: self.bit_delay(*bit)))
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()
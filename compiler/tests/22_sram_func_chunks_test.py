@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# See LICENSE for licensing information.
+#
+#Copyright (c) 2016-2019 Regents of the University of California and The Board
+#of Regents for the Oklahoma Agricultural and Mechanical College
+#(acting for and on behalf of Oklahoma State University)
+#All rights reserved.
+#
+"""
+Check that a functional test split into chunks gives the same result
+when the chunks are simulated in order and in parallel
+"""
+
+import unittest
+from testutils import header,openram_test
+import sys,os
+sys.path.append(os.path.join(sys.path[0],".."))
+import globals
+from globals import OPTS
+from sram_factory import factory
+import debug
+
+class sram_func_chunks_test(openram_test):
+
+    def write_simulator(self, word_size, stuck_bit):
+        """
+        Write a simulator that stands in for ngspice. It keeps the memory contents of the
+        writes in the stimulus comments and measures the value of each read on the outputs.
+        An optional bit of every word is stuck at 0.
+        """
+        simulator = OPTS.openram_temp + "fake_ngspice"
+        vdd = OPTS.supply_voltages[0]
+        with open(simulator, "w") as f:
+            f.write("\n".join(["#!{}".format(sys.executable),
+                               "import re,sys",
+                               "(output, stim) = (sys.argv[3], sys.argv[4])",
+                               "memory = {}",
+                               "reads = []",
+                               "for line in open(stim):",
+                               "    write = re.match(r'\\*\\s*Writing (\\d+)\\s+to\\s+address (\\d+)', line)",
+                               "    if write:",
+                               "        word = list(write.group(1))",
+                               "        if {} != None:".format(stuck_bit),
+                               "            word[-1-{}] = '0'".format(stuck_bit),
+                               "        memory[write.group(2)] = ''.join(word)",
+                               "    read = re.match(r'\\*\\s*Reading \\d+ from address (\\d+) \\(from port (\\d+)\\)', line)",
+                               "    if read:",
+                               "        reads.append((read.group(2), memory.get(read.group(1))))",
+                               "with open(output, 'w') as f:",
+                               "    for (check, (port, word)) in enumerate(reads):",
+                               "        for bit in range({}):".format(word_size),
+                               "            value = {0}*int(word[-1-bit]) if word else {0}/2".format(vdd),
+                               "            f.write('vdout{0}_{1}ck{2} = {3}\\n'.format(port, bit, check, value))"]) + "\n")
+        os.chmod(simulator, 0o755)
+        return simulator
+
+    def runTest(self):
+        globals.init_openram("config_{0}".format(OPTS.tech_name))
+        OPTS.analytical_delay = False
+        OPTS.netlist_only = True
+
+        # The simulator is set by the test instead of being found by the characterizer
+        from characterizer.functional import functional
+        from sram_config import sram_config
+        c = sram_config(word_size=4,
+                        num_words=16,
+                        num_banks=1)
+        c.words_per_row=1
+        c.recompute_sizes()
+        s = factory.create(module_type="sram", sram_config=c)
+        tempspice = OPTS.openram_temp + "temp.sp"
+        s.sp_write(tempspice)
+
+        corner = (OPTS.process_corners[0], OPTS.supply_voltages[0], OPTS.temperatures[0])
+        OPTS.spice_name = "ngspice"
+
+        for stuck_bit in [None, 2]:
+            OPTS.spice_exe = self.write_simulator(c.word_size, stuck_bit)
+            results = []
+            for num_threads in [1, 3]:
+                debug.info(1, "Functional test in chunks with {0} processes and stuck bit {1}".format(num_threads,
+                                                                                                      stuck_bit))
+                OPTS.num_threads = num_threads
+                f = functional(s.s, tempspice, corner)
+                f.num_cycles = 40
+                f.cycles_per_chunk = 8
+                results.append(f.run())
+                # The later chunks read words that the earlier chunks wrote
+                self.assertEqual(len(f.chunks), 6)
+                self.assertGreater(sum(len(preload_words) for (first_cycle, preload_words, cycles) in f.chunks[1:]), 0)
+            OPTS.num_threads = 1
+
+            (serial_result, parallel_result) = results
+            self.assertEqual(serial_result, parallel_result)
+            if stuck_bit == None:
+                self.assertEqual(serial_result, (1, "SUCCESS"))
+            else:
+                self.assertEqual(serial_result[0], 0)
+
+        globals.end_openram()
+
+# run the test from the command line
+if __name__ == "__main__":
+    (OPTS, args) = globals.parse_args()
+    del sys.argv[1:]
+    header(__file__, OPTS.tech_name)
+    unittest.main()